@@ -0,0 +1,9 @@
+"""
+Baromètre relationnel : analyse et export des projets, sans dépendance à Streamlit.
+
+- barometre.modele : règles de vigilance, registre des relations, table colonnaire ;
+- barometre.reseau : analyse du réseau (graphe orienté signé) ;
+- barometre.export : classeur Excel, JSON et archive ZIP du projet ;
+- barometre.espace_travail : base SQLite locale des projets et journal des modifications ;
+- python -m barometre : export en ligne de commande de fichiers JSON de projets.
+"""
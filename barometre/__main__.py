@@ -0,0 +1,108 @@
+"""
+Export en ligne de commande, sans Streamlit : régénère l'archive ZIP (JSON + Excel) ou le
+classeur Excel seul de un ou plusieurs projets JSON, les fichiers étant traités en parallèle
+(un processus par fichier, dans la limite du nombre de cœurs).
+
+    python -m barometre projets/*.json --sortie rapports --format xlsx
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .export import (
+    NOMBRE_THREADS_EXPORT, TAILLE_ECHANTILLON_LARGEURS, archive_zip, classeur_excel, projet_depuis_json,
+    projet_vers_json,
+)
+
+FORMATS_SORTIE = ("zip", "xlsx")
+
+
+def exporter_fichier(chemin: str, dossier_sortie: str, format_sortie: str, nombre_threads: int,
+                     taille_echantillon: int = None):
+    """
+    Exporte un projet JSON vers dossier_sortie (ZIP ou XLSX du même nom que le fichier) ;
+    taille_echantillon active le mode échantillonné des largeurs de colonnes.
+    Renvoie (chemin, chemin de sortie ou None, nombre de relations, durée, message d'erreur ou None).
+    """
+    debut = time.perf_counter()
+    try:
+        with open(chemin, encoding="utf-8") as fichier:
+            projet = projet_depuis_json(json.load(fichier))
+        excel = classeur_excel(projet["relations"], projet["participants"], projet["services"],
+                               projet["nombre_total_personnes"], nombre_threads=nombre_threads,
+                               taille_echantillon=taille_echantillon)
+        if format_sortie == "zip":
+            contenu = archive_zip(
+                projet_vers_json(projet["participants"], projet["services"], projet["relations"],
+                                 projet["nombre_total_personnes"]),
+                excel,
+            ).getvalue()
+        else:
+            contenu = excel
+        nom = os.path.splitext(os.path.basename(chemin))[0] + "." + format_sortie
+        chemin_sortie = os.path.join(dossier_sortie or os.path.dirname(os.path.abspath(chemin)), nom)
+        with open(chemin_sortie, "wb") as sortie:
+            sortie.write(contenu)
+    except Exception as e:
+        return chemin, None, 0, time.perf_counter() - debut, f"{type(e).__name__} : {e}"
+    return chemin, chemin_sortie, len(projet["relations"]), time.perf_counter() - debut, None
+
+
+def analyser_arguments(arguments=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m barometre",
+        description="Exporte des projets JSON du baromètre relationnel en ZIP (JSON + Excel) ou en XLSX.",
+    )
+    parser.add_argument("fichiers", nargs="+", help="fichiers JSON de projets")
+    parser.add_argument("-o", "--sortie", default=None,
+                        help="dossier de sortie (par défaut : dossier de chaque fichier)")
+    parser.add_argument("-f", "--format", dest="format_sortie", choices=FORMATS_SORTIE, default="zip",
+                        help="format de sortie (défaut : zip)")
+    parser.add_argument("-j", "--processus", type=int, default=os.cpu_count() or 1,
+                        help="nombre de fichiers traités en parallèle (défaut : nombre de cœurs)")
+    parser.add_argument("--echantillon-largeurs", dest="taille_echantillon", type=int, nargs="?",
+                        const=TAILLE_ECHANTILLON_LARGEURS, default=None, metavar="N",
+                        help="estime les largeurs de colonnes des grandes feuilles sur un échantillon de N lignes "
+                             f"(défaut de N : {TAILLE_ECHANTILLON_LARGEURS}) au lieu de les calculer exactement")
+    return parser.parse_args(arguments)
+
+
+def _afficher(resultats):
+    """Affiche chaque résultat dès qu'il est disponible (ordre des fichiers) et le renvoie."""
+    for chemin, chemin_sortie, nombre_relations, duree, erreur in resultats:
+        if erreur is None:
+            print(f"{chemin} → {chemin_sortie} ({nombre_relations} relation(s), {duree:.1f} s)")
+        else:
+            print(f"{chemin} : ERREUR {erreur}", file=sys.stderr)
+        yield chemin, chemin_sortie, nombre_relations, duree, erreur
+
+
+def main(arguments=None) -> int:
+    args = analyser_arguments(arguments)
+    if args.sortie:
+        os.makedirs(args.sortie, exist_ok=True)
+    nombre_processus = max(1, min(args.processus, len(args.fichiers)))
+    # Un seul fichier : ses feuilles sont calculées en parallèle (threads) dans ce processus.
+    # Plusieurs fichiers : un fichier par processus, feuilles calculées séquentiellement.
+    taches = [(chemin, args.sortie, args.format_sortie, 1 if nombre_processus > 1 else NOMBRE_THREADS_EXPORT,
+               args.taille_echantillon)
+              for chemin in args.fichiers]
+
+    debut = time.perf_counter()
+    if nombre_processus > 1:
+        with ProcessPoolExecutor(max_workers=nombre_processus) as pool:
+            resultats = pool.map(exporter_fichier, *zip(*taches))
+            resultats = list(_afficher(resultats))
+    else:
+        resultats = list(_afficher(exporter_fichier(*tache) for tache in taches))
+
+    erreurs = sum(1 for resultat in resultats if resultat[4] is not None)
+    print(f"{len(resultats) - erreurs} fichier(s) exporté(s), {erreurs} erreur(s) en {time.perf_counter() - debut:.1f} s")
+    return 1 if erreurs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
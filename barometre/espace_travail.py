@@ -0,0 +1,512 @@
+"""
+Espace de travail local des projets (sans dépendance à Streamlit) : base SQLite de plusieurs
+projets et journal des modifications en ajout seul, compacté dans la base en tâche de fond.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from .modele import ATTRIBUTS_RELATION, CHAMPS_RELATION, RegistreRelations
+
+
+# === SCHÉMA ==================================================================
+# Colonnes de la table relations : identifiant stable puis attributs de Relation (ordre de CHAMPS_RELATION)
+COLONNES_SQL_RELATION = ["id"] + list(ATTRIBUTS_RELATION.values())
+# Colonnes de la clé unique d'une relation dans un projet (Émetteur, Récepteur, Date, Début, Fin)
+COLONNES_SQL_CLE = COLONNES_SQL_RELATION[1:6]
+# Colonnes de la recherche textuelle de la grille (mêmes champs que COLONNES_RECHERCHE_GRILLE de l'application)
+COLONNES_SQL_RECHERCHE = [ATTRIBUTS_RELATION[c] for c in ("Émetteur", "Récepteur", "Service", "Commentaire")]
+# Clé de tri chronologique des dates "%d/%m/%Y" (AAAAMMJJ) ; NULL pour une date d'un autre format
+EXPRESSION_SQL_TRI_DATE = (
+    "CASE WHEN date GLOB '[0-9][0-9]/[0-9][0-9]/[0-9][0-9][0-9][0-9]' "
+    "THEN substr(date, 7, 4) || substr(date, 4, 2) || substr(date, 1, 2) END"
+)
+
+SCHEMA_ESPACE_TRAVAIL = f"""
+CREATE TABLE IF NOT EXISTS projets (
+    id INTEGER PRIMARY KEY,
+    nom TEXT NOT NULL UNIQUE,
+    nombre_total_personnes INTEGER NOT NULL DEFAULT 0,
+    modifie_le TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS services (
+    projet_id INTEGER NOT NULL REFERENCES projets(id) ON DELETE CASCADE,
+    rang INTEGER NOT NULL,
+    nom TEXT NOT NULL,
+    PRIMARY KEY (projet_id, rang)
+);
+CREATE TABLE IF NOT EXISTS participants (
+    projet_id INTEGER NOT NULL REFERENCES projets(id) ON DELETE CASCADE,
+    rang INTEGER NOT NULL,
+    nom TEXT NOT NULL,
+    service TEXT,
+    PRIMARY KEY (projet_id, rang)
+);
+CREATE TABLE IF NOT EXISTS relations (
+    projet_id INTEGER NOT NULL REFERENCES projets(id) ON DELETE CASCADE,
+    {", ".join(f"{c} {'INTEGER' if c == 'id' or c.startswith(('p_', 'i_', 'c_', 'score_')) else 'TEXT'}"
+               for c in COLONNES_SQL_RELATION)},
+    PRIMARY KEY (projet_id, id),
+    UNIQUE (projet_id, emetteur, recepteur, date, debut, fin)
+);
+CREATE INDEX IF NOT EXISTS relations_recepteur ON relations (projet_id, recepteur);
+CREATE TABLE IF NOT EXISTS etat_journal (
+    cle TEXT PRIMARY KEY,
+    valeur INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS journal_rejets (
+    seq INTEGER PRIMARY KEY,
+    projet_id INTEGER,
+    entree TEXT NOT NULL,
+    erreur TEXT NOT NULL,
+    le TEXT NOT NULL
+);
+"""
+
+
+# === JOURNAL DES MODIFICATIONS ===============================================
+class JournalModifications:
+    """
+    Journal des modifications en ajout seul (une entrée JSON par ligne, numérotée par "seq").
+    Chaque écriture coûte O(taille de l'entrée) ; les données sont transmises au système à chaque
+    écriture (survivent à un arrêt du processus) et synchronisées sur disque (fsync) par lots :
+    toutes les fsync_toutes entrées ou dès que fsync_delai secondes se sont écoulées.
+    Pour la compaction, le journal courant est renommé (rotation) puis relu ; un fichier de
+    compaction restant d'une exécution interrompue est relu en premier.
+    """
+
+    def __init__(self, chemin: str, fsync_toutes: int = 20, fsync_delai: float = 1.0):
+        self.chemin = chemin
+        self.chemin_compaction = chemin + ".compaction"
+        self._fsync_toutes = max(1, fsync_toutes)
+        self._fsync_delai = fsync_delai
+        self._verrou = threading.Lock()
+        self._fichier = None
+        self._non_synchronisees = 0
+        self._dernier_fsync = time.monotonic()
+        self.sequence = 0
+
+    def ajouter(self, entrees):
+        """Ajoute des entrées (dictionnaires) à la fin du journal en leur attribuant un numéro de séquence."""
+        with self._verrou:
+            if self._fichier is None:
+                self._fichier = open(self.chemin, "a", encoding="utf-8")
+            for entree in entrees:
+                self.sequence += 1
+                self._fichier.write(json.dumps({"seq": self.sequence, **entree}, ensure_ascii=False) + "\n")
+            self._fichier.flush()
+            self._non_synchronisees += len(entrees)
+            if (self._non_synchronisees >= self._fsync_toutes
+                    or time.monotonic() - self._dernier_fsync >= self._fsync_delai):
+                self._fsync()
+
+    def _fsync(self):
+        os.fsync(self._fichier.fileno())
+        self._non_synchronisees = 0
+        self._dernier_fsync = time.monotonic()
+
+    def synchroniser(self):
+        """Force le fsync des entrées écrites depuis le dernier lot."""
+        with self._verrou:
+            if self._fichier is not None and self._non_synchronisees:
+                self._fsync()
+
+    def fermer(self):
+        """Synchronise et ferme le fichier du journal (il est rouvert à l'écriture suivante)."""
+        with self._verrou:
+            if self._fichier is not None:
+                if self._non_synchronisees:
+                    self._fsync()
+                self._fichier.close()
+                self._fichier = None
+
+    def rotation(self) -> bool:
+        """
+        Prépare une compaction : renomme le journal courant en fichier de compaction.
+        Renvoie False s'il n'y a rien à compacter.
+        """
+        with self._verrou:
+            if os.path.exists(self.chemin_compaction):
+                return True
+            if self._fichier is not None:
+                if self._non_synchronisees:
+                    self._fsync()
+                self._fichier.close()
+                self._fichier = None
+            if not os.path.exists(self.chemin) or os.path.getsize(self.chemin) == 0:
+                return False
+            os.replace(self.chemin, self.chemin_compaction)
+            return True
+
+    def lire_compaction(self) -> list:
+        """Entrées du fichier de compaction ; une dernière ligne tronquée (arrêt brutal) est ignorée."""
+        return self._lire(self.chemin_compaction)
+
+    @staticmethod
+    def _lire(chemin: str) -> list:
+        entrees = []
+        with open(chemin, encoding="utf-8") as fichier:
+            for ligne in fichier:
+                try:
+                    entrees.append(json.loads(ligne))
+                except json.JSONDecodeError:
+                    break
+        return entrees
+
+    def derniere_sequence(self) -> int:
+        """Plus grand numéro de séquence des entrées encore présentes (fichier de compaction et journal courant)."""
+        derniere = 0
+        for chemin in (self.chemin_compaction, self.chemin):
+            if os.path.exists(chemin):
+                for entree in self._lire(chemin):
+                    if isinstance(entree, dict) and isinstance(entree.get("seq"), int):
+                        derniere = max(derniere, entree["seq"])
+        return derniere
+
+    def terminer_compaction(self):
+        os.remove(self.chemin_compaction)
+
+
+# === ESPACE DE TRAVAIL =======================================================
+class EspaceTravail:
+    """
+    Stockage local de plusieurs projets dans une base SQLite (mode WAL : lectures concurrentes
+    pendant une écriture). Les projets ne sont chargés qu'à l'ouverture ; les modifications
+    n'écrivent que les lignes concernées (relations ajoutées, supprimées ou renommées), les
+    participants, services et nombre total de personnes étant réécrits en bloc (quelques lignes).
+    Une seule connexion est partagée entre les sessions : les écritures sont sérialisées par un verrou.
+    Les modifications d'un projet ouvert sont d'abord ajoutées au JournalModifications (écriture O(1)),
+    puis compactées dans la base par une tâche de fond, ou avant toute lecture pour rester cohérent.
+    Au démarrage, le journal restant d'une exécution précédente est rejoué ; le dernier numéro
+    de séquence appliqué est enregistré dans la même transaction, chaque entrée n'est donc
+    appliquée qu'une fois.
+    Plusieurs sessions peuvent modifier le même projet, chacune numérotant ses relations : un ajout
+    dont l'identifiant est déjà pris reçoit un nouvel identifiant, et une suppression désigne la
+    relation par sa clé (Émetteur, Récepteur, Date, Début, Fin) et non par son identifiant.
+    Une entrée qui ne peut pas être appliquée (relation déjà enregistrée par une autre session,
+    erreur SQLite, entrée mal formée, ...) est annulée seule et conservée dans la table
+    journal_rejets : elle ne bloque pas les compactions suivantes. Un échec du rejeu au démarrage
+    est signalé par derniere_erreur_compaction, comme pour la compaction de fond, sans empêcher
+    l'ouverture de l'espace de travail.
+    """
+
+    def __init__(self, chemin: str, fsync_toutes: int = 20, fsync_delai: float = 1.0, compaction_delai: float = 5.0):
+        self._connexion = sqlite3.connect(chemin, check_same_thread=False)
+        self._verrou = threading.Lock()
+        self._verrou_compaction = threading.Lock()
+        with self._verrou:
+            self._connexion.execute("PRAGMA journal_mode=WAL")
+            self._connexion.execute("PRAGMA synchronous=NORMAL")
+            self._connexion.execute("PRAGMA foreign_keys=ON")
+            self._connexion.executescript(SCHEMA_ESPACE_TRAVAIL)
+            # Recherche sans casse comme str.contains(case=False) de pandas (LIKE ne replie que l'ASCII)
+            self._connexion.create_function(
+                "contient", 2, lambda valeur, motif: valeur is not None and motif in str(valeur).upper(),
+                deterministic=True,
+            )
+
+        self._journal = JournalModifications(chemin + ".journal.jsonl", fsync_toutes, fsync_delai)
+        self.derniere_erreur_compaction = None
+        try:
+            self.compacter()  # rejeu du journal laissé par une exécution précédente
+        except Exception as e:
+            # Comme pour la compaction de fond : le journal est conservé et sera rejoué plus tard
+            self.derniere_erreur_compaction = str(e)
+        # Numérotation reprise après la dernière entrée appliquée ou encore en attente dans le journal
+        self._journal.sequence = max(self._sequence_appliquee(), self._journal.derniere_sequence())
+
+        self._arret = threading.Event()
+        self._compaction_delai = compaction_delai
+        threading.Thread(target=self._compacter_en_continu, daemon=True).start()
+
+    def fermer(self):
+        """
+        Arrête la compaction de fond et ferme le journal et la base, sans compacter : le journal
+        restant est rejoué à la prochaine ouverture.
+        """
+        self._arret.set()
+        with self._verrou_compaction, self._verrou:
+            self._journal.fermer()
+            self._connexion.close()
+
+    def _compacter_en_continu(self):
+        while not self._arret.wait(self._compaction_delai):
+            try:
+                self._journal.synchroniser()
+                self.compacter()
+                self.derniere_erreur_compaction = None
+            except Exception as e:
+                # Le journal est conservé et sera rejoué à la prochaine compaction
+                self.derniere_erreur_compaction = str(e)
+
+    def _sequence_appliquee(self) -> int:
+        ligne = self._connexion.execute("SELECT valeur FROM etat_journal WHERE cle = 'sequence'").fetchone()
+        return ligne[0] if ligne else 0
+
+    def compacter(self) -> int:
+        """
+        Applique à la base les entrées du journal non encore appliquées, puis supprime le fichier
+        compacté. Renvoie le nombre d'entrées appliquées.
+        """
+        appliquees = 0
+        with self._verrou_compaction:
+            # Au plus deux passes : un reste de compaction interrompue, puis le journal courant
+            for _ in range(2):
+                if not self._journal.rotation():
+                    break
+                entrees = self._journal.lire_compaction()
+                with self._verrou, self._connexion:
+                    self._connexion.execute("BEGIN")
+                    sequence = self._sequence_appliquee()
+                    projets = {projet_id for (projet_id,) in self._connexion.execute("SELECT id FROM projets")}
+                    derniere = sequence
+                    for entree in entrees:
+                        if not (isinstance(entree, dict) and isinstance(entree.get("seq"), int) and "projet" in entree):
+                            self._rejeter(entree, "Entrée du journal mal formée (numéro de séquence ou projet absent).")
+                            continue
+                        derniere = max(derniere, entree["seq"])
+                        if entree["seq"] > sequence and entree["projet"] in projets:
+                            if self._appliquer_ou_rejeter(entree):
+                                appliquees += 1
+                    if derniere != sequence:
+                        self._connexion.execute(
+                            "INSERT OR REPLACE INTO etat_journal (cle, valeur) VALUES ('sequence', ?)", (derniere,)
+                        )
+                self._journal.terminer_compaction()
+        return appliquees
+
+    def _appliquer_ou_rejeter(self, entree: dict) -> bool:
+        """
+        Applique une entrée dans un point de sauvegarde ; en cas d'échec, seule cette entrée est
+        annulée et enregistrée dans journal_rejets. Renvoie True si l'entrée a été appliquée.
+        """
+        self._connexion.execute("SAVEPOINT entree")
+        try:
+            self._appliquer(entree)
+        except Exception as e:
+            self._connexion.execute("ROLLBACK TO entree")
+            self._rejeter(entree, str(e))
+            return False
+        finally:
+            self._connexion.execute("RELEASE entree")
+        return True
+
+    def _rejeter(self, entree, erreur: str):
+        """Conserve une entrée non appliquée dans journal_rejets (numérotée par sa séquence si elle en a une)."""
+        seq = entree.get("seq") if isinstance(entree, dict) else None
+        self._connexion.execute(
+            "INSERT OR REPLACE INTO journal_rejets (seq, projet_id, entree, erreur, le) VALUES (?, ?, ?, ?, ?)",
+            (seq if isinstance(seq, int) else None, entree.get("projet") if isinstance(entree, dict) else None,
+             json.dumps(entree, ensure_ascii=False), erreur, self._maintenant()),
+        )
+
+    def nombre_rejets(self) -> int:
+        """Nombre d'entrées du journal qui n'ont pas pu être appliquées (table journal_rejets)."""
+        with self._verrou:
+            return self._connexion.execute("SELECT COUNT(*) FROM journal_rejets").fetchone()[0]
+
+    def _ajouter_relation(self, projet_id: int, valeurs):
+        """
+        Insère une relation journalisée. Si son identifiant est déjà pris (autre session sur le même
+        projet), elle reçoit le prochain identifiant libre ; si sa clé existe déjà, ValueError.
+        """
+        requete = (f"INSERT INTO relations (projet_id, {', '.join(COLONNES_SQL_RELATION)}) "
+                   f"VALUES (?, {', '.join('?' * len(COLONNES_SQL_RELATION))})")
+        try:
+            self._connexion.execute(requete, (projet_id, *valeurs))
+        except sqlite3.IntegrityError:
+            existante = self._connexion.execute(
+                f"SELECT id FROM relations WHERE projet_id = ? AND "
+                f"{' AND '.join(f'{c} IS ?' for c in COLONNES_SQL_CLE)}",
+                (projet_id, *valeurs[1:1 + len(COLONNES_SQL_CLE)]),
+            ).fetchone()
+            if existante is not None:
+                raise ValueError(f"Relation déjà enregistrée dans le projet (identifiant {existante[0]}).")
+            (nouvel_id,) = self._connexion.execute(
+                "SELECT COALESCE(MAX(id), -1) + 1 FROM relations WHERE projet_id = ?", (projet_id,)
+            ).fetchone()
+            self._connexion.execute(requete, (projet_id, nouvel_id, *valeurs[1:]))
+
+    def _appliquer(self, entree: dict):
+        projet_id = entree["projet"]
+        if entree["op"] == "ajout":
+            self._ajouter_relation(projet_id, entree["valeurs"])
+        elif entree["op"] == "suppression":
+            if "cle" in entree:
+                self._connexion.execute(
+                    f"DELETE FROM relations WHERE projet_id = ? AND {' AND '.join(f'{c} IS ?' for c in COLONNES_SQL_CLE)}",
+                    (projet_id, *entree["cle"]),
+                )
+            else:  # Entrée écrite avant l'enregistrement de la clé
+                self._connexion.execute("DELETE FROM relations WHERE projet_id = ? AND id = ?", (projet_id, entree["id"]))
+        elif entree["op"] == "renommage":
+            for colonne in ("emetteur", "recepteur"):
+                self._connexion.execute(
+                    f"UPDATE relations SET {colonne} = ? WHERE projet_id = ? AND {colonne} = ?",
+                    (entree["nouveau"], projet_id, entree["ancien"]),
+                )
+        elif entree["op"] == "participants":
+            self._ecrire_participants(projet_id, entree["participants"], entree["services"],
+                                      entree["nombre_total_personnes"])
+        self._connexion.execute("UPDATE projets SET modifie_le = ? WHERE id = ?", (entree["le"], projet_id))
+
+    @staticmethod
+    def _maintenant() -> str:
+        return datetime.now().isoformat(timespec="seconds")
+
+    def lister_projets(self) -> list:
+        """Projets enregistrés (id, nom, nombre de relations, date de modification), du plus récent au plus ancien."""
+        self.compacter()
+        with self._verrou:
+            return self._connexion.execute("""
+                SELECT p.id, p.nom, (SELECT COUNT(*) FROM relations r WHERE r.projet_id = p.id), p.modifie_le
+                FROM projets p ORDER BY p.modifie_le DESC, p.id DESC
+            """).fetchall()
+
+    def creer_projet(self, nom: str, participants=(), services=(), nombre_total_personnes: int = 0,
+                     registre: RegistreRelations = None) -> int:
+        """Crée un projet (éventuellement avec son contenu complet) et renvoie son id. Lève ValueError si le nom existe."""
+        with self._verrou, self._connexion:
+            try:
+                projet_id = self._connexion.execute(
+                    "INSERT INTO projets (nom, nombre_total_personnes, modifie_le) VALUES (?, ?, ?)",
+                    (nom, nombre_total_personnes, self._maintenant()),
+                ).lastrowid
+            except sqlite3.IntegrityError:
+                raise ValueError(f"Un projet nommé « {nom} » existe déjà.")
+            self._ecrire_participants(projet_id, participants, services, nombre_total_personnes)
+            if registre is not None:
+                self._inserer_relations(projet_id, registre)
+        return projet_id
+
+    def supprimer_projet(self, projet_id: int):
+        self.compacter()
+        with self._verrou, self._connexion:
+            self._connexion.execute("DELETE FROM projets WHERE id = ?", (projet_id,))
+
+    def charger_projet(self, projet_id: int) -> dict:
+        """
+        En-tête d'un projet : {"nom", "participants", "services", "nombre_total_personnes"}.
+        Les relations ne sont pas lues : voir charger_relations, compter_relations et page_relations.
+        """
+        self.compacter()
+        with self._verrou:
+            nom, nombre_total_personnes = self._connexion.execute(
+                "SELECT nom, nombre_total_personnes FROM projets WHERE id = ?", (projet_id,)
+            ).fetchone()
+            services = [s for (s,) in self._connexion.execute(
+                "SELECT nom FROM services WHERE projet_id = ? ORDER BY rang", (projet_id,)
+            )]
+            participants = [{"nom": n, "service": s} for n, s in self._connexion.execute(
+                "SELECT nom, service FROM participants WHERE projet_id = ? ORDER BY rang", (projet_id,)
+            )]
+        return {
+            "nom": nom,
+            "participants": participants,
+            "services": services,
+            "nombre_total_personnes": nombre_total_personnes,
+        }
+
+    def charger_relations(self, projet_id: int) -> RegistreRelations:
+        """RegistreRelations du projet, reconstruit avec les identifiants enregistrés."""
+        self.compacter()
+        with self._verrou:
+            lignes = self._connexion.execute(
+                f"SELECT {', '.join(COLONNES_SQL_RELATION)} FROM relations WHERE projet_id = ? ORDER BY id", (projet_id,)
+            ).fetchall()
+        return RegistreRelations.depuis_lignes(lignes)
+
+    @staticmethod
+    def _filtre_relations(projet_id: int, recherche: str, vigilances):
+        """Clause WHERE (et ses paramètres) des relations retenues par la grille."""
+        conditions, parametres = ["projet_id = ?"], [projet_id]
+        if recherche:
+            conditions.append("(" + " OR ".join(f"contient({c}, ?)" for c in COLONNES_SQL_RECHERCHE) + ")")
+            parametres += [recherche.upper()] * len(COLONNES_SQL_RECHERCHE)
+        if vigilances:
+            conditions.append(f"vigilance IN ({', '.join('?' * len(vigilances))})")
+            parametres += list(vigilances)
+        return " AND ".join(conditions), parametres
+
+    def compter_relations(self, projet_id: int, recherche: str = "", vigilances=None) -> int:
+        """Nombre de relations du projet retenues par la recherche textuelle et les types de vigilance."""
+        self.compacter()
+        clause, parametres = self._filtre_relations(projet_id, recherche, vigilances)
+        with self._verrou:
+            (nombre,) = self._connexion.execute(f"SELECT COUNT(*) FROM relations WHERE {clause}", parametres).fetchone()
+        return nombre
+
+    def page_relations(self, projet_id: int, recherche: str = "", vigilances=None, colonne_tri=None,
+                       tri_croissant: bool = True, decalage: int = 0, limite: int = -1) -> pd.DataFrame:
+        """
+        Page de la grille lue dans la base, colonnes ["id"] + CHAMPS_RELATION : même filtre et même
+        tri que filtrer_relations de l'application (tri stable sur l'identifiant, dates "%d/%m/%Y"
+        chronologiques, valeurs absentes en dernier). Une valeur absente ne correspond à aucune recherche.
+        """
+        self.compacter()
+        clause, parametres = self._filtre_relations(projet_id, recherche, vigilances)
+        ordre = "id"
+        if colonne_tri:
+            cle = EXPRESSION_SQL_TRI_DATE if colonne_tri == "Date" else ATTRIBUTS_RELATION[colonne_tri]
+            ordre = f"({cle}) IS NULL, {cle} {'ASC' if tri_croissant else 'DESC'}, id"
+        with self._verrou:
+            lignes = self._connexion.execute(
+                f"SELECT {', '.join(COLONNES_SQL_RELATION)} FROM relations WHERE {clause} "
+                f"ORDER BY {ordre} LIMIT ? OFFSET ?",
+                parametres + [limite, decalage],
+            ).fetchall()
+        return pd.DataFrame(lignes, columns=["id"] + CHAMPS_RELATION)
+
+    def enregistrer_modifications(self, projet_id: int, modifications, participants=None, services=None,
+                                  nombre_total_personnes=None):
+        """
+        Ajoute au journal les opérations du registre (voir RegistreRelations.extraire_modifications)
+        et, s'ils sont fournis, le nouvel état des participants, services et nombre total de personnes.
+        La base n'est mise à jour qu'à la compaction suivante.
+        """
+        le = self._maintenant()
+        entrees = []
+        for operation in modifications:
+            if operation[0] == "ajout":
+                valeurs = [getattr(operation[1], c) for c in COLONNES_SQL_RELATION]
+                entrees.append({"projet": projet_id, "le": le, "op": "ajout", "valeurs": valeurs})
+            elif operation[0] == "suppression":
+                entrees.append({"projet": projet_id, "le": le, "op": "suppression", "id": operation[1],
+                                "cle": list(operation[2])})
+            elif operation[0] == "renommage":
+                entrees.append({"projet": projet_id, "le": le, "op": "renommage",
+                                "ancien": operation[1], "nouveau": operation[2]})
+        if participants is not None:
+            entrees.append({
+                "projet": projet_id, "le": le, "op": "participants",
+                "participants": [{"nom": p["nom"], "service": p.get("service")} for p in participants],
+                "services": list(services), "nombre_total_personnes": nombre_total_personnes,
+            })
+        self._journal.ajouter(entrees)
+
+    def _inserer_relations(self, projet_id: int, relations):
+        self._connexion.executemany(
+            f"INSERT INTO relations (projet_id, {', '.join(COLONNES_SQL_RELATION)}) "
+            f"VALUES (?, {', '.join('?' * len(COLONNES_SQL_RELATION))})",
+            ((projet_id, *(getattr(relation, c) for c in COLONNES_SQL_RELATION)) for relation in relations),
+        )
+
+    def _ecrire_participants(self, projet_id: int, participants, services, nombre_total_personnes):
+        self._connexion.execute("DELETE FROM participants WHERE projet_id = ?", (projet_id,))
+        self._connexion.execute("DELETE FROM services WHERE projet_id = ?", (projet_id,))
+        self._connexion.executemany(
+            "INSERT INTO participants (projet_id, rang, nom, service) VALUES (?, ?, ?, ?)",
+            ((projet_id, rang, p["nom"], p.get("service")) for rang, p in enumerate(participants)),
+        )
+        self._connexion.executemany(
+            "INSERT INTO services (projet_id, rang, nom) VALUES (?, ?, ?)",
+            ((projet_id, rang, s) for rang, s in enumerate(services)),
+        )
+        self._connexion.execute(
+            "UPDATE projets SET nombre_total_personnes = ? WHERE id = ?", (nombre_total_personnes, projet_id)
+        )
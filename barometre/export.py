@@ -0,0 +1,615 @@
+"""
+Export du projet : calcul des feuilles du classeur Excel, écriture du classeur,
+JSON du projet et archive ZIP (sans dépendance à Streamlit).
+"""
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .modele import TYPES_VIGILANCE, RegistreRelations, TableRelations
+from .reseau import COLONNES_ANALYSE_RESEAU, GrapheRelations
+
+
+# === CALCUL DES FEUILLES EXCEL ===============================================
+# Valeurs d'une relation neutre (non saisie) dans la feuille 'Relations'
+VALEURS_RELATION_NEUTRE = {
+    "Date": "RAS", # Pas de date pour une relation non saisie
+    "Début": "RAS", # Pas d'heure
+    "Fin": "RAS",   # Pas d'heure
+    "P+": 0, "P-": 0, "I+": 0, "I-": 0, "C+": 0, "C-": 0,
+    "Score Pic Positif": 0,
+    "Score Pic Négatif": 0,
+    "Score Net": 0,
+    "Vigilance": "Neutre", # Marqué comme neutre
+    "Commentaire": "Relation non renseignée ou non applicable" # Commentaire explicatif
+}
+
+
+def index_services(participants) -> dict:
+    """Index nom → service des participants (premier participant retenu en cas d'homonymes)."""
+    service_par_nom = {}
+    for p in participants:
+        service_par_nom.setdefault(p["nom"], p["service"])
+    return service_par_nom
+
+
+def construire_df_relations_completes(participants, relations_saisies, nombre_total_personnes, colonnes) -> pd.DataFrame:
+    """
+    Construit le DataFrame de TOUTES les relations possibles (saisies et neutres, y compris
+    celles impliquant des participants non nommés) pour la feuille 'Relations'.
+    Utilise un produit cartésien des personnes et une jointure gauche avec les relations
+    saisies, au lieu d'une double boucle Python. relations_saisies (liste de dictionnaires ou
+    DataFrame) doit contenir au plus une relation par paire (émetteur, récepteur) : la dernière saisie.
+    """
+    # Construire la liste de TOUS les participants (nommés + anonymes)
+    all_person_names = [p["nom"] for p in participants]
+    nb_anonymes = max(0, nombre_total_personnes - len(all_person_names))
+    all_person_names += [f"Personne Anonyme {i+1}" for i in range(nb_anonymes)]
+
+    personnes = pd.DataFrame({"Émetteur": all_person_names})
+    paires = personnes.merge(personnes.rename(columns={"Émetteur": "Récepteur"}), how="cross")
+    paires = paires[paires["Émetteur"] != paires["Récepteur"]].reset_index(drop=True)
+
+    df_saisies = pd.DataFrame(relations_saisies)
+    if df_saisies.empty:
+        df_relations = paires
+        neutres = pd.Series(True, index=paires.index)
+    else:
+        df_relations = paires.merge(df_saisies, on=["Émetteur", "Récepteur"], how="left", indicator=True)
+        neutres = df_relations.pop("_merge") == "left_only"
+
+    # S'assurer que toutes les colonnes définies existent dans le DataFrame
+    for col in colonnes:
+        if col not in df_relations.columns:
+            df_relations[col] = None
+
+    # Relations neutres : valeurs par défaut et service de l'émetteur (si nommé), sinon RAS
+    service_par_nom = index_services(participants)
+    services_neutres = df_relations["Émetteur"].map(service_par_nom).fillna("RAS")
+    df_relations["Service"] = df_relations["Service"].astype(object).mask(neutres, services_neutres)
+
+    for col, valeur in VALEURS_RELATION_NEUTRE.items():
+        if isinstance(valeur, str):
+            df_relations[col] = df_relations[col].astype(object).mask(neutres, valeur)
+        else:
+            df_relations[col] = df_relations[col].mask(neutres, valeur)
+            if not df_relations[col].isna().any():
+                df_relations[col] = df_relations[col].astype("int64")
+
+    # Réorganiser le DataFrame selon l'ordre des colonnes définies
+    return df_relations[colonnes]
+
+
+def _valeur_cellule(valeur):
+    """Convertit une valeur pandas en valeur de cellule (les NaN deviennent des cellules vides)."""
+    if valeur is None or valeur is pd.NA or (isinstance(valeur, float) and valeur != valeur):
+        return None
+    return valeur
+
+
+def ecrire_feuille_streaming(worksheet, df: pd.DataFrame, style_entete: bool = True, formats_colonnes=None):
+    """
+    Écrit un DataFrame ligne par ligne dans une feuille openpyxl en écriture seule
+    (mêmes en-têtes que DataFrame.to_excel : gras, bordures fines, centrés).
+    Une feuille pour un DataFrame sans colonnes reste vide, comme avec to_excel.
+    """
+    if len(df.columns) == 0:
+        return
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    formats_colonnes = formats_colonnes or {}
+
+    entete = []
+    for column_name in df.columns:
+        if style_entete:
+            cell = WriteOnlyCell(worksheet, value=column_name)
+            cell.font = Font(bold=True)
+            cell.border = Border(left=Side(style="thin"), right=Side(style="thin"),
+                                 top=Side(style="thin"), bottom=Side(style="thin"))
+            cell.alignment = Alignment(horizontal="center", vertical="top")
+            entete.append(cell)
+        else:
+            entete.append(column_name)
+    worksheet.append(entete)
+
+    # Colonnes avec un format numérique particulier (ex. pourcentage)
+    positions_formats = {df.columns.get_loc(col): fmt for col, fmt in formats_colonnes.items() if col in df.columns}
+
+    for row in df.itertuples(index=False, name=None):
+        valeurs = [_valeur_cellule(v) for v in row]
+        for col_idx, fmt in positions_formats.items():
+            cell = WriteOnlyCell(worksheet, value=valeurs[col_idx])
+            cell.number_format = fmt
+            valeurs[col_idx] = cell
+        worksheet.append(valeurs)
+
+
+# Types de vigilance considérés comme "négatifs" / "positifs" pour les relations croisées
+# NOTE: "Mixte tendu" indique un "pic négatif" car p_moins >= p_plus
+TYPES_VIGILANCE_CROISES_NEGATIFS = {"Négatif pur", "Négatif", "Mixte tendu"}
+TYPES_VIGILANCE_CROISES_POSITIFS = {"Positif pur", "Positif"}
+
+
+def detecter_relations_croisees(participants, registre: RegistreRelations):
+    """
+    Détecte en une seule passe sur les relations saisies les paires réciproques
+    (A → B et B → A) entre participants nommés, et les classe :
+    - négatives : "Conflit" (deux "Négatif pur") ou "Tension relationnelle" ;
+    - positives : "Harmonie Parfaite" (deux "Positif pur") ou "Harmonie Relationnelle".
+    La relation inverse est retrouvée dans l'index par paire du registre (clé inversée) :
+    le coût dépend du nombre de relations saisies et non du carré du nombre de participants.
+    Renvoie (relations_croisees_negatives, relations_croisees_positives), chacune étant
+    une liste de copies des relations avec une colonne "Type de Croisé", dans l'ordre des
+    participants (A → B puis B → A).
+    """
+    # Rang de chaque participant nommé : fixe le sens de lecture de la paire et l'ordre de sortie
+    rang_participant = {}
+    for i, p in enumerate(participants):
+        rang_participant.setdefault(p["nom"], i)
+
+    paires_negatives = []
+    paires_positives = []
+    for (p1, p2), rel_p1_to_p2 in registre.dernieres_par_paire():
+        rang_p1 = rang_participant.get(p1)
+        rang_p2 = rang_participant.get(p2)
+        # Chaque paire n'est traitée qu'une fois, depuis son participant de plus petit rang
+        if rang_p1 is None or rang_p2 is None or rang_p1 >= rang_p2:
+            continue
+        rel_p2_to_p1 = registre.derniere_relation(p2, p1)
+        if rel_p2_to_p1 is None:
+            continue
+
+        vigilance_p1_p2 = rel_p1_to_p2.vigilance
+        vigilance_p2_p1 = rel_p2_to_p1.vigilance
+        if vigilance_p1_p2 in TYPES_VIGILANCE_CROISES_NEGATIFS and vigilance_p2_p1 in TYPES_VIGILANCE_CROISES_NEGATIFS:
+            # "Conflit" si les deux sont "Négatif pur", sinon "Tension relationnelle"
+            if vigilance_p1_p2 == "Négatif pur" and vigilance_p2_p1 == "Négatif pur":
+                type_de_croise = "Conflit"
+            else:
+                type_de_croise = "Tension relationnelle"
+            paires_negatives.append((rang_p1, rang_p2, rel_p1_to_p2, rel_p2_to_p1, type_de_croise))
+        elif vigilance_p1_p2 in TYPES_VIGILANCE_CROISES_POSITIFS and vigilance_p2_p1 in TYPES_VIGILANCE_CROISES_POSITIFS:
+            # "Harmonie Parfaite" si les deux sont "Positif pur", sinon "Harmonie Relationnelle"
+            if vigilance_p1_p2 == "Positif pur" and vigilance_p2_p1 == "Positif pur":
+                type_de_croise = "Harmonie Parfaite"
+            else:
+                type_de_croise = "Harmonie Relationnelle"
+            paires_positives.append((rang_p1, rang_p2, rel_p1_to_p2, rel_p2_to_p1, type_de_croise))
+
+    def _aplatir(paires):
+        resultat = []
+        for _, _, rel_p1_to_p2, rel_p2_to_p1, type_de_croise in sorted(paires, key=lambda p: (p[0], p[1])):
+            for rel in (rel_p1_to_p2, rel_p2_to_p1):
+                rel_copy = rel.vers_dict()
+                rel_copy["Type de Croisé"] = type_de_croise
+                resultat.append(rel_copy)
+        return resultat
+
+    return _aplatir(paires_negatives), _aplatir(paires_positives)
+
+
+# Largeurs maximales des colonnes des feuilles de relations (les autres colonnes sont limitées à 15)
+PLAFONDS_LARGEUR_RELATIONS = {
+    "Commentaire": 100, # Limite pour le commentaire
+    "Date": 25, "Début": 25, "Fin": 25, "Service": 25, "Vigilance": 25,
+    "Type de Croisé": 25, "Type de Récap": 25,
+}
+PLAFOND_LARGEUR_PAR_DEFAUT = 15
+# Largeurs maximales des colonnes de la feuille 'Récapitulatif Vigilance'
+PLAFONDS_LARGEUR_STATS = {"Type de relation": 40, "Nombre de cas": 20, "Pourcentage": 20}
+# Mode échantillonné des largeurs (facultatif, désactivé par défaut : largeurs exactes) :
+# taille d'échantillon proposée pour les très grandes feuilles (option --echantillon-largeurs)
+TAILLE_ECHANTILLON_LARGEURS = 20000
+
+
+def _longueur_texte_max(serie: pd.Series) -> int:
+    """Longueur maximale de la représentation texte des valeurs d'une colonne (calcul vectorisé)."""
+    if serie.empty:
+        return 0
+    if pd.api.types.is_integer_dtype(serie):
+        # Pour des entiers, la plus longue représentation est celle du minimum ou du maximum
+        return max(len(str(serie.min())), len(str(serie.max())))
+    try:
+        longueurs = serie.str.len()
+    except AttributeError:
+        # Colonne sans aucune chaîne (flottants, booléens...) : longueurs de la conversion texte
+        return int(serie.astype(str).str.len().max())
+    # Valeurs non textuelles (nombres, None...) mêlées aux chaînes
+    non_textes = longueurs.isna()
+    if non_textes.any():
+        longueurs = longueurs.copy()
+        longueurs[non_textes] = serie[non_textes].astype(str).str.len()
+    return int(longueurs.max())
+
+
+def calculer_largeurs_colonnes(df: pd.DataFrame, colonnes, plafonds, plafond_par_defaut=None,
+                               taille_echantillon=None) -> list:
+    """
+    Largeur de chaque colonne d'après la plus longue valeur (ou l'en-tête) + 2, bornée par
+    plafonds[colonne] ou, à défaut, plafond_par_defaut.
+    Si taille_echantillon est fourni et que la feuille a plus de lignes, la largeur est
+    estimée sur un échantillon reproductible de cette taille (mode pour très grandes feuilles).
+    """
+    if taille_echantillon is not None and len(df) > taille_echantillon:
+        df = df.sample(n=taille_echantillon, random_state=0)
+
+    largeurs = []
+    for column_name in colonnes:
+        max_length = len(str(column_name))
+        if not df.empty:
+            max_length = max(max_length, _longueur_texte_max(df[column_name]))
+
+        adjusted_width = max_length + 2
+        plafond = plafonds.get(column_name, plafond_par_defaut)
+        if plafond is not None:
+            adjusted_width = min(adjusted_width, plafond)
+        largeurs.append(adjusted_width)
+    return largeurs
+
+
+def appliquer_largeurs_colonnes(worksheet, largeurs):
+    """Fixe les largeurs (dans l'ordre des colonnes) sur une feuille, avant l'écriture des lignes."""
+    from openpyxl.utils import get_column_letter
+
+    for col_idx, largeur in enumerate(largeurs):
+        worksheet.column_dimensions[get_column_letter(col_idx + 1)].width = largeur
+
+
+# Colonnes de la feuille 'Évolution Paires'
+COLONNES_EVOLUTION_PAIRES = [
+    "Vague précédente", "Vague", "Émetteur", "Récepteur", "Vigilance avant", "Vigilance après",
+    "Score Net avant", "Score Net après", "Évolution",
+]
+PLAFONDS_LARGEUR_VAGUES = {"Émetteur": 40, "Récepteur": 40, "Évolution": 25, "Vigilance avant": 20, "Vigilance après": 20}
+
+
+def tableau_vagues(registre: RegistreRelations) -> pd.DataFrame:
+    """
+    Distribution des vigilances par vague (une ligne par trimestre, ordre chronologique),
+    avec le total et sa variation par rapport à la vague précédente.
+    """
+    lignes = []
+    for periode in registre.periodes():
+        vigilance = registre.instantane_vague(periode)["vigilance"]
+        lignes.append({"Vague": periode, **{t: vigilance.get(t, 0) for t in TYPES_VIGILANCE}})
+    df_vagues = pd.DataFrame(lignes, columns=["Vague"] + TYPES_VIGILANCE)
+    df_vagues["Total"] = df_vagues[TYPES_VIGILANCE].sum(axis=1)
+    df_vagues["Variation du total"] = df_vagues["Total"].diff().fillna(0).astype("int64")
+    return df_vagues
+
+
+def evolution_paires_vagues(registre: RegistreRelations) -> pd.DataFrame:
+    """Évolution de chaque paire entre vagues successives (comparaisons mises en cache par le registre)."""
+    periodes = registre.periodes()
+    lignes = []
+    for periode_avant, periode_apres in zip(periodes, periodes[1:]):
+        lignes.extend(registre.comparer_vagues(periode_avant, periode_apres))
+    return pd.DataFrame(lignes, columns=COLONNES_EVOLUTION_PAIRES)
+
+
+# Colonnes et largeurs maximales de la feuille 'Matrice Services'
+COLONNES_MATRICE_SERVICES = [
+    "Service émetteur", "Service récepteur", "Relations", "Score Net", "Score Net moyen",
+    "Pics négatifs", "Paires couvertes", "Paires possibles", "Couverture",
+]
+PLAFONDS_LARGEUR_MATRICE_SERVICES = {"Service émetteur": 40, "Service récepteur": 40}
+# Largeurs maximales des feuilles 'Réseau Personnes' et 'Réseau Synthèse'
+PLAFONDS_LARGEUR_RESEAU = {"Personne": 40, "Service": 40, "Triangles déséquilibrés": 25, "Indicateur": 60}
+
+
+def calculer_matrice_services(table: TableRelations, participants, services) -> pd.DataFrame:
+    """
+    Matrice service émetteur × service récepteur (une ligne par couple de services, y compris
+    les couples sans relation) calculée par un groupby sur la table colonnaire des relations,
+    les services étant lus dans l'index nom → service des participants ("RAS" si inconnu) :
+    - "Relations", "Score Net" (somme), "Score Net moyen", "Pics négatifs" (somme des scores de pics négatifs) ;
+    - "Paires couvertes" : paires (émetteur, récepteur) distinctes ayant au moins une relation ;
+    - "Paires possibles" : paires de participants distincts entre les deux services ;
+    - "Couverture" : paires couvertes / paires possibles.
+    """
+    service_par_nom = index_services(participants)
+    # Personnes représentées par leurs codes de catégorie : les services ne sont cherchés
+    # qu'une fois par personne distincte
+    relations = pd.DataFrame({
+        "Émetteur": table.categories["Émetteur"].codes,
+        "Récepteur": table.categories["Récepteur"].codes,
+        "Score Net": table.scores["Score Net"],
+        "Pics négatifs": table.scores["Score Pic Négatif"],
+        "Service émetteur": table.projeter("Émetteur", service_par_nom, "RAS"),
+        "Service récepteur": table.projeter("Récepteur", service_par_nom, "RAS"),
+    })
+    couple = ["Service émetteur", "Service récepteur"]
+
+    # Services dans l'ordre de saisie, puis ceux trouvés uniquement chez les participants ou les relations
+    ordre_services = list(dict.fromkeys(
+        list(services) + list(service_par_nom.values())
+        + relations["Service émetteur"].tolist() + relations["Service récepteur"].tolist()
+    ))
+    index_complet = pd.MultiIndex.from_product([ordre_services, ordre_services], names=couple)
+
+    agregats = relations.groupby(couple, sort=False).agg(
+        **{"Relations": ("Score Net", "size"), "Score Net": ("Score Net", "sum"), "Pics négatifs": ("Pics négatifs", "sum")}
+    )
+    agregats["Paires couvertes"] = (
+        relations.drop_duplicates(["Émetteur", "Récepteur"]).groupby(couple, sort=False).size()
+    )
+    matrice = agregats.reindex(index_complet, fill_value=0).astype("int64")
+
+    effectifs = pd.Series(service_par_nom, dtype=object).value_counts()
+    effectif_emetteur = effectifs.reindex(matrice.index.get_level_values(0), fill_value=0).to_numpy()
+    effectif_recepteur = effectifs.reindex(matrice.index.get_level_values(1), fill_value=0).to_numpy()
+    meme_service = matrice.index.get_level_values(0) == matrice.index.get_level_values(1)
+    # Au sein d'un même service, une personne ne se note pas elle-même
+    matrice["Paires possibles"] = effectif_emetteur * effectif_recepteur - effectif_emetteur * meme_service
+
+    matrice["Score Net moyen"] = (matrice["Score Net"] / matrice["Relations"]).where(matrice["Relations"] > 0, 0.0)
+    matrice["Couverture"] = (matrice["Paires couvertes"] / matrice["Paires possibles"]).where(matrice["Paires possibles"] > 0, 0.0)
+    return matrice.reset_index()[COLONNES_MATRICE_SERVICES]
+
+
+# Colonnes des feuilles de relations du classeur Excel (ordre exact des colonnes)
+COLONNES_RELATIONS_EXCEL = [
+    "Émetteur", "Récepteur", "Date", "Début", "Fin", "Service",
+    "P+", "P-", "I+", "I-", "C+", "C-",
+    "Score Pic Positif", "Score Pic Négatif", "Score Net",
+    "Vigilance", "Commentaire"
+]
+# Nombre maximal de threads pour le calcul des feuilles (l'écriture reste séquentielle)
+NOMBRE_THREADS_EXPORT = min(8, os.cpu_count() or 1)
+
+
+def feuille_excel(titre: str, df: pd.DataFrame, colonnes, plafonds, plafond_par_defaut=None,
+                  taille_echantillon=None, style_entete: bool = True, formats_colonnes=None) -> dict:
+    """
+    Feuille prête à écrire : titre, DataFrame, largeurs de colonnes déjà calculées et
+    options de ecrire_feuille_streaming. Ne touche pas au classeur : peut être appelée
+    depuis un thread de calcul.
+    """
+    return {
+        "titre": titre,
+        "df": df,
+        "largeurs": calculer_largeurs_colonnes(df, colonnes, plafonds, plafond_par_defaut, taille_echantillon),
+        "style_entete": style_entete,
+        "formats_colonnes": formats_colonnes,
+    }
+
+
+def _ordonner_colonnes(df: pd.DataFrame, colonnes) -> pd.DataFrame:
+    """Ajoute les colonnes manquantes (vides) et réordonne ; un DataFrame vide est renvoyé tel quel."""
+    if df.empty:
+        return df
+    for col in colonnes:
+        if col not in df.columns:
+            df[col] = None
+    return df[colonnes]
+
+
+def recapitulatif_vigilance(compteurs_vigilance, nombre_relations: int, nombre_total_personnes: int) -> pd.DataFrame:
+    """
+    Statistiques de la feuille 'Récapitulatif Vigilance' : nombre et part de chaque type de
+    vigilance parmi toutes les combinaisons possibles, relations neutres globales et total.
+    """
+    # Calcul du nombre total de combinaisons possibles (basé sur nombre_total_personnes)
+    nombre_combinaisons_possibles = 0
+    if nombre_total_personnes > 1:
+        nombre_combinaisons_possibles = nombre_total_personnes * (nombre_total_personnes - 1)
+
+    # Calcul des relations neutres GLOBALES (nombre total possible - nombre de relations enregistrées)
+    relations_neutres_globales = max(0, nombre_combinaisons_possibles - nombre_relations)
+
+    # Ajouter les relations spécifiques (enregistrées), y compris les types à 0
+    stats_data = []
+    for rel_type in TYPES_VIGILANCE:
+        count = compteurs_vigilance.get(rel_type, 0)
+        percentage = (count / nombre_combinaisons_possibles) if nombre_combinaisons_possibles > 0 else 0.0
+        stats_data.append({"Type de relation": rel_type, "Nombre de cas": count, "Pourcentage": percentage})
+
+    # Ajouter les relations neutres globales
+    percentage_neutre_globale = (relations_neutres_globales / nombre_combinaisons_possibles) if nombre_combinaisons_possibles > 0 else 0.0
+    stats_data.append({"Type de relation": "Neutre (Global)", "Nombre de cas": relations_neutres_globales, "Pourcentage": percentage_neutre_globale})
+
+    # Ajouter la ligne "Total des combinaisons possibles" à la fin
+    total_pourcentage = 1.0 if nombre_combinaisons_possibles > 0 else 0.0
+    stats_data.append({"Type de relation": "Total des combinaisons possibles", "Nombre de cas": nombre_combinaisons_possibles, "Pourcentage": total_pourcentage})
+    return pd.DataFrame(stats_data)
+
+
+def calculer_feuilles_excel(registre: RegistreRelations, table: TableRelations, participants, services,
+                            nombre_total_personnes: int, nombre_threads: int = NOMBRE_THREADS_EXPORT,
+                            taille_echantillon: int = None) -> list:
+    """
+    Étape de calcul de l'export Excel : renvoie les feuilles (voir feuille_excel) dans l'ordre
+    du classeur. Les groupes de feuilles indépendants (Relations, statistiques, relations
+    unidirectionnelles, croisées, matrice des services, réseau, vagues) sont calculés en
+    parallèle dans un pool de threads ; 'Récap' est assemblée ensuite à partir des
+    unidirectionnelles et des croisées. Toutes les données sont passées en paramètres.
+    Avec nombre_threads=1, le calcul est séquentiel.
+    Par défaut, les largeurs de colonnes sont exactes ; avec taille_echantillon (par exemple
+    TAILLE_ECHANTILLON_LARGEURS), celles des feuilles de relations plus longues sont estimées
+    sur un échantillon de cette taille.
+    """
+    colonnes_croisees_excel = COLONNES_RELATIONS_EXCEL + ["Type de Croisé"]
+    colonnes_recap_excel = COLONNES_RELATIONS_EXCEL + ["Type de Croisé", "Type de Récap"]
+
+    def _relations():
+        # TOUTES les combinaisons bidirectionnelles possibles (saisies et neutres)
+        df_relations = construire_df_relations_completes(
+            participants,
+            table.vers_dataframe(COLONNES_RELATIONS_EXCEL, masque=table.dernieres_par_paire()),
+            nombre_total_personnes,
+            COLONNES_RELATIONS_EXCEL,
+        )
+        return [feuille_excel('Relations', df_relations, COLONNES_RELATIONS_EXCEL, PLAFONDS_LARGEUR_RELATIONS,
+                              PLAFOND_LARGEUR_PAR_DEFAUT, taille_echantillon)]
+
+    def _statistiques():
+        # Comptages des relations SAISIES (compteurs tenus à jour par le registre)
+        df_stats = recapitulatif_vigilance(registre.compteurs_vigilance(), len(registre), nombre_total_personnes)
+        return [feuille_excel('Récapitulatif Vigilance', df_stats, df_stats.columns, PLAFONDS_LARGEUR_STATS,
+                              style_entete=False, formats_colonnes={"Pourcentage": '0.00%'})]
+
+    def _unidirectionnelles():
+        # Relations avec une vigilance définie (excluant 'Aucune donnée', issue de P+=0 et P-=0)
+        df_unidirectional = pd.DataFrame()
+        if len(table):
+            df_unidirectional = table.vers_dataframe(
+                COLONNES_RELATIONS_EXCEL,
+                masque=np.asarray(table.categories["Vigilance"] != 'Aucune donnée'),
+            )
+        return [feuille_excel('Relations Unidirectionnelles', df_unidirectional, COLONNES_RELATIONS_EXCEL,
+                              PLAFONDS_LARGEUR_RELATIONS, PLAFOND_LARGEUR_PAR_DEFAUT, taille_echantillon)]
+
+    def _croisees():
+        # Paires réciproques négatives et positives, détectées en une seule passe sur les relations saisies
+        negatives, positives = detecter_relations_croisees(participants, registre)
+        return [
+            feuille_excel(titre, _ordonner_colonnes(pd.DataFrame(donnees), colonnes_croisees_excel),
+                          colonnes_croisees_excel, PLAFONDS_LARGEUR_RELATIONS, PLAFOND_LARGEUR_PAR_DEFAUT,
+                          taille_echantillon)
+            for titre, donnees in [('Relations Croisées Négatives', negatives),
+                                   ('Relations Croisées Positives', positives)]
+        ]
+
+    def _matrice_services():
+        df_matrice_services = calculer_matrice_services(table, participants, services)
+        return [feuille_excel('Matrice Services', df_matrice_services, COLONNES_MATRICE_SERVICES,
+                              PLAFONDS_LARGEUR_MATRICE_SERVICES, PLAFOND_LARGEUR_PAR_DEFAUT,
+                              formats_colonnes={"Score Net moyen": '0.00', "Couverture": '0.00%'})]
+
+    def _reseau():
+        df_reseau_personnes, df_reseau_synthese = GrapheRelations(registre, participants).analyser(
+            index_services(participants)
+        )
+        return [
+            feuille_excel('Réseau Personnes', df_reseau_personnes, COLONNES_ANALYSE_RESEAU, PLAFONDS_LARGEUR_RESEAU,
+                          PLAFOND_LARGEUR_PAR_DEFAUT, taille_echantillon,
+                          formats_colonnes={"Réciprocité": '0.00%'}),
+            feuille_excel('Réseau Synthèse', df_reseau_synthese, df_reseau_synthese.columns, PLAFONDS_LARGEUR_RESEAU,
+                          PLAFOND_LARGEUR_PAR_DEFAUT),
+        ]
+
+    def _vagues():
+        df_vagues = tableau_vagues(registre)
+        df_evolution_paires = evolution_paires_vagues(registre)
+        return [
+            feuille_excel('Vagues', df_vagues, df_vagues.columns, PLAFONDS_LARGEUR_VAGUES, PLAFOND_LARGEUR_PAR_DEFAUT),
+            feuille_excel('Évolution Paires', df_evolution_paires, COLONNES_EVOLUTION_PAIRES, PLAFONDS_LARGEUR_VAGUES,
+                          PLAFOND_LARGEUR_PAR_DEFAUT, taille_echantillon),
+        ]
+
+    def _recap(unidirectionnelles, croisees):
+        recap_dataframes = []
+        if not unidirectionnelles["df"].empty:
+            df_temp_uni = unidirectionnelles["df"].copy()
+            df_temp_uni['Type de Croisé'] = None  # Pas de type de croisé pour les unidirectionnelles
+            df_temp_uni['Type de Récap'] = 'Unidirectionnelle'
+            recap_dataframes.append(df_temp_uni)
+        for feuille, type_recap in zip(croisees, ['Négative Croisée', 'Positive Croisée']):
+            if not feuille["df"].empty:
+                df_temp = feuille["df"].copy()
+                df_temp['Type de Récap'] = type_recap
+                recap_dataframes.append(df_temp)
+
+        df_recap = pd.DataFrame()
+        if recap_dataframes:
+            df_recap = _ordonner_colonnes(pd.concat(recap_dataframes, ignore_index=True), colonnes_recap_excel)
+        return feuille_excel('Récap', df_recap, colonnes_recap_excel, PLAFONDS_LARGEUR_RELATIONS,
+                             PLAFOND_LARGEUR_PAR_DEFAUT, taille_echantillon)
+
+    # Groupes indépendants, du plus coûteux au moins coûteux pour équilibrer le pool
+    groupes = [_relations, _reseau, _croisees, _unidirectionnelles, _matrice_services, _vagues, _statistiques]
+    if nombre_threads > 1:
+        with ThreadPoolExecutor(max_workers=nombre_threads) as pool:
+            resultats = dict(zip(groupes, pool.map(lambda groupe: groupe(), groupes)))
+    else:
+        resultats = {groupe: groupe() for groupe in groupes}
+
+    recap = _recap(resultats[_unidirectionnelles][0], resultats[_croisees])
+    return (resultats[_relations] + resultats[_statistiques] + resultats[_unidirectionnelles]
+            + resultats[_croisees] + [recap] + resultats[_matrice_services]
+            + resultats[_reseau] + resultats[_vagues])
+
+
+def ecrire_classeur_excel(feuilles) -> bytes:
+    """
+    Étape d'écriture, séquentielle : écrit les feuilles calculées (voir calculer_feuilles_excel)
+    dans un classeur en écriture seule et renvoie le contenu du fichier .xlsx.
+    Les lignes sont écrites au fil de l'eau au lieu d'être toutes conservées en mémoire sous
+    forme de cellules openpyxl jusqu'à l'enregistrement ; les largeurs de colonnes sont donc
+    fixées AVANT l'écriture des lignes.
+    openpyxl n'est importé qu'ici, à la première exportation, et non au chargement du module.
+    """
+    import openpyxl
+
+    workbook = openpyxl.Workbook(write_only=True)
+    for feuille in feuilles:
+        worksheet = workbook.create_sheet(title=feuille["titre"])
+        appliquer_largeurs_colonnes(worksheet, feuille["largeurs"])
+        ecrire_feuille_streaming(worksheet, feuille["df"], style_entete=feuille["style_entete"],
+                                 formats_colonnes=feuille["formats_colonnes"])
+
+    output = io.BytesIO()
+    workbook.save(output)
+    output.seek(0)
+    return output.getvalue()
+
+
+def classeur_excel(registre: RegistreRelations, participants, services, nombre_total_personnes: int,
+                   table: TableRelations = None, nombre_threads: int = NOMBRE_THREADS_EXPORT,
+                   taille_echantillon: int = None) -> bytes:
+    """
+    Classeur Excel complet du projet (feuilles calculées en parallèle puis écrites l'une après
+    l'autre). table peut être fournie si elle est déjà construite pour cette version du registre ;
+    taille_echantillon active le mode échantillonné des largeurs (voir calculer_feuilles_excel).
+    """
+    if table is None:
+        table = TableRelations(registre)
+    feuilles = calculer_feuilles_excel(registre, table, participants, services, nombre_total_personnes,
+                                       nombre_threads=nombre_threads, taille_echantillon=taille_echantillon)
+    return ecrire_classeur_excel(feuilles)
+
+
+# === JSON ET ARCHIVE DU PROJET ===============================================
+# Noms des fichiers dans l'archive ZIP du projet
+NOM_FICHIER_JSON_ARCHIVE = "barometre_projet.json"
+NOM_FICHIER_EXCEL_ARCHIVE = "relations_barometre.xlsx"
+
+
+def projet_vers_json(participants, services, registre: RegistreRelations, nombre_total_personnes: int) -> str:
+    """Projet au format JSON (participants, services, relations saisies, nombre total de personnes)."""
+    data = {
+        "participants": participants,
+        "services": services,
+        "relations_saisies": registre.vers_liste(),
+        "nombre_total_personnes": nombre_total_personnes,
+    }
+    return json.dumps(data, indent=4, ensure_ascii=False)
+
+
+def projet_depuis_json(contenu: dict) -> dict:
+    """
+    Projet lu depuis le contenu d'un fichier JSON : participants, services, relations
+    (RegistreRelations, doublons de clé ignorés) et nombre total de personnes.
+    """
+    return {
+        "participants": contenu.get("participants", []),
+        "services": contenu.get("services", []),
+        "relations": RegistreRelations(contenu.get("relations_saisies", [])),
+        "nombre_total_personnes": contenu.get("nombre_total_personnes", 0),
+    }
+
+
+def archive_zip(donnees_json: str, donnees_excel: bytes) -> io.BytesIO:
+    """Crée un fichier ZIP contenant le JSON et l'Excel des données du projet."""
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(NOM_FICHIER_JSON_ARCHIVE, donnees_json)
+        zf.writestr(NOM_FICHIER_EXCEL_ARCHIVE, donnees_excel)
+    zip_buffer.seek(0)
+    return zip_buffer
@@ -0,0 +1,712 @@
+"""
+Modèle du baromètre relationnel : règles de vigilance, registre indexé des relations
+et de la table des personnes, représentation colonnaire (sans dépendance à Streamlit).
+"""
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+
+# === LOGIQUE MÉTIER ==========================================================
+# Types de vigilance d'une relation saisie
+TYPES_VIGILANCE = ["Positif pur", "Positif", "Mixte positif", "Mixte tendu", "Négatif pur", "Négatif", "Aucune donnée"]
+
+def _regles_vigilance(p_plus: int, p_moins: int) -> str:
+    """
+    Règles de classification d'une relation en fonction des scores positifs (p_plus) et négatifs (p_moins).
+    Met à jour la logique pour "Positif pur" (3 P+) et introduit "Positif" (1 ou 2 P+),
+    ainsi que "Négatif pur" (3 P-) et "Négatif" (1 ou 2 P-).
+    """
+    if p_plus == 3 and p_moins == 0:
+        return "Positif pur" # Réservé aux trois pics positifs (P+, I+, C+)
+    elif p_plus == 0 and p_moins == 3:
+        return "Négatif pur" # Réservé aux trois pics négatifs (P-, I-, C-)
+    elif (p_plus == 1 or p_plus == 2) and p_moins == 0:
+        return "Positif" # Pour un ou deux pics positifs, sans négatif
+    elif p_plus == 0 and (p_moins == 1 or p_moins == 2):
+        return "Négatif" # Pour un ou deux pics négatifs, sans positif
+    elif p_plus > 0 and p_moins > 0 and p_plus > p_moins:
+        return "Mixte positif"
+    elif p_plus > 0 and p_moins > 0 and p_plus <= p_moins:
+        return "Mixte tendu"
+    # Si les deux sont à 0, ou des états invalides, classer comme "Aucune donnée"
+    return "Aucune donnée"
+
+
+# Table 4×4 précalculée : TABLE_VIGILANCE[p_plus][p_moins] pour p_plus, p_moins dans 0..3,
+# et la même table aplatie (indice p_plus * 4 + p_moins) en codes de TYPES_VIGILANCE.
+# Seules les valeurs entières de SCORES_TABLE_VIGILANCE (1.0 compris) sont lues dans la table ;
+# toute autre valeur (1.5, -1, 4, ...) est classée par les règles.
+SCORES_TABLE_VIGILANCE = (0, 1, 2, 3)
+TABLE_VIGILANCE = tuple(tuple(_regles_vigilance(pp, pm) for pm in range(4)) for pp in range(4))
+CODES_TABLE_VIGILANCE = pd.Series(
+    [TYPES_VIGILANCE.index(TABLE_VIGILANCE[pp][pm]) for pp in range(4) for pm in range(4)], dtype="int8"
+).to_numpy()
+
+
+class AnalyseRelationnelle:
+    """Classe utilitaire pour calculer la vigilance d’une relation."""
+    def __init__(self, relations_saisies):
+        self.relations = relations_saisies
+
+    @staticmethod
+    def classer_relation(p_plus: int, p_moins: int) -> str:
+        """
+        Classifie une relation en fonction des scores positifs (p_plus) et négatifs (p_moins),
+        par lecture dans TABLE_VIGILANCE (règles détaillées dans _regles_vigilance).
+        """
+        if p_plus in SCORES_TABLE_VIGILANCE and p_moins in SCORES_TABLE_VIGILANCE:
+            return TABLE_VIGILANCE[int(p_plus)][int(p_moins)]
+        return _regles_vigilance(p_plus, p_moins)
+
+    @staticmethod
+    def classer_relations(p_plus, p_moins):
+        """
+        Version par lot de classer_relation : p_plus et p_moins sont des séquences de scores
+        (listes, tableaux ou Series de même longueur). Renvoie un pd.Categorical de catégories
+        TYPES_VIGILANCE, ou une Series catégorielle de même index si p_plus est une Series.
+        Les scores qui ne sont pas des entiers de 0..3 (états invalides, valeurs non entières)
+        sont classés un à un par les règles, comme dans classer_relation.
+        """
+        pp_brut = pd.Series(p_plus).to_numpy()
+        pm_brut = pd.Series(p_moins).to_numpy()
+        pp, pp_dans_table = AnalyseRelationnelle._scores_dans_table(pp_brut)
+        pm, pm_dans_table = AnalyseRelationnelle._scores_dans_table(pm_brut)
+        dans_table = pp_dans_table & pm_dans_table
+        codes = CODES_TABLE_VIGILANCE[(pp * 4 + pm) * dans_table]
+        if not dans_table.all():
+            codes = codes.copy()
+            for position in (~dans_table).nonzero()[0]:
+                codes[position] = TYPES_VIGILANCE.index(_regles_vigilance(pp_brut[position], pm_brut[position]))
+        vigilances = pd.Categorical.from_codes(codes, categories=TYPES_VIGILANCE)
+        if isinstance(p_plus, pd.Series):
+            return pd.Series(vigilances, index=p_plus.index, name="Vigilance")
+        return vigilances
+
+    @staticmethod
+    def _scores_dans_table(valeurs: np.ndarray):
+        """
+        Scores en entiers int64 (0 hors de la table) et masque des valeurs lisibles dans
+        TABLE_VIGILANCE, selon le même test d'appartenance que classer_relation.
+        """
+        if valeurs.dtype.kind in "biu":
+            dans_table = (valeurs >= 0) & (valeurs <= 3)
+        elif valeurs.dtype.kind == "f":
+            dans_table = np.isin(valeurs, SCORES_TABLE_VIGILANCE)
+        else:
+            dans_table = np.fromiter((v in SCORES_TABLE_VIGILANCE for v in valeurs), dtype=bool, count=len(valeurs))
+        return np.where(dans_table, valeurs, 0).astype("int64"), dans_table
+
+# === REGISTRE DES RELATIONS ==================================================
+FORMAT_DATE = "%d/%m/%Y"
+
+
+@lru_cache(maxsize=4096)
+def analyser_date(texte):
+    """Date d'une relation ("%d/%m/%Y") en datetime.date, ou None si absente ou invalide (résultat mis en cache)."""
+    try:
+        return datetime.strptime(texte, FORMAT_DATE).date()
+    except (TypeError, ValueError):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def periode_vague(jour) -> str:
+    """Vague (trimestre) d'une date : "2025-T1", ... ; None si la date est inconnue."""
+    return f"{jour.year}-T{(jour.month - 1) // 3 + 1}" if jour is not None else None
+
+
+# Champs d'une relation saisie, dans l'ordre du schéma JSON / des colonnes Excel
+CHAMPS_RELATION = [
+    "Émetteur", "Récepteur", "Date", "Début", "Fin", "Service",
+    "P+", "P-", "I+", "I-", "C+", "C-",
+    "Score Pic Positif", "Score Pic Négatif", "Score Net",
+    "Vigilance", "Commentaire"
+]
+
+
+class RegistrePersonnes:
+    """
+    Table des personnes (participants et personnes citées dans les relations) :
+    chaque nom reçoit un identifiant entier stable, que les relations référencent.
+    Renommer une personne ne modifie que cette table (O(1)) : les relations et les index
+    du registre, tous indexés par identifiant, n'ont pas à être réécrits.
+    """
+
+    def __init__(self):
+        self.noms = []      # id → nom (liste partagée avec les relations)
+        self._ids = {}      # nom → id
+        self.version = 0    # incrémentée à chaque renommage (invalide les résultats nommés)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def identifiant(self, nom: str) -> int:
+        """Identifiant de la personne, créé à la première rencontre du nom."""
+        id_personne = self._ids.get(nom)
+        if id_personne is None:
+            id_personne = self._ids[nom] = len(self.noms)
+            self.noms.append(nom)
+        return id_personne
+
+    def chercher(self, nom: str):
+        """Identifiant de la personne, ou None si le nom est inconnu."""
+        return self._ids.get(nom)
+
+    def nom(self, id_personne: int) -> str:
+        return self.noms[id_personne]
+
+    def renommer(self, id_personne: int, nouveau_nom: str):
+        """
+        Donne un nouveau nom à l'identifiant (O(1)). Si le nouveau nom était déjà associé à un
+        autre identifiant, cette association est retirée : l'appelant s'assure qu'il n'est plus référencé.
+        """
+        ancien_nom = self.noms[id_personne]
+        if self._ids.get(ancien_nom) == id_personne:
+            del self._ids[ancien_nom]
+        self._ids[nouveau_nom] = id_personne
+        self.noms[id_personne] = nouveau_nom
+        self.version += 1
+
+    def oublier(self, nom: str):
+        """Retire le nom de la table (son identifiant n'est plus attribué à personne)."""
+        self._ids.pop(nom, None)
+        self.version += 1
+
+
+class Relation:
+    """
+    Relation saisie, stockée sous forme compacte (slots) dans le registre.
+    L'émetteur et le récepteur sont des identifiants de la table des personnes ;
+    leurs noms (emetteur, recepteur) sont lus dans cette table.
+    """
+    __slots__ = (
+        "id", "id_emetteur", "id_recepteur", "date", "debut", "fin", "service",
+        "p_plus", "p_moins", "i_plus", "i_moins", "c_plus", "c_moins",
+        "score_pic_positif", "score_pic_negatif", "score_net",
+        "vigilance", "commentaire",
+        "jour", "periode", "noms",
+    )
+
+    def __init__(self, id_relation: int, donnees: dict, personnes: RegistrePersonnes):
+        self.id = id_relation
+        self.noms = personnes.noms
+        self.id_emetteur = personnes.identifiant(donnees.get("Émetteur"))
+        self.id_recepteur = personnes.identifiant(donnees.get("Récepteur"))
+        for champ, attribut in ATTRIBUTS_RELATION.items():
+            if champ not in ("Émetteur", "Récepteur"):
+                setattr(self, attribut, donnees.get(champ))
+        # Date typée et vague, analysées une seule fois à la création (non sérialisées)
+        self.jour = analyser_date(self.date)
+        self.periode = periode_vague(self.jour)
+
+    @classmethod
+    def depuis_ligne(cls, ligne, personnes: RegistrePersonnes):
+        """Relation construite directement à partir d'une ligne (id, puis valeurs dans l'ordre de CHAMPS_RELATION)."""
+        relation = cls.__new__(cls)
+        relation.id = ligne[0]
+        relation.noms = personnes.noms
+        relation.id_emetteur = personnes.identifiant(ligne[1])
+        relation.id_recepteur = personnes.identifiant(ligne[2])
+        for attribut, valeur in zip(cls.__slots__[3:], ligne[3:len(CHAMPS_RELATION) + 1]):
+            setattr(relation, attribut, valeur)
+        relation.jour = analyser_date(relation.date)
+        relation.periode = periode_vague(relation.jour)
+        return relation
+
+    @property
+    def emetteur(self) -> str:
+        return self.noms[self.id_emetteur]
+
+    @property
+    def recepteur(self) -> str:
+        return self.noms[self.id_recepteur]
+
+    @property
+    def cle(self) -> tuple:
+        """Clé primaire interne : (id Émetteur, id Récepteur, Date, Début, Fin)."""
+        return (self.id_emetteur, self.id_recepteur, self.date, self.debut, self.fin)
+
+    def vers_dict(self) -> dict:
+        """Relation au format du schéma JSON (clés "Émetteur", "P+", ...)."""
+        return {champ: getattr(self, attribut) for champ, attribut in ATTRIBUTS_RELATION.items()}
+
+
+# Correspondance champ JSON → attribut de Relation
+ATTRIBUTS_RELATION = dict(zip(
+    CHAMPS_RELATION, ("emetteur", "recepteur") + Relation.__slots__[3:1 + len(CHAMPS_RELATION)]
+))
+
+
+class RegistreRelations:
+    """
+    Registre indexé des relations saisies, remplaçant la liste de dictionnaires.
+    - table des personnes (RegistrePersonnes) : nom ↔ identifiant entier stable ;
+    - index primaire : clé (Émetteur, Récepteur, Date, Début, Fin) → relation ;
+    - index secondaire par personne (émetteur ou récepteur) → identifiants ;
+    - index par paire (Émetteur, Récepteur) → identifiants, dans l'ordre de saisie.
+    Tous les index sont indexés par identifiant de personne et non par nom.
+    Ajout, recherche et suppression sont en O(1) ; suppression d'une personne en
+    O(nombre de relations de cette personne) ; renommage en O(1) (hors fusion avec
+    une personne qui a déjà des relations, en O(degré)).
+    Les relations sont conservées dans l'ordre de saisie et se sérialisent au schéma JSON actuel.
+    L'index primaire sert d'ensemble de clés pour détecter les doublons en O(1) ; il est tenu
+    à jour par ajouter, supprimer, renommer_personne et à l'import (doublons ignorés).
+    Des compteurs de vigilance (global, par service de l'émetteur, par personne émettrice et
+    réceptrice) sont mis à jour en même temps que les index : les récapitulatifs les lisent
+    en O(1) au lieu de recompter toutes les relations (contrôle : verifier_compteurs).
+    Un index par vague (trimestre de la date) permet de résumer chaque vague et de comparer
+    deux vagues successives ; ces résultats sont mis en cache et ne sont recalculés que pour
+    les vagues modifiées depuis (numéro de version par vague).
+    """
+
+    def __init__(self, relations=()):
+        self.personnes = RegistrePersonnes()
+        self._relations = {}    # id → Relation (ordre de saisie)
+        self._par_cle = {}      # clé primaire interne → id
+        self._par_personne = {} # id personne → {id: None}
+        self._par_paire = {}    # (id émetteur, id récepteur) → {id: None}
+        self._vigilance = Counter()             # vigilance → nombre de relations
+        self._vigilance_par_service = {}        # service de l'émetteur → Counter(vigilance)
+        self._vigilance_emises = {}             # id émetteur → Counter(vigilance)
+        self._vigilance_recues = {}             # id récepteur → Counter(vigilance)
+        self._par_periode = {}                  # vague → {id: None}
+        self._version_periode = Counter()       # vague → nombre de modifications
+        self._instantanes = {}                  # vague → (version, instantané)
+        self._comparaisons = {}                 # (vague, vague) → (versions, lignes)
+        self._modifications = None              # opérations à enregistrer (si suivies)
+        self._prochain_id = 0
+        for rel in relations:
+            if self._cle_depuis_dict(rel) not in self:
+                self.ajouter(rel)
+
+    @classmethod
+    def depuis_lignes(cls, lignes):
+        """
+        Registre reconstruit à partir de lignes (id, puis valeurs dans l'ordre de CHAMPS_RELATION),
+        par exemple lues dans l'espace de travail : les identifiants sont conservés.
+        """
+        registre = cls()
+        for ligne in lignes:
+            relation = Relation.depuis_ligne(ligne, registre.personnes)
+            registre._relations[relation.id] = relation
+            registre._indexer(relation)
+        registre._prochain_id = max(registre._relations, default=-1) + 1
+        return registre
+
+    def suivre_modifications(self):
+        """Active l'enregistrement des opérations (ajout, suppression, renommage) pour extraire_modifications."""
+        self._modifications = []
+
+    def extraire_modifications(self) -> list:
+        """
+        Renvoie et vide la liste des opérations depuis le dernier appel :
+        ("ajout", Relation), ("suppression", id, clé) ou ("renommage", ancien_nom, nouveau_nom),
+        la clé (Émetteur, Récepteur, Date, Début, Fin) étant exprimée avec les noms au moment
+        de la suppression.
+        Liste vide si les modifications ne sont pas suivies.
+        """
+        modifications = self._modifications or []
+        if self._modifications is not None:
+            self._modifications = []
+        return modifications
+
+    @staticmethod
+    def _cle_depuis_dict(rel: dict) -> tuple:
+        return (rel.get("Émetteur"), rel.get("Récepteur"), rel.get("Date"), rel.get("Début"), rel.get("Fin"))
+
+    def __len__(self):
+        return len(self._relations)
+
+    def __bool__(self):
+        return bool(self._relations)
+
+    def __iter__(self):
+        """Parcourt les relations (objets Relation) dans l'ordre de saisie."""
+        return iter(self._relations.values())
+
+    def _cle_interne(self, cle: tuple):
+        """Clé (Émetteur, Récepteur, Date, Début, Fin) → clé interne par identifiants, ou None si une personne est inconnue."""
+        id_emetteur = self.personnes.chercher(cle[0])
+        id_recepteur = self.personnes.chercher(cle[1])
+        if id_emetteur is None or id_recepteur is None:
+            return None
+        return (id_emetteur, id_recepteur, *cle[2:])
+
+    def __contains__(self, cle) -> bool:
+        """Teste une clé (Émetteur, Récepteur, Date, Début, Fin) exprimée avec les noms."""
+        return self._cle_interne(cle) in self._par_cle
+
+    def get(self, id_relation: int):
+        return self._relations.get(id_relation)
+
+    def _indexer(self, relation: Relation):
+        self._par_cle[relation.cle] = relation.id
+        for id_personne in (relation.id_emetteur, relation.id_recepteur):
+            self._par_personne.setdefault(id_personne, {})[relation.id] = None
+        self._par_paire.setdefault((relation.id_emetteur, relation.id_recepteur), {})[relation.id] = None
+        self._vigilance[relation.vigilance] += 1
+        self._incrementer_par_cle(self._vigilance_par_service, relation.service, relation.vigilance)
+        self._incrementer_par_cle(self._vigilance_emises, relation.id_emetteur, relation.vigilance)
+        self._incrementer_par_cle(self._vigilance_recues, relation.id_recepteur, relation.vigilance)
+        if relation.periode is not None:
+            self._par_periode.setdefault(relation.periode, {})[relation.id] = None
+            self._version_periode[relation.periode] += 1
+
+    @staticmethod
+    def _incrementer_par_cle(compteurs_par_cle: dict, cle, vigilance):
+        # Pas de setdefault(cle, Counter()) : il construirait un Counter à chaque appel
+        compteurs = compteurs_par_cle.get(cle)
+        if compteurs is None:
+            compteurs = compteurs_par_cle[cle] = Counter()
+        compteurs[vigilance] += 1
+
+    @staticmethod
+    def _decrementer(compteurs: Counter, vigilance):
+        """Décrémente un compteur en retirant les entrées tombées à zéro."""
+        compteurs[vigilance] -= 1
+        if not compteurs[vigilance]:
+            del compteurs[vigilance]
+
+    def _decrementer_par_cle(self, compteurs_par_cle: dict, cle, vigilance):
+        compteurs = compteurs_par_cle[cle]
+        self._decrementer(compteurs, vigilance)
+        if not compteurs:
+            del compteurs_par_cle[cle]
+
+    def _desindexer(self, relation: Relation):
+        del self._par_cle[relation.cle]
+        for id_personne in (relation.id_emetteur, relation.id_recepteur):
+            ids = self._par_personne.get(id_personne)
+            if ids is not None:
+                ids.pop(relation.id, None)
+                if not ids:
+                    del self._par_personne[id_personne]
+        paire = (relation.id_emetteur, relation.id_recepteur)
+        ids = self._par_paire[paire]
+        del ids[relation.id]
+        if not ids:
+            del self._par_paire[paire]
+        self._decrementer(self._vigilance, relation.vigilance)
+        self._decrementer_par_cle(self._vigilance_par_service, relation.service, relation.vigilance)
+        self._decrementer_par_cle(self._vigilance_emises, relation.id_emetteur, relation.vigilance)
+        self._decrementer_par_cle(self._vigilance_recues, relation.id_recepteur, relation.vigilance)
+        if relation.periode is not None:
+            ids = self._par_periode[relation.periode]
+            del ids[relation.id]
+            if not ids:
+                del self._par_periode[relation.periode]
+            self._version_periode[relation.periode] += 1
+
+    def ajouter(self, donnees: dict) -> Relation:
+        """Ajoute une relation (dictionnaire au schéma JSON). Lève ValueError si la clé existe déjà."""
+        relation = Relation(self._prochain_id, donnees, self.personnes)
+        if relation.cle in self._par_cle:
+            raise ValueError("Une relation avec le même émetteur, récepteur, date, heure de début et heure de fin existe déjà.")
+        self._prochain_id += 1
+        self._relations[relation.id] = relation
+        self._indexer(relation)
+        if self._modifications is not None:
+            self._modifications.append(("ajout", relation))
+        return relation
+
+    def supprimer(self, ids_relations) -> int:
+        """Supprime les relations d'identifiants donnés ; renvoie le nombre de relations supprimées."""
+        nb_supprimees = 0
+        for id_relation in ids_relations:
+            relation = self._relations.pop(id_relation, None)
+            if relation is not None:
+                self._desindexer(relation)
+                nb_supprimees += 1
+                if self._modifications is not None:
+                    cle = (relation.emetteur, relation.recepteur, relation.date, relation.debut, relation.fin)
+                    self._modifications.append(("suppression", id_relation, cle))
+        return nb_supprimees
+
+    def relations_de(self, nom: str) -> list:
+        """Relations dont la personne est émetteur ou récepteur (O(degré))."""
+        return [self._relations[i] for i in self._par_personne.get(self.personnes.chercher(nom), ())]
+
+    def supprimer_personne(self, nom: str) -> int:
+        """Supprime toutes les relations impliquant la personne (O(degré))."""
+        return self.supprimer(list(self._par_personne.get(self.personnes.chercher(nom), ())))
+
+    def renommer_personne(self, ancien_nom: str, nouveau_nom: str):
+        """
+        Renomme une personne : seule la table des personnes change (O(1)).
+        Si le nouveau nom désigne une personne qui a déjà des relations, les deux personnes
+        sont fusionnées en O(degré) ; lève alors ValueError si la fusion créerait un doublon
+        de clé primaire.
+        """
+        if ancien_nom == nouveau_nom:
+            return
+        id_ancien = self.personnes.chercher(ancien_nom)
+        id_nouveau = self.personnes.chercher(nouveau_nom)
+        if id_ancien is not None:
+            if id_nouveau is None or id_nouveau not in self._par_personne:
+                self.personnes.renommer(id_ancien, nouveau_nom)
+            else:
+                self._fusionner_personnes(id_ancien, id_nouveau, nouveau_nom)
+        if self._modifications is not None:
+            self._modifications.append(("renommage", ancien_nom, nouveau_nom))
+
+    def _fusionner_personnes(self, id_ancien: int, id_nouveau: int, nouveau_nom: str):
+        """Reporte les relations de id_ancien sur id_nouveau (O(degré de id_ancien))."""
+        relations = [self._relations[i] for i in self._par_personne.get(id_ancien, ())]
+
+        def _remplacer(id_personne):
+            return id_nouveau if id_personne == id_ancien else id_personne
+
+        nouvelles_cles = set()
+        for relation in relations:
+            cle = (_remplacer(relation.id_emetteur), _remplacer(relation.id_recepteur),
+                   relation.date, relation.debut, relation.fin)
+            if (cle in self._par_cle and self._par_cle[cle] not in self._par_personne[id_ancien]) or cle in nouvelles_cles:
+                raise ValueError(f"Renommage impossible : « {nouveau_nom} » a déjà une relation identique.")
+            nouvelles_cles.add(cle)
+
+        for relation in relations:
+            self._desindexer(relation)
+        for relation in relations:
+            relation.id_emetteur = _remplacer(relation.id_emetteur)
+            relation.id_recepteur = _remplacer(relation.id_recepteur)
+            self._indexer(relation)
+        # Les relations réindexées ont été ajoutées en fin d'index : on rétablit l'ordre de saisie
+        # (identifiants croissants), dont dépend la « dernière relation » de chaque paire.
+        self._trier_par_id(self._par_personne, id_nouveau)
+        for paire in {(relation.id_emetteur, relation.id_recepteur) for relation in relations}:
+            self._trier_par_id(self._par_paire, paire)
+        for periode in {relation.periode for relation in relations} - {None}:
+            self._trier_par_id(self._par_periode, periode)
+        self.personnes.oublier(self.personnes.nom(id_ancien))
+
+    @staticmethod
+    def _trier_par_id(index: dict, cle):
+        ids = index[cle]
+        index[cle] = dict.fromkeys(sorted(ids))
+
+    def derniere_relation(self, emetteur: str, recepteur: str):
+        """Dernière relation saisie pour la paire ordonnée (émetteur, récepteur), ou None."""
+        ids = self._par_paire.get((self.personnes.chercher(emetteur), self.personnes.chercher(recepteur)))
+        return self._relations[next(reversed(ids))] if ids else None
+
+    def dernieres_par_paire(self):
+        """Parcourt ((émetteur, récepteur), dernière relation saisie) pour chaque paire ordonnée."""
+        noms = self.personnes.noms
+        for (id_emetteur, id_recepteur), ids in self._par_paire.items():
+            yield (noms[id_emetteur], noms[id_recepteur]), self._relations[next(reversed(ids))]
+
+    def compteurs_vigilance(self) -> Counter:
+        """Nombre de relations par type de vigilance (compteur tenu à jour, ne pas modifier)."""
+        return self._vigilance
+
+    def compteurs_par_service(self) -> dict:
+        """Service de l'émetteur → Counter(vigilance) (compteurs tenus à jour, ne pas modifier)."""
+        return self._vigilance_par_service
+
+    def compteurs_personne(self, nom: str):
+        """(Counter des vigilances émises, Counter des vigilances reçues) pour une personne."""
+        id_personne = self.personnes.chercher(nom)
+        return self._vigilance_emises.get(id_personne, Counter()), self._vigilance_recues.get(id_personne, Counter())
+
+    def verifier_compteurs(self) -> list:
+        """
+        Contrôle de cohérence : recalcule tous les compteurs de vigilance à partir des relations
+        et les compare aux compteurs incrémentaux. Renvoie la liste des écarts (vide si cohérent).
+        """
+        attendu = Counter()
+        par_service, emises, recues = {}, {}, {}
+        for relation in self._relations.values():
+            attendu[relation.vigilance] += 1
+            par_service.setdefault(relation.service, Counter())[relation.vigilance] += 1
+            emises.setdefault(relation.id_emetteur, Counter())[relation.vigilance] += 1
+            recues.setdefault(relation.id_recepteur, Counter())[relation.vigilance] += 1
+
+        ecarts = []
+        if attendu != self._vigilance:
+            ecarts.append(f"Vigilance : {dict(self._vigilance)} au lieu de {dict(attendu)}")
+        for libelle, calcule, incremental, nommer in [
+            ("Service", par_service, self._vigilance_par_service, str),
+            ("Émetteur", emises, self._vigilance_emises, self.personnes.nom),
+            ("Récepteur", recues, self._vigilance_recues, self.personnes.nom),
+        ]:
+            for cle in calcule.keys() | incremental.keys():
+                if calcule.get(cle) != incremental.get(cle):
+                    ecarts.append(f"{libelle} « {nommer(cle)} » : {dict(incremental.get(cle, {}))} au lieu de {dict(calcule.get(cle, {}))}")
+        return ecarts
+
+    def periodes(self) -> list:
+        """Vagues (trimestres) présentes dans les relations, dans l'ordre chronologique."""
+        return sorted(self._par_periode)
+
+    def instantane_vague(self, periode: str) -> dict:
+        """
+        Résumé d'une vague : {"vigilance": Counter, "paires": {(id émetteur, id récepteur): dernière
+        relation de la vague}}. Calculé à partir des seules relations de la vague et réutilisé tant
+        que la vague n'a pas été modifiée.
+        """
+        version = self._version_periode[periode]
+        en_cache = self._instantanes.get(periode)
+        if en_cache is not None and en_cache[0] == version:
+            return en_cache[1]
+        vigilance = Counter()
+        paires = {}
+        for id_relation in self._par_periode.get(periode, ()):
+            relation = self._relations[id_relation]
+            vigilance[relation.vigilance] += 1
+            paire = (relation.id_emetteur, relation.id_recepteur)
+            if paire not in paires or paires[paire].id < relation.id:
+                paires[paire] = relation
+        instantane = {"vigilance": vigilance, "paires": paires}
+        self._instantanes[periode] = (version, instantane)
+        return instantane
+
+    def comparer_vagues(self, periode_avant: str, periode_apres: str) -> list:
+        """
+        Évolution de chaque paire (émetteur, récepteur) entre deux vagues : liste de dictionnaires
+        (vigilances et scores nets avant / après, "Évolution" : Amélioration, Dégradation, Stable,
+        Changement de vigilance, Nouvelle ou Disparue). Mis en cache par versions des deux vagues
+        (et de la table des personnes, pour les noms) : l'ajout d'une vague ne recalcule que les
+        comparaisons qui la concernent.
+        """
+        cle = (periode_avant, periode_apres)
+        versions = (self._version_periode[periode_avant], self._version_periode[periode_apres],
+                    self.personnes.version)
+        en_cache = self._comparaisons.get(cle)
+        if en_cache is not None and en_cache[0] == versions:
+            return en_cache[1]
+
+        avant = self.instantane_vague(periode_avant)["paires"]
+        apres = self.instantane_vague(periode_apres)["paires"]
+        lignes = []
+        for paire in list(avant) + [p for p in apres if p not in avant]:
+            rel_avant = avant.get(paire)
+            rel_apres = apres.get(paire)
+            if rel_avant is None:
+                evolution = "Nouvelle"
+            elif rel_apres is None:
+                evolution = "Disparue"
+            elif (rel_apres.score_net or 0) > (rel_avant.score_net or 0):
+                evolution = "Amélioration"
+            elif (rel_apres.score_net or 0) < (rel_avant.score_net or 0):
+                evolution = "Dégradation"
+            elif rel_apres.vigilance == rel_avant.vigilance:
+                evolution = "Stable"
+            else:
+                evolution = "Changement de vigilance"
+            lignes.append({
+                "Vague précédente": periode_avant,
+                "Vague": periode_apres,
+                "Émetteur": self.personnes.nom(paire[0]),
+                "Récepteur": self.personnes.nom(paire[1]),
+                "Vigilance avant": rel_avant.vigilance if rel_avant else None,
+                "Vigilance après": rel_apres.vigilance if rel_apres else None,
+                "Score Net avant": rel_avant.score_net if rel_avant else None,
+                "Score Net après": rel_apres.score_net if rel_apres else None,
+                "Évolution": evolution,
+            })
+        self._comparaisons[cle] = (versions, lignes)
+        return lignes
+
+    def vers_liste(self, avec_id: bool = False) -> list:
+        """
+        Relations au format du schéma JSON (liste de dictionnaires, ordre de saisie).
+        Avec avec_id=True, chaque dictionnaire porte aussi l'identifiant stable "id" de la relation.
+        """
+        if not avec_id:
+            return [relation.vers_dict() for relation in self._relations.values()]
+        return [{"id": relation.id, **relation.vers_dict()} for relation in self._relations.values()]
+
+
+class TableRelations:
+    """
+    Représentation colonnaire et compacte des relations saisies, construite en une passe à partir
+    du registre (une fois par révision des données) et partagée par la grille et l'export :
+    - émetteur, récepteur, service, vigilance, date et heures : catégories pandas (chaque chaîne
+      n'est stockée qu'une fois, un code entier par relation) ;
+    - indicateurs P+, P-, I+, I-, C+, C- : masque de 6 bits par relation (uint8), lorsque
+      toutes les valeurs valent 0 ou 1 (sinon les six colonnes sont conservées telles quelles) ;
+    - identifiants et scores : tableaux numpy contigus.
+    Les colonnes sont dans l'ordre de saisie ; ne pas les modifier en place.
+    """
+    COLONNES_CATEGORIELLES = ["Émetteur", "Récepteur", "Date", "Début", "Fin", "Service", "Vigilance"]
+    INDICATEURS = ["P+", "P-", "I+", "I-", "C+", "C-"]
+
+    def __init__(self, registre: RegistreRelations):
+        lignes = [
+            (r.id, r.emetteur, r.recepteur, r.date, r.debut, r.fin, r.service,
+             r.p_plus, r.p_moins, r.i_plus, r.i_moins, r.c_plus, r.c_moins,
+             r.score_pic_positif, r.score_pic_negatif, r.score_net, r.vigilance, r.commentaire)
+            for r in registre
+        ]
+        colonnes = dict(zip(["id"] + CHAMPS_RELATION, zip(*lignes))) if lignes else {c: () for c in ["id"] + CHAMPS_RELATION}
+
+        self.ids = np.array(colonnes["id"], dtype="int64")
+        self.categories = {c: pd.Categorical(colonnes[c]) for c in self.COLONNES_CATEGORIELLES}
+        valeurs_indicateurs = [np.asarray(colonnes[c]) for c in self.INDICATEURS]
+        if all(v.size == 0 or v.dtype.kind in "iu" and ((v == 0) | (v == 1)).all() for v in valeurs_indicateurs):
+            self.masque_indicateurs = np.zeros(len(self.ids), dtype="uint8")
+            for bit, valeurs in enumerate(valeurs_indicateurs):
+                self.masque_indicateurs |= valeurs.astype("uint8") << bit
+            self.indicateurs = {}
+        else:
+            self.masque_indicateurs = None
+            self.indicateurs = {c: pd.Series(colonnes[c], dtype=None if lignes else "int64").to_numpy()
+                                for c in self.INDICATEURS}
+        self.scores = {c: pd.Series(colonnes[c], dtype=None if lignes else "int64").to_numpy()
+                       for c in ["Score Pic Positif", "Score Pic Négatif", "Score Net"]}
+        self.commentaires = np.array(colonnes["Commentaire"], dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def indicateur(self, champ: str) -> np.ndarray:
+        """Valeurs d'un indicateur ("P+", ..., "C-"), décodées du masque de bits si besoin."""
+        if self.masque_indicateurs is None:
+            return self.indicateurs[champ]
+        return ((self.masque_indicateurs >> self.INDICATEURS.index(champ)) & 1).astype("int64")
+
+    def colonne(self, champ: str):
+        """Colonne d'un champ du schéma JSON (catégorie, tableau numpy ou tableau d'objets)."""
+        if champ == "id":
+            return self.ids
+        if champ in self.categories:
+            return self.categories[champ]
+        if champ in self.INDICATEURS:
+            return self.indicateur(champ)
+        if champ in self.scores:
+            return self.scores[champ]
+        return self.commentaires
+
+    def projeter(self, champ: str, correspondance: dict, defaut) -> np.ndarray:
+        """
+        Applique un dictionnaire aux valeurs d'une colonne catégorielle (ex. nom → service),
+        defaut remplaçant les valeurs absentes ou None : le dictionnaire n'est consulté qu'une
+        fois par valeur distincte, pas par relation.
+        """
+        categorie = self.categories[champ]
+        valeurs = [correspondance.get(v) for v in categorie.categories]
+        valeurs = np.array([defaut if v is None else v for v in valeurs] + [defaut], dtype=object)
+        return valeurs[categorie.codes]  # code -1 (valeur manquante) → dernier élément : defaut
+
+    def vers_dataframe(self, colonnes=None, masque=None) -> pd.DataFrame:
+        """
+        DataFrame des relations (par défaut : "id" puis CHAMPS_RELATION), éventuellement filtré
+        par un masque booléen. Les colonnes textuelles restent catégorielles.
+        """
+        colonnes = ["id"] + CHAMPS_RELATION if colonnes is None else colonnes
+        donnees = {c: self.colonne(c) for c in colonnes}
+        if masque is not None:
+            donnees = {c: v[masque] for c, v in donnees.items()}
+        # Sans copie : les colonnes numériques ne sont pas regroupées dans un nouveau bloc
+        return pd.DataFrame(donnees, columns=colonnes, copy=False)
+
+    def dernieres_par_paire(self) -> np.ndarray:
+        """Masque des relations qui sont la dernière saisie de leur paire ordonnée (émetteur, récepteur)."""
+        paires = pd.DataFrame({
+            "e": self.categories["Émetteur"].codes, "r": self.categories["Récepteur"].codes,
+        })
+        return ~paires.duplicated(keep="last").to_numpy()
@@ -0,0 +1,180 @@
+"""Analyse du réseau des relations saisies, vu comme un graphe orienté signé."""
+import pandas as pd
+
+from .modele import RegistreRelations
+
+
+# === ANALYSE DU RÉSEAU (GRAPHE ORIENTÉ SIGNÉ) ================================
+# Nombre minimal de relations négatives reçues (et majoritaires) pour signaler une personne "À risque"
+SEUIL_RELATIONS_NEGATIVES_A_RISQUE = 2
+# Colonnes de la feuille 'Réseau Personnes'
+COLONNES_ANALYSE_RESEAU = [
+    "Personne", "Service", "Émises +", "Émises -", "Émises 0", "Reçues +", "Reçues -", "Reçues 0",
+    "Réciprocité", "Triangles déséquilibrés", "Statut",
+]
+
+
+def _signe(valeur) -> int:
+    return (valeur > 0) - (valeur < 0)
+
+
+class GrapheRelations:
+    """
+    Réseau émetteur → récepteur des relations saisies, vu comme un graphe orienté signé.
+    Chaque personne reçoit un identifiant entier (participants dans l'ordre de saisie, puis
+    personnes présentes uniquement dans les relations) ; l'arc (i, j) porte le signe du
+    Score Net de la dernière relation saisie pour la paire (+1, -1 ou 0).
+    Les listes d'adjacence (successeurs / prédécesseurs) rendent tous les calculs
+    proportionnels au nombre d'arcs (triangles : O(arcs^1,5)), jamais au carré du nombre de personnes.
+    """
+
+    def __init__(self, registre: RegistreRelations, participants):
+        self.noms = []
+        self.id_par_nom = {}
+        for p in participants:
+            self._identifiant(p["nom"])
+        arcs = [
+            (self._identifiant(emetteur), self._identifiant(recepteur), _signe(relation.score_net or 0))
+            for (emetteur, recepteur), relation in registre.dernieres_par_paire()
+        ]
+        self.successeurs = [{} for _ in self.noms]   # id → {id du récepteur: signe}
+        self.predecesseurs = [{} for _ in self.noms] # id → {id de l'émetteur: signe}
+        for i, j, signe in arcs:
+            self.successeurs[i][j] = signe
+            self.predecesseurs[j][i] = signe
+        self.nombre_arcs = len(arcs)
+
+    def _identifiant(self, nom) -> int:
+        if nom not in self.id_par_nom:
+            self.id_par_nom[nom] = len(self.noms)
+            self.noms.append(nom)
+        return self.id_par_nom[nom]
+
+    def degres(self) -> dict:
+        """Degrés sortants / entrants par signe : {"sortants_+": [...], ..., "entrants_0": [...]}, indexés par id."""
+        degres = {}
+        for sens, adjacence in (("sortants", self.successeurs), ("entrants", self.predecesseurs)):
+            for signe, libelle in ((1, "+"), (-1, "-"), (0, "0")):
+                degres[f"{sens}_{libelle}"] = [sum(1 for s in voisins.values() if s == signe) for voisins in adjacence]
+        return degres
+
+    def reciprocite(self):
+        """
+        Renvoie (réciprocité globale, réciprocité de signe, réciprocité par personne) :
+        part des paires reliées dans les deux sens, part de ces paires réciproques de même signe,
+        et pour chaque id la part de ses paires reliées qui sont réciproques.
+        """
+        paires_reliees = 0
+        paires_reciproques = 0
+        paires_meme_signe = 0
+        par_personne = []
+        for i, sortants in enumerate(self.successeurs):
+            entrants = self.predecesseurs[i]
+            voisins = sortants.keys() | entrants.keys()
+            reciproques = sortants.keys() & entrants.keys()
+            par_personne.append(len(reciproques) / len(voisins) if voisins else 0.0)
+            # Chaque paire est comptée une fois, depuis sa plus petite extrémité
+            paires_reliees += sum(1 for j in voisins if j > i)
+            for j in reciproques:
+                if j > i:
+                    paires_reciproques += 1
+                    paires_meme_signe += sortants[j] == entrants[j]
+        globale = paires_reciproques / paires_reliees if paires_reliees else 0.0
+        de_signe = paires_meme_signe / paires_reciproques if paires_reciproques else 0.0
+        return globale, de_signe, par_personne
+
+    def liens_signes(self) -> list:
+        """
+        Graphe non orienté signé : pour chaque id, {voisin: signe} où le signe est celui de la
+        somme des signes des deux sens ; les paires ambivalentes ou neutres (somme nulle) sont ignorées.
+        """
+        liens = [{} for _ in self.noms]
+        for i, sortants in enumerate(self.successeurs):
+            for j, signe in sortants.items():
+                if j in liens[i]:
+                    continue
+                total = _signe(signe + self.successeurs[j].get(i, 0))
+                if total:
+                    liens[i][j] = total
+                    liens[j][i] = total
+        return liens
+
+    def triades_signees(self):
+        """
+        Triangles du graphe signé non orienté : équilibrés (produit des signes positif) ou
+        déséquilibrés. Chaque triangle est énuméré une fois en orientant les arêtes vers le
+        sommet de plus haut rang (degré, id). Renvoie (équilibrés, déséquilibrés,
+        nombre de triangles déséquilibrés par id).
+        """
+        liens = self.liens_signes()
+        rang = sorted(range(len(liens)), key=lambda i: (len(liens[i]), i))
+        position = [0] * len(liens)
+        for r, i in enumerate(rang):
+            position[i] = r
+        vers_le_haut = [{j: s for j, s in voisins.items() if position[j] > position[i]} for i, voisins in enumerate(liens)]
+
+        equilibres = 0
+        desequilibres = 0
+        desequilibres_par_personne = [0] * len(liens)
+        for i, voisins_i in enumerate(vers_le_haut):
+            for j, signe_ij in voisins_i.items():
+                voisins_j = vers_le_haut[j]
+                petit, grand = (voisins_i, voisins_j) if len(voisins_i) <= len(voisins_j) else (voisins_j, voisins_i)
+                for k in petit:
+                    if k in grand:
+                        if signe_ij * voisins_i[k] * voisins_j[k] > 0:
+                            equilibres += 1
+                        else:
+                            desequilibres += 1
+                            for personne in (i, j, k):
+                                desequilibres_par_personne[personne] += 1
+        return equilibres, desequilibres, desequilibres_par_personne
+
+    def analyser(self, service_par_nom: dict):
+        """
+        Renvoie (df_personnes, df_synthese) :
+        - une ligne par personne : degrés par signe, réciprocité, triangles déséquilibrés et statut
+          ("Isolé" : aucune relation émise ni reçue ; "À risque" : au moins
+          SEUIL_RELATIONS_NEGATIVES_A_RISQUE relations négatives reçues, plus que de positives) ;
+        - les indicateurs globaux du réseau (Indicateur, Valeur).
+        """
+        degres = self.degres()
+        reciprocite_globale, reciprocite_signe, reciprocite_personnes = self.reciprocite()
+        equilibres, desequilibres, desequilibres_personnes = self.triades_signees()
+
+        lignes = []
+        for i, nom in enumerate(self.noms):
+            recues_negatives = degres["entrants_-"][i]
+            if not self.successeurs[i] and not self.predecesseurs[i]:
+                statut = "Isolé"
+            elif recues_negatives >= SEUIL_RELATIONS_NEGATIVES_A_RISQUE and recues_negatives > degres["entrants_+"][i]:
+                statut = "À risque"
+            else:
+                statut = ""
+            lignes.append({
+                "Personne": nom,
+                "Service": service_par_nom.get(nom, "RAS"),
+                "Émises +": degres["sortants_+"][i],
+                "Émises -": degres["sortants_-"][i],
+                "Émises 0": degres["sortants_0"][i],
+                "Reçues +": degres["entrants_+"][i],
+                "Reçues -": recues_negatives,
+                "Reçues 0": degres["entrants_0"][i],
+                "Réciprocité": reciprocite_personnes[i],
+                "Triangles déséquilibrés": desequilibres_personnes[i],
+                "Statut": statut,
+            })
+        df_personnes = pd.DataFrame(lignes, columns=COLONNES_ANALYSE_RESEAU)
+
+        synthese = [
+            ("Personnes", len(self.noms)),
+            ("Relations orientées (dernière saisie par paire)", self.nombre_arcs),
+            ("Réciprocité (paires reliées dans les deux sens)", round(reciprocite_globale, 4)),
+            ("Réciprocité de signe (paires réciproques de même signe)", round(reciprocite_signe, 4)),
+            ("Triangles équilibrés", equilibres),
+            ("Triangles déséquilibrés", desequilibres),
+            ("Personnes isolées", int((df_personnes["Statut"] == "Isolé").sum())),
+            ("Personnes à risque", int((df_personnes["Statut"] == "À risque").sum())),
+        ]
+        df_synthese = pd.DataFrame(synthese, columns=["Indicateur", "Valeur"], dtype=object)
+        return df_personnes, df_synthese
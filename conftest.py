@@ -0,0 +1 @@
+# Racine du dépôt ajoutée au chemin d'import par pytest : les tests importent le paquet barometre.
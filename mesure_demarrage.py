@@ -0,0 +1,110 @@
+"""
+Temps d'import à froid de l'application et garde-fou contre les régressions au démarrage.
+
+Chaque scénario est importé dans un interpréteur neuf avec python -X importtime ; le temps
+retenu est le meilleur de plusieurs essais (somme des temps cumulés des imports de premier niveau).
+Le script échoue (code de sortie 1) si un module lourd est chargé trop tôt :
+    - écran de connexion : ni pandas, ni numpy, ni openpyxl, ni st_aggrid ;
+    - après connexion : ni openpyxl (chargé à l'exportation) ni st_aggrid (grille des relations) ;
+    - ligne de commande (python -m barometre) : ni streamlit, ni openpyxl.
+Des budgets en millisecondes peuvent en plus être imposés (--budget-connexion, ...).
+
+    python mesure_demarrage.py [-n ESSAIS] [--budget-connexion MS] [--budget-application MS] [--budget-cli MS]
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+DOSSIER = os.path.dirname(os.path.abspath(__file__))
+CHEMIN_APPLICATION = os.path.join(DOSSIER, "sitewebpython.py")
+
+MODULES_INTERDITS = {
+    "connexion": ("pandas", "numpy", "openpyxl", "st_aggrid"),
+    "application": ("openpyxl", "st_aggrid"),
+    "cli": ("streamlit", "openpyxl"),
+}
+
+
+# === SCÉNARIOS ===============================================================
+def imports_application():
+    """
+    Imports de niveau module de sitewebpython.py, répartis entre ceux exécutés avant l'écran de
+    connexion (jusqu'au premier st.stop() de niveau module) et ceux exécutés après.
+    """
+    with open(CHEMIN_APPLICATION, encoding="utf-8") as fichier:
+        arbre = ast.parse(fichier.read())
+
+    avant, apres = [], []
+    cible = avant
+    for noeud in arbre.body:
+        if isinstance(noeud, (ast.Import, ast.ImportFrom)):
+            cible.append(ast.unparse(noeud))
+        elif cible is avant and any(
+            isinstance(n, ast.Call) and ast.unparse(n.func) == "st.stop" for n in ast.walk(noeud)
+        ):
+            cible = apres
+    return avant, apres
+
+
+def scenarios():
+    avant, apres = imports_application()
+    return {
+        "connexion": "\n".join(avant),
+        "application": "\n".join(avant + apres),
+        "cli": "import barometre.__main__",
+    }
+
+
+# === MESURE ==================================================================
+def mesurer(code: str):
+    """Importe code dans un interpréteur neuf ; renvoie (durée en ms, modules chargés)."""
+    resultat = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=DOSSIER, capture_output=True, text=True,
+    )
+    if resultat.returncode != 0:
+        raise RuntimeError(resultat.stderr.strip().splitlines()[-1])
+
+    total_us = 0
+    modules = set()
+    for ligne in resultat.stderr.splitlines():
+        if not ligne.startswith("import time:") or "cumulative" in ligne:
+            continue
+        _, cumule, nom = ligne[len("import time:"):].split("|")
+        modules.add(nom.strip())
+        if not nom.startswith("  "):  # Import de premier niveau (les dépendances sont indentées)
+            total_us += int(cumule)
+    return total_us / 1000, modules
+
+
+def main(arguments=None) -> int:
+    parser = argparse.ArgumentParser(description="Temps d'import à froid de l'application.")
+    parser.add_argument("-n", "--essais", type=int, default=5, help="Nombre d'essais par scénario (défaut : 5).")
+    for nom in MODULES_INTERDITS:
+        parser.add_argument(f"--budget-{nom}", type=float, default=None, metavar="MS",
+                            help=f"Durée maximale du scénario '{nom}' en millisecondes.")
+    options = parser.parse_args(arguments)
+
+    echecs = []
+    for nom, code in scenarios().items():
+        mesures = [mesurer(code) for _ in range(max(1, options.essais))]
+        duree = min(d for d, _ in mesures)
+        modules = mesures[0][1]
+        print(f"{nom:<12} {duree:8.1f} ms  ({len(modules)} modules)")
+
+        for module in MODULES_INTERDITS[nom]:
+            if module in modules:
+                echecs.append(f"{nom} : le module {module} est chargé")
+        budget = getattr(options, f"budget_{nom}")
+        if budget is not None and duree > budget:
+            echecs.append(f"{nom} : {duree:.1f} ms > budget de {budget:.1f} ms")
+
+    for echec in echecs:
+        print(f"ÉCHEC {echec}", file=sys.stderr)
+    return 1 if echecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
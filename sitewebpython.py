@@ -1,17 +1,12 @@
+# Seuls des modules légers sont importés avant l'écran de connexion : pandas, numpy et le
+# paquet barometre sont chargés après authentification, openpyxl à la première exportation
+# (barometre.export) et st_aggrid à l'affichage de la grille des relations.
+# Temps d'import à froid : python mesure_demarrage.py
 import streamlit as st
-import pandas as pd
-import openpyxl
-import tempfile
 import os
 import json
+import time
 from datetime import datetime
-from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode, ColumnsAutoSizeMode
-from dotenv import load_dotenv
-import hashlib
-import io
-import zipfile
-
-import streamlit as st
 import hashlib
 
 # Récupération sécurisée depuis les secrets Streamlit
@@ -38,59 +33,166 @@ if not st.session_state.logged_in:
 
 
 
-# === LOGIQUE MÉTIER ==========================================================
-class AnalyseRelationnelle:
-    """Classe utilitaire pour calculer la vigilance d’une relation."""
-    def __init__(self, relations_saisies):
-        self.relations = relations_saisies
-
-    @staticmethod
-    def classer_relation(p_plus: int, p_moins: int) -> str:
-        """
-        Classifie une relation en fonction des scores positifs (p_plus) et négatifs (p_moins).
-        Met à jour la logique pour "Positif pur" (3 P+) et introduit "Positif" (1 ou 2 P+),
-        ainsi que "Négatif pur" (3 P-) et "Négatif" (1 ou 2 P-).
-        """
-        if p_plus == 3 and p_moins == 0:
-            return "Positif pur" # Réservé aux trois pics positifs (P+, I+, C+)
-        elif p_plus == 0 and p_moins == 3:
-            return "Négatif pur" # Réservé aux trois pics négatifs (P-, I-, C-)
-        elif (p_plus == 1 or p_plus == 2) and p_moins == 0:
-            return "Positif" # Pour un ou deux pics positifs, sans négatif
-        elif p_plus == 0 and (p_moins == 1 or p_moins == 2):
-            return "Négatif" # Pour un ou deux pics négatifs, sans positif
-        elif p_plus > 0 and p_moins > 0 and p_plus > p_moins:
-            return "Mixte positif"
-        elif p_plus > 0 and p_moins > 0 and p_plus <= p_moins:
-            return "Mixte tendu"
-        # Si les deux sont à 0, ou des états invalides, classer comme "Aucune donnée"
-        return "Aucune donnée"
+# Logique métier, registre des relations, analyse du réseau, calcul de l'export et espace de travail :
+# voir le paquet barometre (utilisable sans Streamlit, cf. python -m barometre).
+import pandas as pd
+from barometre.modele import (
+    CHAMPS_RELATION, TYPES_VIGILANCE, AnalyseRelationnelle, RegistreRelations, TableRelations,
+)
+from barometre.espace_travail import EspaceTravail
+from barometre.export import (
+    archive_zip, classeur_excel, detecter_relations_croisees, index_services, projet_depuis_json, projet_vers_json,
+    tableau_vagues,
+)
 
 # === INITIALISATION DES ÉTATS STREAMLIT ======================================
 default_states = {
     "etat": "menu",
     "participants": [],
     "services": [],
-    "relations_saisies": [],
+    "relations_saisies": RegistreRelations(),
     "relation_a_modifier": None,
     "affiche_formulaire_participant": False,
     "participant_a_modifier": None,
     "selected_relations": pd.DataFrame(),
     "nombre_total_personnes": 0,
+    "revision_donnees": 0,
+    "export_cache": None,
+    "cache_table_relations": None,
+    "cache_df_relations": None,
+    "version_editeur_lot": 0,
+    "dernier_lot": None,
+    "dernier_import_observations": None,
+    "cache_tableau_de_bord": None,
+    "projet_id": None,
+    "nom_projet": None,
+    "etat_participants_enregistre": None,
 }
 for k, v in default_states.items():
     st.session_state.setdefault(k, v)
 
+
+def marquer_modification():
+    """
+    Incrémente le compteur de révision des données du projet.
+    À appeler après toute modification des participants, des relations ou du
+    nombre total de personnes : les caches (export ZIP, etc.) sont invalidés et les
+    modifications du projet ouvert sont enregistrées dans l'espace de travail.
+    """
+    st.session_state.revision_donnees += 1
+    synchroniser_espace_travail()
+
+# === ESPACE DE TRAVAIL (SQLITE) ==============================================
+# Réglages de l'espace de travail (section [espace_travail] des secrets) :
+# - "chemin" : fichier de la base locale des projets (le journal est écrit à côté, suffixe .journal.jsonl) ;
+# - "fsync_toutes" / "fsync_delai" : fsync du journal toutes les N entrées ou au plus tard après ce délai (s) ;
+# - "compaction_delai" : intervalle (s) de la compaction du journal dans la base, en tâche de fond.
+CONFIG_ESPACE_TRAVAIL = st.secrets.get("espace_travail", {})
+CHEMIN_ESPACE_TRAVAIL = CONFIG_ESPACE_TRAVAIL.get("chemin", "barometre.sqlite3")
+
+
+@st.cache_resource
+def ouvrir_espace_travail() -> EspaceTravail:
+    """Espace de travail partagé par toutes les sessions (une connexion par processus)."""
+    return EspaceTravail(
+        CHEMIN_ESPACE_TRAVAIL,
+        fsync_toutes=int(CONFIG_ESPACE_TRAVAIL.get("fsync_toutes", 20)),
+        fsync_delai=float(CONFIG_ESPACE_TRAVAIL.get("fsync_delai", 1.0)),
+        compaction_delai=float(CONFIG_ESPACE_TRAVAIL.get("compaction_delai", 5.0)),
+    )
+
+
+def _etat_participants() -> tuple:
+    """Empreinte des participants, services et nombre total de personnes (détection des changements)."""
+    return (
+        tuple((p["nom"], p.get("service")) for p in st.session_state.participants),
+        tuple(st.session_state.services),
+        st.session_state.nombre_total_personnes,
+    )
+
+
+def synchroniser_espace_travail():
+    """
+    Enregistre dans l'espace de travail les modifications du projet ouvert depuis la dernière
+    synchronisation : opérations du registre, puis participants / services / nombre total
+    de personnes s'ils ont changé. Sans projet ouvert, les modifications ne sont pas suivies.
+    """
+    projet_id = st.session_state.projet_id
+    if projet_id is None:
+        return
+    # Registre pas encore chargé : aucune relation n'a pu être modifiée depuis l'ouverture
+    modifications = registre_relations().extraire_modifications() if registre_charge() else []
+    etat_participants = _etat_participants()
+    participants_modifies = etat_participants != st.session_state.etat_participants_enregistre
+    if not modifications and not participants_modifies:
+        return
+    if participants_modifies:
+        ouvrir_espace_travail().enregistrer_modifications(
+            projet_id, modifications, st.session_state.participants, st.session_state.services,
+            st.session_state.nombre_total_personnes,
+        )
+    else:
+        ouvrir_espace_travail().enregistrer_modifications(projet_id, modifications)
+    st.session_state.etat_participants_enregistre = etat_participants
+
+
+def ouvrir_projet(projet_id: int, contenu: dict):
+    """
+    Installe un projet de l'espace de travail comme projet courant (modifications suivies).
+    Sans clé "relations" dans contenu, le registre n'est construit qu'au premier besoin
+    (voir registre_relations).
+    """
+    relations = contenu.get("relations")
+    if relations is not None:
+        relations.suivre_modifications()
+    st.session_state.projet_id = projet_id
+    st.session_state.nom_projet = contenu["nom"]
+    st.session_state.participants = contenu["participants"]
+    st.session_state.services = contenu["services"]
+    st.session_state.relations_saisies = relations
+    st.session_state.nombre_total_personnes = contenu["nombre_total_personnes"]
+    st.session_state.relation_a_modifier = None
+    st.session_state.participant_a_modifier = None
+    st.session_state.selected_relations = pd.DataFrame()
+    st.session_state.etat_participants_enregistre = _etat_participants()
+    marquer_modification()
+
+
+def registre_charge() -> bool:
+    """Vrai si le registre des relations du projet courant est en mémoire."""
+    return st.session_state.relations_saisies is not None
+
+
+def registre_relations() -> RegistreRelations:
+    """
+    Registre des relations du projet courant, lu dans l'espace de travail au premier besoin
+    (tableau de bord, export, saisie, modification ou suppression).
+    """
+    if not registre_charge():
+        registre = RegistreRelations()
+        if st.session_state.projet_id is not None:
+            registre = ouvrir_espace_travail().charger_relations(st.session_state.projet_id)
+            registre.suivre_modifications()
+        st.session_state.relations_saisies = registre
+    return st.session_state.relations_saisies
+
+
+def nombre_relations_projet() -> int:
+    """Nombre de relations du projet courant, compté dans la base tant que le registre n'est pas chargé."""
+    if registre_charge():
+        return len(st.session_state.relations_saisies)
+    return ouvrir_espace_travail().compter_relations(st.session_state.projet_id)
+
+
 # === UTILITAIRES D’IMPORT / EXPORT ===========================================
 def exporter_json_data() -> str:
     """Exporte les données actuelles de la session en une chaîne JSON."""
-    data = {
-        "participants": st.session_state.participants,
-        "services": st.session_state.services,
-        "relations_saisies": st.session_state.relations_saisies,
-        "nombre_total_personnes": st.session_state.nombre_total_personnes,
-    }
-    return json.dumps(data, indent=4, ensure_ascii=False)
+    return projet_vers_json(
+        st.session_state.participants,
+        st.session_state.services,
+        registre_relations(),
+        st.session_state.nombre_total_personnes,
+    )
 
 
 def exporter_excel_data() -> bytes:
@@ -98,456 +200,62 @@ def exporter_excel_data() -> bytes:
     Exporte les relations saisies dans un fichier Excel avec un ordre de colonnes spécifique
     et ajuste automatiquement la largeur des colonnes. Ajoute également une feuille de calcul
     avec un récapitulatif de la vigilance des relations, une feuille pour les relations
-    unidirectionnelles et une feuille pour les relations croisées négatives et positives.
+    unidirectionnelles, une feuille pour les relations croisées négatives et positives
+    une matrice service émetteur × service récepteur ('Matrice Services') et l'analyse
+    du réseau orienté signé ('Réseau Personnes', 'Réseau Synthèse'), puis le suivi par
+    vague trimestrielle ('Vagues', 'Évolution Paires').
     Inclut TOUTES les relations possibles (saisies et neutres, y compris celles
     impliquant des participants non nommés) dans la feuille 'Relations'.
+    Les feuilles sont d'abord toutes calculées (en parallèle, voir barometre.export.calculer_feuilles_excel),
+    puis écrites l'une après l'autre.
     """
-    all_relations_for_excel = []
-
-    # Construire la liste de TOUS les participants (nommés + anonymes)
-    all_person_names = [p['nom'] for p in st.session_state.participants]
-    num_named_participants = len(all_person_names)
-    total_persons_in_project = st.session_state.nombre_total_personnes
-
-    if total_persons_in_project > num_named_participants:
-        for i in range(total_persons_in_project - num_named_participants):
-            all_person_names.append(f"Personne Anonyme {i+1}")
-
-    # Créer un dictionnaire de hachages pour les relations saisies pour une recherche rapide
-    saisies_map = {}
-    for rel in st.session_state.relations_saisies:
-        key = (rel["Émetteur"], rel["Récepteur"])
-        saisies_map[key] = rel
-
-    # Définir l'ordre exact des colonnes pour les feuilles Excel
-    colonnes_relations_excel = [
-        "Émetteur", "Récepteur", "Date", "Début", "Fin", "Service",
-        "P+", "P-", "I+", "I-", "C+", "C-",
-        "Score Pic Positif", "Score Pic Négatif", "Score Net",
-        "Vigilance", "Commentaire"
-    ]
-
-    # Générer TOUTES les combinaisons bidirectionnelles possibles pour la feuille 'Relations'
-    for emetteur in all_person_names:
-        for recepteur in all_person_names:
-            if emetteur != recepteur:
-                current_key = (emetteur, recepteur)
-                
-                # Vérifier si cette relation a été saisie
-                if current_key in saisies_map:
-                    all_relations_for_excel.append(saisies_map[current_key])
-                else:
-                    # C'est une relation neutre (non saisie)
-                    # Déterminer le service de l'émetteur si l'émetteur est nommé
-                    service_emetteur = "RAS"
-                    for p in st.session_state.participants:
-                        if p["nom"] == emetteur:
-                            service_emetteur = p["service"]
-                            break
-
-                    all_relations_for_excel.append({
-                        "Émetteur": emetteur,
-                        "Récepteur": recepteur,
-                        "Date": "RAS", # Pas de date pour une relation non saisie
-                        "Début": "RAS", # Pas d'heure
-                        "Fin": "RAS",   # Pas d'heure
-                        "Service": service_emetteur, # Service de l'émetteur (si nommé), sinon RAS
-                        "P+": 0, "P-": 0, "I+": 0, "I-": 0, "C+": 0, "C-": 0,
-                        "Score Pic Positif": 0,
-                        "Score Pic Négatif": 0,
-                        "Score Net": 0,
-                        "Vigilance": "Neutre", # Marqué comme neutre
-                        "Commentaire": "Relation non renseignée ou non applicable" # Commentaire explicatif
-                    })
-            
-    df_relations = pd.DataFrame(all_relations_for_excel)
-
-    # S'assurer que toutes les colonnes définies existent dans le DataFrame
-    for col in colonnes_relations_excel:
-        if col not in df_relations.columns:
-            df_relations[col] = None
-
-    # Réorganiser le DataFrame selon l'ordre des colonnes définies
-    df_relations = df_relations[colonnes_relations_excel]
-
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # --- Première feuille : Relations (Toutes les combinaisons, saisies et neutres) ---
-        df_relations.to_excel(writer, index=False, sheet_name='Relations')
-
-        workbook = writer.book
-        worksheet_relations = writer.sheets['Relations']
-
-        for col_idx, column_name in enumerate(colonnes_relations_excel):
-            max_length = len(str(column_name))
-            if not df_relations.empty:
-                max_length = max(max_length, df_relations[column_name].astype(str).apply(len).max())
-
-            adjusted_width = (max_length + 2)
-            if column_name == "Commentaire":
-                adjusted_width = min(adjusted_width, 100) # Limite pour le commentaire
-            elif column_name in ["Date", "Début", "Fin", "Service", "Vigilance"]:
-                 adjusted_width = min(adjusted_width, 25) # Limite pour ces colonnes
-            else:
-                 adjusted_width = min(adjusted_width, 15) # Limite générale pour les autres
-
-            worksheet_relations.column_dimensions[openpyxl.utils.get_column_letter(col_idx + 1)].width = adjusted_width
-
-        # --- Deuxième feuille : Récapitulatif Vigilance (Résumé de la vigilance) ---
-        worksheet_vigilance = workbook.create_sheet(title='Récapitulatif Vigilance')
-
-        # Calcul des statistiques de vigilance
-        relations_enregistrees_count = len(st.session_state.relations_saisies)
-        
-        # Obtenir les comptages de chaque type de vigilance existant dans les relations SAISIES
-        df_saisies_for_stats = pd.DataFrame(st.session_state.relations_saisies)
-        vigilance_counts = df_saisies_for_stats['Vigilance'].value_counts().to_dict() if not df_saisies_for_stats.empty else {}
-        
-        # Initialiser les types de relations pour s'assurer qu'ils apparaissent même s'ils sont à 0
-        types_relation_stats = ["Positif pur", "Positif", "Mixte positif", "Mixte tendu", "Négatif pur", "Négatif", "Aucune donnée"] # Updated types
-        stats_data = []
-
-        # Calcul du nombre total de combinaisons possibles (basé sur nombre_total_personnes)
-        nombre_total_personnes_app = st.session_state.nombre_total_personnes 
-        nombre_combinaisons_possibles = 0
-        if nombre_total_personnes_app > 1:
-            nombre_combinaisons_possibles = nombre_total_personnes_app * (nombre_total_personnes_app - 1)
-        
-        if nombre_combinaisons_possibles == 0 and nombre_total_personnes_app > 1:
-            st.error("ERREUR DE CALCUL : Le nombre de combinaisons possibles est zéro. Veuillez saisir un nombre total de personnes supérieur à 1.")
-        
-        # Calcul des relations neutres GLOBALES (nombre total possible - nombre de relations enregistrées)
-        relations_neutres_globales = max(0, nombre_combinaisons_possibles - relations_enregistrees_count)
-
-        # Ajouter les relations spécifiques (enregistrées)
-        for rel_type in types_relation_stats:
-            count = vigilance_counts.get(rel_type, 0)
-            percentage = (count / nombre_combinaisons_possibles) if nombre_combinaisons_possibles > 0 else 0.0
-            stats_data.append({"Type de relation": rel_type, "Nombre de cas": count, "Pourcentage": percentage})
-
-        # Ajouter les relations neutres globales
-        percentage_neutre_globale = (relations_neutres_globales / nombre_combinaisons_possibles) if nombre_combinaisons_possibles > 0 else 0.0
-        stats_data.append({"Type de relation": "Neutre (Global)", "Nombre de cas": relations_neutres_globales, "Pourcentage": percentage_neutre_globale})
-        
-        # Ajouter la ligne "Total des combinaisons possibles" à la fin
-        total_pourcentage = 1.0 if nombre_combinaisons_possibles > 0 else 0.0
-        stats_data.append({"Type de relation": "Total des combinaisons possibles", "Nombre de cas": nombre_combinaisons_possibles, "Pourcentage": total_pourcentage})
-
-
-        # Créer un DataFrame pour les statistiques
-        df_stats = pd.DataFrame(stats_data)
-
-        # Écrire le DataFrame des stats dans la deuxième feuille
-        worksheet_vigilance.append(df_stats.columns.tolist())
-        for row in df_stats.itertuples(index=False):
-            worksheet_vigilance.append(list(row))
-
-        # Ajuster la largeur des colonnes pour la feuille 'Récapitulatif Vigilance'
-        for col_idx, column_name in enumerate(df_stats.columns):
-            max_length = len(str(column_name))
-            if not df_stats.empty:
-                max_length = max(max_length, df_stats[column_name].astype(str).apply(len).max())
-            
-            adjusted_width = (max_length + 2)
-            if column_name == "Type de relation":
-                adjusted_width = min(adjusted_width, 40)
-            elif column_name == "Nombre de cas":
-                adjusted_width = min(adjusted_width, 20)
-            elif column_name == "Pourcentage":
-                adjusted_width = min(adjusted_width, 20)
-            
-            worksheet_vigilance.column_dimensions[openpyxl.utils.get_column_letter(col_idx + 1)].width = adjusted_width
-            
-            # Format pour la colonne Pourcentage
-            if column_name == "Pourcentage":
-                for row_idx in range(2, worksheet_vigilance.max_row + 1):
-                    cell = worksheet_vigilance.cell(row=row_idx, column=col_idx + 1)
-                    cell.number_format = '0.00%'
-
-        # --- Nouvelle feuille : Relations Unidirectionnelles ---
-        worksheet_unidirectional = workbook.create_sheet(title='Relations Unidirectionnelles')
-        
-        # Filtrer relations_saisies pour inclure seulement les relations avec une vigilance définie
-        # (excluant 'Aucune donnée' qui résulterait de P+=0 et P-=0)
-        df_unidirectional = pd.DataFrame(st.session_state.relations_saisies)
-        if not df_unidirectional.empty:
-            df_unidirectional = df_unidirectional[df_unidirectional['Vigilance'] != 'Aucune donnée']
-            # S'assurer de l'ordre des colonnes
-            for col in colonnes_relations_excel:
-                if col not in df_unidirectional.columns:
-                    df_unidirectional[col] = None
-            df_unidirectional = df_unidirectional[colonnes_relations_excel]
-        
-        df_unidirectional.to_excel(writer, index=False, sheet_name='Relations Unidirectionnelles')
-
-        # Ajuster la largeur des colonnes pour la feuille 'Relations Unidirectionnelles'
-        for col_idx, column_name in enumerate(colonnes_relations_excel):
-            max_length = len(str(column_name))
-            if not df_unidirectional.empty:
-                max_length = max(max_length, df_unidirectional[column_name].astype(str).apply(len).max())
-
-            adjusted_width = (max_length + 2)
-            if column_name == "Commentaire":
-                adjusted_width = min(adjusted_width, 100)
-            elif column_name in ["Date", "Début", "Fin", "Service", "Vigilance"]:
-                 adjusted_width = min(adjusted_width, 25)
-            else:
-                 adjusted_width = min(adjusted_width, 15)
-
-            worksheet_unidirectional.column_dimensions[openpyxl.utils.get_column_letter(col_idx + 1)].width = adjusted_width
-
-        # --- Nouvelle feuille : Relations Croisées Négatives ---
-        worksheet_negative_cross = workbook.create_sheet(title='Relations Croisées Négatives')
-
-        negative_cross_relations_data = []
-        
-        # Créer un mapping pour une recherche rapide des relations saisies
-        recorded_relations_lookup = {}
-        for rel in st.session_state.relations_saisies:
-            recorded_relations_lookup[(rel["Émetteur"], rel["Récepteur"])] = rel
-
-        # Définir les types de vigilance considérés comme "négatifs" pour cette analyse
-        # NOTE: "Mixte tendu" indique un "pic négatif" car p_moins >= p_plus
-        # Ajout de "Négatif" aux types de vigilance négatifs pour les relations croisées
-        negative_vigilance_types_for_cross = {"Négatif pur", "Négatif", "Mixte tendu"}
-        
-        # Itérer sur les paires uniques de participants nommés pour trouver les relations croisées
-        processed_pairs = set() # Pour éviter de traiter (A,B) et (B,A) comme des paires différentes pour la logique
-        for p1_obj in st.session_state.participants:
-            for p2_obj in st.session_state.participants:
-                p1 = p1_obj["nom"]
-                p2 = p2_obj["nom"]
-                
-                if p1 == p2:
-                    continue
-
-                # S'assurer de traiter chaque paire une seule fois (ex: A,B mais pas B,A) pour la logique de paire
-                pair_key = tuple(sorted((p1, p2)))
-                if pair_key in processed_pairs:
-                    continue
-                processed_pairs.add(pair_key)
-
-                # Obtenir les relations pour les deux directions
-                rel_p1_to_p2 = recorded_relations_lookup.get((p1, p2))
-                rel_p2_to_p1 = recorded_relations_lookup.get((p2, p1))
-
-                # Vérifier si les deux relations existent et sont d'un type de vigilance négatif
-                if (rel_p1_to_p2 and rel_p1_to_p2["Vigilance"] in negative_vigilance_types_for_cross and
-                    rel_p2_to_p1 and rel_p2_to_p1["Vigilance"] in negative_vigilance_types_for_cross):
-                    
-                    # Déterminer le type de relation croisée ("Conflit" ou "Tension relationnelle")
-                    type_de_croise = ""
-                    is_p1_p2_pure_negative = rel_p1_to_p2["Vigilance"] == "Négatif pur"
-                    is_p2_p1_pure_negative = rel_p2_to_p1["Vigilance"] == "Négatif pur"
-
-                    # "Conflit" si les deux sont "Négatif pur" (3 pics négatifs de chaque côté)
-                    if is_p1_p2_pure_negative and is_p2_p1_pure_negative:
-                        type_de_croise = "Conflit"
-                    # "Tension relationnelle" si au moins l'un des deux est un "pic négatif" (Négatif pur, Négatif ou Mixte tendu)
-                    else:
-                        type_de_croise = "Tension relationnelle"
-                    
-                    # Ajouter les deux relations à la liste, avec la nouvelle classification
-                    # Copier la relation pour éviter de modifier l'objet original dans relations_saisies
-                    rel_p1_to_p2_copy = rel_p1_to_p2.copy()
-                    rel_p1_to_p2_copy["Type de Croisé"] = type_de_croise
-                    negative_cross_relations_data.append(rel_p1_to_p2_copy)
-
-                    rel_p2_to_p1_copy = rel_p2_to_p1.copy()
-                    rel_p2_to_p1_copy["Type de Croisé"] = type_de_croise
-                    negative_cross_relations_data.append(rel_p2_to_p1_copy)
-        
-        df_negative_cross = pd.DataFrame(negative_cross_relations_data)
-        
-        # Nouvel ordre de colonnes pour les relations croisées négatives, incluant le type de croisé
-        colonnes_negative_cross_excel = colonnes_relations_excel + ["Type de Croisé"]
-
-        if not df_negative_cross.empty:
-            # S'assurer que toutes les colonnes définies existent dans le DataFrame
-            for col in colonnes_negative_cross_excel:
-                if col not in df_negative_cross.columns:
-                    df_negative_cross[col] = None
-            # Réorganiser le DataFrame selon l'ordre des colonnes définies
-            df_negative_cross = df_negative_cross[colonnes_negative_cross_excel]
-
-        df_negative_cross.to_excel(writer, index=False, sheet_name='Relations Croisées Négatives')
-
-        # Ajuster la largeur des colonnes pour la feuille 'Relations Croisées Négatives'
-        for col_idx, column_name in enumerate(colonnes_negative_cross_excel):
-            max_length = len(str(column_name))
-            if not df_negative_cross.empty:
-                max_length = max(max_length, df_negative_cross[column_name].astype(str).apply(len).max())
-
-            adjusted_width = (max_length + 2)
-            if column_name == "Commentaire":
-                adjusted_width = min(adjusted_width, 100)
-            elif column_name in ["Date", "Début", "Fin", "Service", "Vigilance", "Type de Croisé"]:
-                 adjusted_width = min(adjusted_width, 25)
-            else:
-                 adjusted_width = min(adjusted_width, 15)
-
-            worksheet_negative_cross.column_dimensions[openpyxl.utils.get_column_letter(col_idx + 1)].width = adjusted_width
-
-
-        # --- Nouvelle feuille : Relations Croisées Positives ---
-        worksheet_positive_cross = workbook.create_sheet(title='Relations Croisées Positives')
-
-        positive_cross_relations_data = []
-        
-        # Définir les types de vigilance considérés comme "positifs" pour cette analyse
-        positive_vigilance_types_for_cross = {"Positif pur", "Positif"}
-        
-        # Itérer sur les paires uniques de participants nommés pour trouver les relations croisées
-        # Nous réutilisons processed_pairs pour éviter les doublons A-B et B-A pour les relations positives
-        processed_pairs_positive = set()
-        for p1_obj in st.session_state.participants:
-            for p2_obj in st.session_state.participants:
-                p1 = p1_obj["nom"]
-                p2 = p2_obj["nom"]
-                
-                if p1 == p2:
-                    continue
-
-                pair_key_positive = tuple(sorted((p1, p2)))
-                if pair_key_positive in processed_pairs_positive:
-                    continue
-                processed_pairs_positive.add(pair_key_positive)
-
-                # Obtenir les relations pour les deux directions
-                rel_p1_to_p2 = recorded_relations_lookup.get((p1, p2))
-                rel_p2_to_p1 = recorded_relations_lookup.get((p2, p1))
-
-                # Vérifier si les deux relations existent et sont d'un type de vigilance positif
-                if (rel_p1_to_p2 and rel_p1_to_p2["Vigilance"] in positive_vigilance_types_for_cross and
-                    rel_p2_to_p1 and rel_p2_to_p1["Vigilance"] in positive_vigilance_types_for_cross):
-                    
-                    # Déterminer le type de relation croisée positive
-                    type_de_croise = ""
-                    is_p1_p2_pure_positive = rel_p1_to_p2["Vigilance"] == "Positif pur"
-                    is_p2_p1_pure_positive = rel_p2_to_p1["Vigilance"] == "Positif pur"
-
-                    # "Harmonie Parfaite" si les deux sont "Positif pur"
-                    if is_p1_p2_pure_positive and is_p2_p1_pure_positive:
-                        type_de_croise = "Harmonie Parfaite"
-                    # "Harmonie Relationnelle" si au moins l'un des deux est "Positif" ou un mix avec "Positif pur"
-                    else:
-                        type_de_croise = "Harmonie Relationnelle"
-                    
-                    # Ajouter les deux relations à la liste, avec la nouvelle classification
-                    rel_p1_to_p2_copy = rel_p1_to_p2.copy()
-                    rel_p1_to_p2_copy["Type de Croisé"] = type_de_croise
-                    positive_cross_relations_data.append(rel_p1_to_p2_copy)
-
-                    rel_p2_to_p1_copy = rel_p2_to_p1.copy()
-                    rel_p2_to_p1_copy["Type de Croisé"] = type_de_croise
-                    positive_cross_relations_data.append(rel_p2_to_p1_copy)
-        
-        df_positive_cross = pd.DataFrame(positive_cross_relations_data)
-        
-        # Nouvel ordre de colonnes pour les relations croisées positives, incluant le type de croisé
-        colonnes_positive_cross_excel = colonnes_relations_excel + ["Type de Croisé"]
-
-        if not df_positive_cross.empty:
-            # S'assurer que toutes les colonnes définies existent dans le DataFrame
-            for col in colonnes_positive_cross_excel:
-                if col not in df_positive_cross.columns:
-                    df_positive_cross[col] = None
-            # Réorganiser le DataFrame selon l'ordre des colonnes définies
-            df_positive_cross = df_positive_cross[colonnes_positive_cross_excel]
-
-        df_positive_cross.to_excel(writer, index=False, sheet_name='Relations Croisées Positives')
-
-        # Ajuster la largeur des colonnes pour la feuille 'Relations Croisées Positives'
-        for col_idx, column_name in enumerate(colonnes_positive_cross_excel):
-            max_length = len(str(column_name))
-            if not df_positive_cross.empty:
-                max_length = max(max_length, df_positive_cross[column_name].astype(str).apply(len).max())
-
-            adjusted_width = (max_length + 2)
-            if column_name == "Commentaire":
-                adjusted_width = min(adjusted_width, 100)
-            elif column_name in ["Date", "Début", "Fin", "Service", "Vigilance", "Type de Croisé"]:
-                 adjusted_width = min(adjusted_width, 25)
-            else:
-                 adjusted_width = min(adjusted_width, 15)
-
-            worksheet_positive_cross.column_dimensions[openpyxl.utils.get_column_letter(col_idx + 1)].width = adjusted_width
-
-
-        # --- Nouvelle feuille : Récap ---
-        worksheet_recap = workbook.create_sheet(title='Récap')
-
-        recap_dataframes = []
-
-        if not df_unidirectional.empty:
-            df_temp_uni = df_unidirectional.copy()
-            df_temp_uni['Type de Croisé'] = None  # Pas de type de croisé pour les unidirectionnelles
-            df_temp_uni['Type de Récap'] = 'Unidirectionnelle'
-            recap_dataframes.append(df_temp_uni)
-        
-        if not df_negative_cross.empty:
-            df_temp_neg = df_negative_cross.copy()
-            df_temp_neg['Type de Récap'] = 'Négative Croisée'
-            recap_dataframes.append(df_temp_neg)
-
-        if not df_positive_cross.empty:
-            df_temp_pos = df_positive_cross.copy()
-            df_temp_pos['Type de Récap'] = 'Positive Croisée'
-            recap_dataframes.append(df_temp_pos)
-        
-        df_recap = pd.DataFrame()
-        if recap_dataframes:
-            df_recap = pd.concat(recap_dataframes, ignore_index=True)
-            
-            # Définir l'ordre complet des colonnes pour le récapitulatif
-            colonnes_recap_excel = colonnes_relations_excel + ["Type de Croisé", "Type de Récap"]
-            
-            # S'assurer que toutes les colonnes définies existent dans le DataFrame récapitulatif
-            for col in colonnes_recap_excel:
-                if col not in df_recap.columns:
-                    df_recap[col] = None
-            
-            # Réorganiser le DataFrame selon l'ordre des colonnes définies
-            df_recap = df_recap[colonnes_recap_excel]
-
-
-        df_recap.to_excel(writer, index=False, sheet_name='Récap')
-
-        # Ajuster la largeur des colonnes pour la feuille 'Récap'
-        for col_idx, column_name in enumerate(colonnes_recap_excel):
-            max_length = len(str(column_name))
-            if not df_recap.empty:
-                max_length = max(max_length, df_recap[column_name].astype(str).apply(len).max())
-
-            adjusted_width = (max_length + 2)
-            if column_name == "Commentaire":
-                adjusted_width = min(adjusted_width, 100)
-            elif column_name in ["Date", "Début", "Fin", "Service", "Vigilance", "Type de Croisé", "Type de Récap"]:
-                 adjusted_width = min(adjusted_width, 25)
-            else:
-                 adjusted_width = min(adjusted_width, 15)
-
-            worksheet_recap.column_dimensions[openpyxl.utils.get_column_letter(col_idx + 1)].width = adjusted_width
-
-
-    output.seek(0)
-    return output.getvalue()
+    nombre_total_personnes_app = st.session_state.nombre_total_personnes
+    if nombre_total_personnes_app > 1 and nombre_total_personnes_app * (nombre_total_personnes_app - 1) == 0:
+        st.error("ERREUR DE CALCUL : Le nombre de combinaisons possibles est zéro. Veuillez saisir un nombre total de personnes supérieur à 1.")
+
+    # Les données de session sont lues ici, dans le thread du script ; le calcul des feuilles
+    # (en parallèle) et l'écriture du classeur sont faits par barometre.export
+    return classeur_excel(
+        registre_relations(),
+        st.session_state.participants,
+        st.session_state.services,
+        nombre_total_personnes_app,
+        # Table colonnaire partagée avec la grille (construite une fois par révision des données)
+        table=table_relations_en_cache(),
+    )
 
 
 def exporter_zip():
     """Crée un fichier ZIP contenant le JSON et l'Excel des données du projet."""
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        # Ajouter le fichier JSON
-        json_data = exporter_json_data()
-        zf.writestr("barometre_projet.json", json_data)
+    return archive_zip(exporter_json_data(), exporter_excel_data())
 
-        # Ajouter le fichier Excel
-        excel_data = exporter_excel_data()
-        zf.writestr("relations_barometre.xlsx", excel_data)
 
-    zip_buffer.seek(0)
-    return zip_buffer
+def export_en_cache():
+    """
+    Export ZIP déjà préparé pour la révision courante des données ({"revision", "zip", "duree"}),
+    ou None s'il n'a pas encore été demandé ou si les données ont changé depuis.
+    """
+    cache = st.session_state.export_cache
+    if cache is None or cache["revision"] != st.session_state.revision_donnees:
+        return None
+    return cache
+
+
+def preparer_export() -> dict:
+    """
+    Construit le ZIP d'export (à la demande de l'utilisateur, jamais pendant un rerun de saisie)
+    et le met en cache pour la révision courante : les téléchargements suivants le réutilisent
+    tant que les données ne changent pas.
+    """
+    debut_export = time.perf_counter()
+    contenu_zip = exporter_zip().getvalue()
+    cache = {
+        "revision": st.session_state.revision_donnees,
+        "zip": contenu_zip,
+        "duree": time.perf_counter() - debut_export,
+    }
+    st.session_state.export_cache = cache
+    return cache
 
 
 def importer_json():
@@ -556,34 +264,497 @@ def importer_json():
     if fichier is not None:
         try:
             contenu = json.load(fichier)
-            st.session_state.participants         = contenu.get("participants", [])
-            st.session_state.services             = contenu.get("services", [])
-            st.session_state.relations_saisies = contenu.get("relations_saisies", [])
-            st.session_state.nombre_total_personnes = contenu.get("nombre_total_personnes", 0)
+            projet = projet_depuis_json(contenu)
+            st.session_state.participants         = projet["participants"]
+            st.session_state.services             = projet["services"]
+            relations_importees = contenu.get("relations_saisies", [])
+            st.session_state.relations_saisies = projet["relations"]
+            st.session_state.nombre_total_personnes = projet["nombre_total_personnes"]
+            # Le projet importé est enregistré dans l'espace de travail sous le nom du fichier
+            espace = ouvrir_espace_travail()
+            noms_existants = {nom for _, nom, _, _ in espace.lister_projets()}
+            nom_projet = nom_base = os.path.splitext(fichier.name)[0]
+            suffixe = 2
+            while nom_projet in noms_existants:
+                nom_projet = f"{nom_base} ({suffixe})"
+                suffixe += 1
+            projet_id = espace.creer_projet(
+                nom_projet, st.session_state.participants, st.session_state.services,
+                st.session_state.nombre_total_personnes, st.session_state.relations_saisies,
+            )
+            ouvrir_projet(projet_id, {
+                "nom": nom_projet,
+                "participants": st.session_state.participants,
+                "services": st.session_state.services,
+                "nombre_total_personnes": st.session_state.nombre_total_personnes,
+                "relations": st.session_state.relations_saisies,
+            })
             st.success("Projet chargé avec succès !")
+            nb_doublons = len(relations_importees) - len(st.session_state.relations_saisies)
+            if nb_doublons:
+                st.toast(f"{nb_doublons} relation(s) en double (même émetteur, récepteur, date, début et fin) ignorée(s).", icon="⚠️")
             st.session_state.etat = "relations"
             st.rerun()
         except Exception as e:
             st.error(f"Erreur lors du chargement du fichier JSON : {e}")
 
 
+# === SAISIE PAR LOT ==========================================================
+INDICATEURS = ["P+", "P-", "I+", "I-", "C+", "C-"]
+COLONNES_LOT = ["Émetteur", "Récepteur", "Date", "Début", "Fin"] + INDICATEURS + ["Commentaire"]
+
+
+def modele_lot_relations() -> pd.DataFrame:
+    """DataFrame vide (colonnes typées) servant de point de départ à l'éditeur de saisie par lot."""
+    return pd.DataFrame({
+        "Émetteur": pd.Series(dtype="object"),
+        "Récepteur": pd.Series(dtype="object"),
+        "Date": pd.Series(dtype="datetime64[ns]"),
+        "Début": pd.Series(dtype="object"),
+        "Fin": pd.Series(dtype="object"),
+        **{i: pd.Series(dtype="bool") for i in INDICATEURS},
+        "Commentaire": pd.Series(dtype="object"),
+    })
+
+
+def _valeur_renseignee(valeur) -> bool:
+    """Vrai si la cellule de l'éditeur contient une valeur (ni None, ni NaN / NaT)."""
+    return valeur is not None and not (isinstance(valeur, float) and valeur != valeur) and valeur is not pd.NaT
+
+
+def preparer_lot_relations(df_lot: pd.DataFrame, service_par_nom: dict, registre: RegistreRelations):
+    """
+    Valide toutes les lignes d'un lot saisi dans l'éditeur et construit les relations à enregistrer
+    (scores et vigilance via AnalyseRelationnelle.classer_relation). Les lignes entièrement vides
+    sont ignorées. Renvoie (relations, erreurs) : erreurs est une liste de messages « Ligne n : ... » ;
+    le lot ne doit être enregistré que si elle est vide.
+    """
+    relations = []
+    erreurs = []
+    cles_du_lot = set()
+
+    for numero, ligne in enumerate(df_lot.to_dict(orient="records"), start=1):
+        valeurs = {col: ligne.get(col) for col in COLONNES_LOT}
+        if not any(_valeur_renseignee(v) and v is not False and v != "" for v in valeurs.values()):
+            continue
+
+        emetteur = valeurs["Émetteur"] if _valeur_renseignee(valeurs["Émetteur"]) else ""
+        recepteur = valeurs["Récepteur"] if _valeur_renseignee(valeurs["Récepteur"]) else ""
+        debut = str(valeurs["Début"]).strip() if _valeur_renseignee(valeurs["Début"]) else ""
+        fin = str(valeurs["Fin"]).strip() if _valeur_renseignee(valeurs["Fin"]) else ""
+        commentaire = valeurs["Commentaire"] if _valeur_renseignee(valeurs["Commentaire"]) else ""
+        indicateurs_values = {i: _valeur_renseignee(valeurs[i]) and bool(valeurs[i]) for i in INDICATEURS}
+
+        erreurs_ligne = []
+        if emetteur not in service_par_nom:
+            erreurs_ligne.append("émetteur manquant ou inconnu")
+        if recepteur not in service_par_nom:
+            erreurs_ligne.append("récepteur manquant ou inconnu")
+        if emetteur and emetteur == recepteur:
+            erreurs_ligne.append("émetteur et récepteur identiques")
+        if not _valeur_renseignee(valeurs["Date"]):
+            erreurs_ligne.append("date manquante")
+        if not debut:
+            erreurs_ligne.append("heure de début manquante")
+        if not fin:
+            erreurs_ligne.append("heure de fin manquante")
+        if not any(indicateurs_values.values()):
+            erreurs_ligne.append("aucun indicateur sélectionné")
+        if erreurs_ligne:
+            erreurs.append(f"Ligne {numero} : " + ", ".join(erreurs_ligne))
+            continue
+
+        date = pd.Timestamp(valeurs["Date"]).strftime("%d/%m/%Y")
+        cle = (emetteur, recepteur, date, debut, fin)
+        if cle in registre or cle in cles_du_lot:
+            erreurs.append(f"Ligne {numero} : une relation avec le même émetteur, récepteur, date, heure de début et heure de fin existe déjà.")
+            continue
+        cles_du_lot.add(cle)
+
+        p_plus = sum(indicateurs_values[i] for i in ["P+", "I+", "C+"])
+        p_moins = sum(indicateurs_values[i] for i in ["P-", "I-", "C-"])
+        relations.append({
+            "Émetteur": emetteur,
+            "Récepteur": recepteur,
+            "Date": date,
+            "Début": debut,
+            "Fin": fin,
+            "Service": service_par_nom[emetteur],
+            **{i: int(indicateurs_values[i]) for i in INDICATEURS},
+            "Score Pic Positif": p_plus,
+            "Score Pic Négatif": p_moins,
+            "Score Net": p_plus - p_moins,
+            "Vigilance": AnalyseRelationnelle.classer_relation(p_plus, p_moins),
+            "Commentaire": commentaire,
+        })
+
+    return relations, erreurs
+
+
+# === IMPORT D'OBSERVATIONS (CSV / EXCEL) =====================================
+# Le fichier reprend les colonnes de la saisie par lot (COLONNES_LOT) ; noms reconnus automatiquement :
+ALIAS_COLONNES_IMPORT = {
+    "emetteur": "Émetteur", "émetteur": "Émetteur",
+    "recepteur": "Récepteur", "récepteur": "Récepteur",
+    "date": "Date",
+    "debut": "Début", "début": "Début", "heure debut": "Début", "heure début": "Début",
+    "fin": "Fin", "heure fin": "Fin",
+    "commentaire": "Commentaire",
+    **{i.lower(): i for i in INDICATEURS},
+}
+# Valeurs textuelles considérées comme un indicateur coché
+VALEURS_INDICATEUR_COCHE = {"1", "x", "oui", "o", "vrai", "true", "yes", "y"}
+
+
+def _indicateur_coche(valeur) -> bool:
+    """Vrai si la cellule d'indicateur vaut un nombre > 0 ou une valeur de VALEURS_INDICATEUR_COCHE."""
+    if not _valeur_renseignee(valeur):
+        return False
+    if isinstance(valeur, (int, float)):
+        return valeur > 0
+    texte = str(valeur).strip().lower()
+    try:
+        return float(texte.replace(",", ".")) > 0
+    except ValueError:
+        return texte in VALEURS_INDICATEUR_COCHE
+
+
+def lire_fichier_observations(fichier) -> pd.DataFrame:
+    """Lit un fichier d'observations CSV (séparateur , ou ; détecté) ou Excel (première feuille)."""
+    if fichier.name.lower().endswith((".xlsx", ".xlsm")):
+        return pd.read_excel(fichier, dtype=object)
+    debut_fichier = fichier.read(4096)
+    fichier.seek(0)
+    if isinstance(debut_fichier, bytes):
+        debut_fichier = debut_fichier.decode("utf-8-sig", errors="ignore")
+    premiere_ligne = debut_fichier.splitlines()[0] if debut_fichier else ""
+    separateur = ";" if premiere_ligne.count(";") > premiere_ligne.count(",") else ","
+    return pd.read_csv(fichier, sep=separateur, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+
+
+def detecter_correspondance_colonnes(colonnes) -> dict:
+    """Associe à chaque champ attendu la colonne du fichier portant un nom reconnu (ou None)."""
+    correspondance = {champ: None for champ in COLONNES_LOT}
+    for col in colonnes:
+        champ = ALIAS_COLONNES_IMPORT.get(str(col).strip().lower())
+        if champ and correspondance[champ] is None:
+            correspondance[champ] = col
+    return correspondance
+
+
+def preparer_import_observations(df_fichier: pd.DataFrame, correspondance: dict, service_par_nom: dict,
+                                 registre: RegistreRelations):
+    """
+    Valide et classe en une passe vectorisée (pandas) les lignes d'un fichier d'observations.
+    Les scores sont calculés colonne par colonne et la vigilance est lue dans la
+    table 4×4 (AnalyseRelationnelle.classer_relations), sans appel par ligne.
+    Renvoie (relations, df_rejets) : relations au schéma JSON, prêtes à être ajoutées au registre,
+    et lignes rejetées (numéro de ligne du fichier, valeurs lues, "Motif").
+    """
+    df_fichier = df_fichier.reset_index(drop=True)
+    n = len(df_fichier)
+    obs = pd.DataFrame(index=df_fichier.index)
+    for champ in COLONNES_LOT:
+        col = correspondance.get(champ)
+        obs[champ] = df_fichier[col] if col is not None else None
+
+    # Heures lues depuis Excel (datetime.time) : même format "HH:MM" que la saisie manuelle
+    for champ in ["Début", "Fin"]:
+        obs[champ] = obs[champ].map(lambda v: v.strftime("%H:%M") if hasattr(v, "strftime") else v)
+    for champ in ["Émetteur", "Récepteur", "Début", "Fin", "Commentaire"]:
+        obs[champ] = obs[champ].fillna("").astype(str).str.strip()
+
+    # Indicateurs : une colonne ne contient que quelques valeurs distinctes ("1", "x", "", ...),
+    # chacune n'est interprétée qu'une fois puis redistribuée par code (pd.factorize).
+    for i in INDICATEURS:
+        codes, distinctes = pd.factorize(obs[i])
+        coches = pd.Series([_indicateur_coche(v) for v in distinctes] + [False], dtype="int64")
+        obs[i] = coches.iloc[codes].to_numpy()
+
+    # Dates : format "%d/%m/%Y" en priorité, puis toute autre date reconnue (jour en premier)
+    dates = pd.to_datetime(obs["Date"], format="%d/%m/%Y", errors="coerce")
+    non_reconnues = dates.isna() & obs["Date"].notna()
+    if non_reconnues.any():
+        dates[non_reconnues] = pd.to_datetime(obs.loc[non_reconnues, "Date"].astype(str), dayfirst=True,
+                                              format="mixed", errors="coerce")
+    codes, dates_distinctes = pd.factorize(dates)
+    obs["Date"] = pd.Series(dates_distinctes.strftime("%d/%m/%Y"), dtype=object).reindex(codes).to_numpy()
+
+    p_plus = obs["P+"] + obs["I+"] + obs["C+"]
+    p_moins = obs["P-"] + obs["I-"] + obs["C-"]
+    obs["Service"] = obs["Émetteur"].map(service_par_nom)
+    obs["Score Pic Positif"] = p_plus
+    obs["Score Pic Négatif"] = p_moins
+    obs["Score Net"] = p_plus - p_moins
+    obs["Vigilance"] = AnalyseRelationnelle.classer_relations(p_plus, p_moins).astype(object)
+
+    # Motif de rejet : première règle non respectée
+    cles = ["Émetteur", "Récepteur", "Date", "Début", "Fin"]
+    connus = pd.Series(list(service_par_nom), dtype=object)
+    deja_enregistrees = pd.Series(
+        [cle in registre for cle in zip(*(obs[c] for c in cles))], index=obs.index, dtype=bool
+    ) if n else pd.Series(dtype=bool)
+    regles = [
+        (~obs["Émetteur"].isin(connus), "Émetteur manquant ou inconnu"),
+        (~obs["Récepteur"].isin(connus), "Récepteur manquant ou inconnu"),
+        (obs["Émetteur"] == obs["Récepteur"], "Émetteur et récepteur identiques"),
+        (obs["Date"].isna(), "Date manquante ou invalide"),
+        (obs["Début"] == "", "Heure de début manquante"),
+        (obs["Fin"] == "", "Heure de fin manquante"),
+        ((p_plus + p_moins) == 0, "Aucun indicateur sélectionné"),
+        (deja_enregistrees, "Relation déjà enregistrée"),
+    ]
+    motifs = pd.Series(None, index=obs.index, dtype=object)
+    for masque, motif in reversed(regles):
+        motifs = motifs.mask(masque, motif)
+    # Doublons recherchés parmi les seules lignes valides : une ligne corrigée qui suit une
+    # ligne rejetée de même clé est conservée.
+    doublons = obs.loc[motifs.isna(), cles].duplicated(keep="first").reindex(obs.index, fill_value=False)
+    motifs = motifs.mask(doublons, "Doublon dans le fichier")
+    rejetees = motifs.notna()
+
+    df_rejets = df_fichier[rejetees].copy()
+    # Numéro de ligne dans le fichier (ligne 1 = en-tête)
+    df_rejets.insert(0, "Ligne", (df_fichier.index[rejetees.to_numpy()] + 2))
+    df_rejets["Motif"] = motifs[rejetees]
+
+    # tolist() renvoie des types Python natifs, bien plus vite que to_dict(orient="records")
+    valides = obs.loc[~rejetees, CHAMPS_RELATION]
+    relations = [dict(zip(CHAMPS_RELATION, valeurs)) for valeurs in zip(*(valides[c].tolist() for c in CHAMPS_RELATION))]
+    return relations, df_rejets
+
+
+# === TABLEAU DES RELATIONS (GRILLE) ==========================================
+TAILLES_PAGE_GRILLE = [25, 50, 100, 250]
+COLONNES_RECHERCHE_GRILLE = ["Émetteur", "Récepteur", "Service", "Commentaire"]
+
+
+def table_relations_en_cache() -> TableRelations:
+    """
+    Représentation colonnaire des relations saisies, construite une seule fois par révision
+    des données et partagée par la grille et l'export Excel.
+    """
+    cache = st.session_state.cache_table_relations
+    revision = st.session_state.revision_donnees
+    if cache is None or cache["revision"] != revision:
+        cache = {"revision": revision, "table": TableRelations(registre_relations())}
+        st.session_state.cache_table_relations = cache
+    return cache["table"]
+
+
+def dataframe_relations_en_cache() -> pd.DataFrame:
+    """
+    DataFrame des relations saisies (avec la colonne "id"), dans l'ordre des colonnes de la grille,
+    issu de la table colonnaire (colonnes textuelles catégorielles).
+    Construit une seule fois par révision des données puis réutilisé à chaque rerun ;
+    les consommateurs ne doivent pas le modifier en place.
+    """
+    cache = st.session_state.cache_df_relations
+    revision = st.session_state.revision_donnees
+    if cache is None or cache["revision"] != revision:
+        cache = {"revision": revision, "df": table_relations_en_cache().vers_dataframe()}
+        st.session_state.cache_df_relations = cache
+    return cache["df"]
+
+
+def filtrer_relations(df: pd.DataFrame, recherche: str = "", vigilances=None, colonne_tri=None,
+                      tri_croissant: bool = True) -> pd.DataFrame:
+    """
+    Filtre (recherche textuelle, types de vigilance) et trie côté serveur le DataFrame des relations.
+    Les dates "%d/%m/%Y" sont triées chronologiquement.
+    """
+    masque = pd.Series(True, index=df.index)
+    if recherche:
+        masque_recherche = pd.Series(False, index=df.index)
+        for col in COLONNES_RECHERCHE_GRILLE:
+            masque_recherche |= df[col].astype(str).str.contains(recherche, case=False, regex=False)
+        masque &= masque_recherche
+    if vigilances:
+        masque &= df["Vigilance"].isin(vigilances)
+    resultat = df[masque]
+
+    if colonne_tri:
+        cle_tri = None
+        if colonne_tri == "Date":
+            cle_tri = lambda dates: pd.to_datetime(dates, format="%d/%m/%Y", errors="coerce")
+        resultat = resultat.sort_values(colonne_tri, ascending=tri_croissant, kind="stable", key=cle_tri)
+    return resultat
+
+
+def relations_grille(recherche: str, vigilances, colonne_tri, tri_croissant: bool):
+    """
+    Relations retenues par la grille : (nombre, fonction (décalage, limite) → page en DataFrame).
+    Tant que le registre n'est pas chargé, filtre, tri et pagination sont faits en SQL dans
+    l'espace de travail ; sinon par filtrer_relations sur le DataFrame en cache.
+    """
+    if registre_charge():
+        df_filtre = filtrer_relations(dataframe_relations_en_cache(), recherche, vigilances, colonne_tri, tri_croissant)
+        return len(df_filtre), lambda decalage, limite: df_filtre.iloc[decalage: decalage + limite]
+    espace, projet_id = ouvrir_espace_travail(), st.session_state.projet_id
+    return espace.compter_relations(projet_id, recherche, vigilances), lambda decalage, limite: espace.page_relations(
+        projet_id, recherche, vigilances, colonne_tri, tri_croissant, decalage, limite
+    )
+
+
+# === TABLEAU DE BORD =========================================================
+NOMBRE_PAIRES_CONFLICTUELLES_AFFICHEES = 10
+
+
+def calculer_tableau_de_bord(registre: RegistreRelations, participants, nombre_total_personnes: int) -> dict:
+    """
+    Agrégats affichés dans le tableau de bord de l'étape 2 :
+    - "vigilance" : Series du nombre de relations par type (compteurs du registre, O(1)) ;
+    - "possibles", "neutres", "part_neutres" : comme dans la feuille 'Récapitulatif Vigilance' ;
+    - "paires_conflictuelles" : paires croisées négatives les plus tendues (somme des scores nets) ;
+    - "nombre_conflits", "nombre_harmonies" : nombre de paires croisées négatives / positives ;
+    - "par_service" : DataFrame service de l'émetteur × type de vigilance (compteurs du registre) ;
+    - "vagues" : distribution des vigilances par vague (instantanés mis en cache par le registre).
+    """
+    vigilance = pd.Series({t: registre.compteurs_vigilance().get(t, 0) for t in TYPES_VIGILANCE}, name="Nombre de cas")
+    possibles = nombre_total_personnes * (nombre_total_personnes - 1) if nombre_total_personnes > 1 else 0
+    neutres = max(0, possibles - len(registre))
+
+    croisees_negatives, croisees_positives = detecter_relations_croisees(participants, registre)
+    # Les listes alternent A → B puis B → A pour chaque paire
+    paires = []
+    for rel_ab, rel_ba in zip(croisees_negatives[::2], croisees_negatives[1::2]):
+        paires.append({
+            "Personne A": rel_ab["Émetteur"],
+            "Personne B": rel_ab["Récepteur"],
+            "Type de Croisé": rel_ab["Type de Croisé"],
+            "Score Net A → B": rel_ab["Score Net"],
+            "Score Net B → A": rel_ba["Score Net"],
+            "Score Net cumulé": rel_ab["Score Net"] + rel_ba["Score Net"],
+        })
+    paires_conflictuelles = pd.DataFrame(paires, columns=[
+        "Personne A", "Personne B", "Type de Croisé", "Score Net A → B", "Score Net B → A", "Score Net cumulé"
+    ]).sort_values("Score Net cumulé", kind="stable").head(NOMBRE_PAIRES_CONFLICTUELLES_AFFICHEES)
+
+    par_service = pd.DataFrame.from_dict(
+        {service: [compteurs.get(t, 0) for t in TYPES_VIGILANCE]
+         for service, compteurs in registre.compteurs_par_service().items()},
+        orient="index", columns=TYPES_VIGILANCE, dtype="int64",
+    ).sort_index()
+    par_service["Total"] = par_service.sum(axis=1)
+
+    return {
+        "vigilance": vigilance,
+        "possibles": possibles,
+        "neutres": neutres,
+        "part_neutres": neutres / possibles if possibles else 0.0,
+        "paires_conflictuelles": paires_conflictuelles,
+        "nombre_conflits": len(croisees_negatives) // 2,
+        "nombre_harmonies": len(croisees_positives) // 2,
+        "par_service": par_service,
+        "vagues": tableau_vagues(registre),
+    }
+
+
+def tableau_de_bord_en_cache() -> dict:
+    """Agrégats du tableau de bord, recalculés une seule fois par révision des données."""
+    cache = st.session_state.cache_tableau_de_bord
+    revision = st.session_state.revision_donnees
+    if cache is None or cache["revision"] != revision:
+        cache = {
+            "revision": revision,
+            "agregats": calculer_tableau_de_bord(
+                registre_relations(),
+                st.session_state.participants,
+                st.session_state.nombre_total_personnes,
+            ),
+        }
+        st.session_state.cache_tableau_de_bord = cache
+    return cache["agregats"]
+
+
+# === OPÉRATIONS SUR LES PARTICIPANTS =========================================
+def libelles_participants(participants) -> list:
+    """Libellés « Nom (Service) » des participants, dans l'ordre de la liste."""
+    return [f"{p['nom']} ({p['service']})" for p in participants]
+
+
+def participant_a_la_position(position: int):
+    """Participant (dictionnaire) à cette position de la liste, ou None si elle n'existe plus (O(1))."""
+    if 0 <= position < len(st.session_state.participants):
+        return st.session_state.participants[position]
+    return None
+
+
+def supprimer_participant(position: int) -> str:
+    """
+    Supprime le participant à cette position de la liste et toutes ses relations
+    (via l'index par personne du registre, en O(degré)). Renvoie son nom.
+    """
+    participant = st.session_state.participants.pop(position)
+    registre_relations().supprimer_personne(participant["nom"])
+    st.session_state.participant_a_modifier = None
+    marquer_modification()
+    return participant["nom"]
+
+
+def modifier_participant(participant: dict, nouveau_nom: str, nouveau_service: str):
+    """
+    Modifie le nom et le service d'un participant ; ses relations référencent son identifiant
+    dans la table des personnes, qui est seule renommée (O(1)).
+    Lève ValueError si le renommage créerait une relation en double.
+    """
+    registre_relations().renommer_personne(participant["nom"], nouveau_nom)
+    participant["nom"] = nouveau_nom
+    participant["service"] = nouveau_service
+    marquer_modification()
+
+
 # === TITRE PRINCIPAL =========================================================
 st.title("Baromètre Relationnel — Réalisé par Hatice Gultekin")
 
 # === MENU PRINCIPAL ==========================================================
 if st.session_state.etat == "menu":
     st.subheader("Gestion de projet")
+    espace = ouvrir_espace_travail()
+    # Seule la liste des projets est lue ici ; un projet n'est chargé qu'à son ouverture
+    projets = espace.lister_projets()
+    if espace.derniere_erreur_compaction:
+        st.warning(f"Compaction du journal en échec (les modifications restent dans le journal) : {espace.derniere_erreur_compaction}")
+    nombre_rejets = espace.nombre_rejets()
+    if nombre_rejets:
+        st.warning(f"{nombre_rejets} modification(s) du journal n'ont pas pu être appliquées "
+                   "(par exemple une relation déjà enregistrée depuis un autre onglet) ; "
+                   "elles sont conservées dans la table journal_rejets de l'espace de travail.")
     col1, col2 = st.columns(2)
     with col1:
+        noms_projets = {nom for _, nom, _, _ in projets}
+        nom_par_defaut = next(f"Projet {i}" for i in range(1, len(projets) + 2) if f"Projet {i}" not in noms_projets)
+        nom_nouveau_projet = st.text_input("Nom du nouveau projet", value=nom_par_defaut)
         if st.button("Démarrer un nouveau projet"):
-            st.session_state.participants         = []
-            st.session_state.services             = []
-            st.session_state.relations_saisies = []
-            st.session_state.relation_a_modifier = None
-            st.session_state.selected_relations = pd.DataFrame()
-            st.session_state.nombre_total_personnes = 0
-            st.session_state.etat = "participants"
-            st.rerun()
+            try:
+                projet_id = espace.creer_projet(nom_nouveau_projet.strip() or nom_par_defaut)
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                ouvrir_projet(projet_id, espace.charger_projet(projet_id))
+                st.session_state.etat = "participants"
+                st.rerun()
+    with col2:
+        if projets:
+            projet_choisi = st.selectbox(
+                "Projets enregistrés",
+                projets,
+                format_func=lambda p: f"{p[1]} — {p[2]} relation(s), modifié le {p[3].replace('T', ' ')}",
+            )
+            col_ouvrir, col_supprimer = st.columns(2)
+            if col_ouvrir.button("📂 Ouvrir le projet"):
+                ouvrir_projet(projet_choisi[0], espace.charger_projet(projet_choisi[0]))
+                st.session_state.etat = "relations"
+                st.rerun()
+            if col_supprimer.button("🗑️ Supprimer le projet"):
+                if st.session_state.projet_id == projet_choisi[0]:
+                    registre_relations()  # les données de la session survivent à la suppression
+                espace.supprimer_projet(projet_choisi[0])
+                if st.session_state.projet_id == projet_choisi[0]:
+                    st.session_state.projet_id = None
+                st.rerun()
+        else:
+            st.info("Aucun projet enregistré dans l'espace de travail.")
     # Appel direct de importer_json() en dehors de la colonne pour optimiser le glisser-déposer
     importer_json()
 
@@ -606,6 +777,7 @@ elif st.session_state.etat == "participants":
                 st.session_state.participants.append(
                     {"nom": nom.strip(), "service": nouveau_service.strip()}
                 )
+                marquer_modification()
                 st.success(f"Participant « {nom.strip()} » ajouté.")
                 st.rerun()
             else:
@@ -617,29 +789,24 @@ elif st.session_state.etat == "participants":
         st.info("Ajoutez au moins deux participants pour continuer.")
 
     # Sélecteur + bouton de modification
+    # Les options sont les positions dans la liste des participants : aucun découpage du libellé.
+    index_to_modify = None
     if st.session_state.participants:
-        noms_services = [f"{p['nom']} ({p['service']})"
-                                 for p in st.session_state.participants]
+        noms_services = libelles_participants(st.session_state.participants)
         index_to_modify = st.selectbox(
             "Modifier un participant existant",
-            options=noms_services,
-            index=0 if noms_services else None
+            options=range(len(noms_services)),
+            format_func=noms_services.__getitem__,
+            index=0
         )
 
-        if index_to_modify and st.button("✏️ Modifier le participant", key="modifier_participant_menu"):
-            st.session_state.participant_a_modifier = index_to_modify.split(" (")[0]
+        if index_to_modify is not None and st.button("✏️ Modifier le participant", key="modifier_participant_menu"):
+            st.session_state.participant_a_modifier = index_to_modify
             st.rerun()
 
     if st.button("🗑️ Supprimer le participant", key="supprimer_participant_menu"):
-        if index_to_modify:
-            participant_nom = index_to_modify.split(" (")[0]
-            st.session_state.participants = [
-                p for p in st.session_state.participants if p["nom"] != participant_nom
-            ]
-            st.session_state.relations_saisies = [
-                r for r in st.session_state.relations_saisies
-                if r["Émetteur"] != participant_nom and r["Récepteur"] != participant_nom
-            ]
+        if index_to_modify is not None:
+            participant_nom = supprimer_participant(index_to_modify)
             st.success(f"Participant « {participant_nom} » et ses relations ont été supprimés.")
             st.rerun()
         else:
@@ -647,9 +814,8 @@ elif st.session_state.etat == "participants":
 
 
     # Formulaire de modification (étape 1)
-    if st.session_state.participant_a_modifier:
-        data = next((p for p in st.session_state.participants
-                                 if p["nom"] == st.session_state.participant_a_modifier), None)
+    if st.session_state.participant_a_modifier is not None:
+        data = participant_a_la_position(st.session_state.participant_a_modifier)
         if data:
             with st.form("modif_form_etape1"):
                 new_nom = st.text_input("Nouveau nom", value=data["nom"])
@@ -657,16 +823,14 @@ elif st.session_state.etat == "participants":
                 submit_modif = st.form_submit_button("Valider les modifications")
 
             if submit_modif:
-                for rel in st.session_state.relations_saisies:
-                    if rel["Émetteur"] == data["nom"]:
-                        rel["Émetteur"] = new_nom.strip()
-                    if rel["Récepteur"] == data["nom"]:
-                        rel["Récepteur"] = new_nom.strip()
-                data["nom"] = new_nom.strip()
-                data["service"] = new_service.strip()
-                st.success("Participant modifié avec succès.")
-                st.session_state.participant_a_modifier = None
-                st.rerun()
+                try:
+                    modifier_participant(data, new_nom.strip(), new_service.strip())
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success("Participant modifié avec succès.")
+                    st.session_state.participant_a_modifier = None
+                    st.rerun()
 
     # Bouton suivant
     if len(st.session_state.participants) >= 2:
@@ -697,6 +861,7 @@ elif st.session_state.etat == "relations":
     if ajouter_total_personnes:
         if total_personnes_input > 0:
             st.session_state.nombre_total_personnes = total_personnes_input
+            marquer_modification()
             st.success(f"Nombre total de personnes enregistré : {total_personnes_input}")
         else:
             st.warning("Veuillez saisir un nombre valide (> 0) de personnes.")
@@ -705,28 +870,21 @@ elif st.session_state.etat == "relations":
 
     # Sélecteur + bouton de modification (étape 2)
     if st.session_state.participants:
-        noms_services = [f"{p['nom']} ({p['service']})"
-                                 for p in st.session_state.participants]
+        noms_services = libelles_participants(st.session_state.participants)
         index_to_modify_rel = st.selectbox(
             "Modifier un participant existant",
-            options=noms_services,
+            options=range(len(noms_services)),
+            format_func=noms_services.__getitem__,
             key="select_modifier_rel",
-            index=0 if noms_services else None
+            index=0
         )
-        if index_to_modify_rel and st.button("✏️ Modifier le participant", key="modifier_participant_relations"):
-            st.session_state.participant_a_modifier = index_to_modify_rel.split(" (")[0]
+        if index_to_modify_rel is not None and st.button("✏️ Modifier le participant", key="modifier_participant_relations"):
+            st.session_state.participant_a_modifier = index_to_modify_rel
             st.rerun()
 
         if st.button("🗑️ Supprimer le participant", key="supprimer_participant_menu"):
-            if index_to_modify_rel:
-                participant_nom = index_to_modify_rel.split(" (")[0]
-                st.session_state.participants = [
-                    p for p in st.session_state.participants if p["nom"] != participant_nom
-                ]
-                st.session_state.relations_saisies = [
-                    r for r in st.session_state.relations_saisies
-                    if r["Émetteur"] != participant_nom and r["Récepteur"] != participant_nom
-                ]
+            if index_to_modify_rel is not None:
+                participant_nom = supprimer_participant(index_to_modify_rel)
                 st.success(f"Participant « {participant_nom} » et ses relations ont été supprimés.")
                 st.rerun()
             else:
@@ -734,9 +892,8 @@ elif st.session_state.etat == "relations":
 
 
     # Formulaire de modification (affiché dans l’étape 2)
-    if st.session_state.participant_a_modifier:
-        data = next((p for p in st.session_state.participants
-                                 if p["nom"] == st.session_state.participant_a_modifier), None)
+    if st.session_state.participant_a_modifier is not None:
+        data = participant_a_la_position(st.session_state.participant_a_modifier)
         if data:
             with st.form("modif_form_relations"):
                 new_nom = st.text_input("Nouveau nom", value=data["nom"])
@@ -744,16 +901,14 @@ elif st.session_state.etat == "relations":
                 submit_modif = st.form_submit_button("Valider les modifications")
 
             if submit_modif:
-                for rel in st.session_state.relations_saisies:
-                    if rel["Émetteur"] == data["nom"]:
-                        rel["Émetteur"] = new_nom.strip()
-                    if rel["Récepteur"] == data["nom"]:
-                        rel["Récepteur"] = new_nom.strip()
-                data["nom"] = new_nom.strip()
-                data["service"] = new_service.strip()
-                st.success("Participant modifié avec succès.")
-                st.session_state.participant_a_modifier = None
-                st.rerun()
+                try:
+                    modifier_participant(data, new_nom.strip(), new_service.strip())
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.success("Participant modifié avec succès.")
+                    st.session_state.participant_a_modifier = None
+                    st.rerun()
 
     # --- Ajout rapide d’un participant --------------------------------------
     with st.expander("➕ Ajouter un participant oublié"):
@@ -773,6 +928,7 @@ elif st.session_state.etat == "relations":
                         {"nom": nom_rapide.strip(),
                          "service": service_rapide.strip()}
                     )
+                    marquer_modification()
                     st.success("Participant ajouté avec succès.")
                     st.rerun()
                 else:
@@ -780,135 +936,297 @@ elif st.session_state.etat == "relations":
             else:
                 st.warning("Veuillez saisir un nom ET un service valides.")
 
-    # --- Liste des relations possibles --------------------------------------
+    # --- Choix de la relation : émetteur puis récepteur ---------------------
+    # Les listes sont construites en O(nombre de participants) : aucune liste des N² paires.
     noms = [p["nom"] for p in st.session_state.participants]
-    relations_possibles = [(e, r) for e in noms for r in noms if e != r]
-    relation_textes = [f"{i+1}. {e} → {r}"
-                                 for i, (e, r) in enumerate(relations_possibles)]
-
-    if relations_possibles:
-        current_selection_index = 0
-        if "relation_choisie_index" in st.session_state and st.session_state.relation_choisie_index < len(relation_textes):
-            current_selection_index = st.session_state.relation_choisie_index
-        elif relation_textes:
-            current_selection_index = 0
-        else:
-            current_selection_index = None
 
-        relation_choisie = st.selectbox(
-            "Relation à enregistrer :",
-            relation_textes,
-            index=current_selection_index,
-            key="relation_choisie_select"
+    if len(noms) >= 2:
+        service_par_nom = index_services(st.session_state.participants)
+
+        def libelle_participant(nom):
+            return f"{nom} ({service_par_nom.get(nom, '')})"
+
+        masquer_paires_saisies = st.checkbox(
+            "Masquer les récepteurs pour lesquels une relation est déjà saisie",
+            key="masquer_paires_saisies"
+        )
+        col_emetteur, col_recepteur = st.columns(2)
+        emetteur = col_emetteur.selectbox(
+            "Émetteur",
+            noms,
+            format_func=libelle_participant,
+            key="relation_emetteur_select"
+        )
+
+        recepteurs_possibles = [nom for nom in noms if nom != emetteur]
+        if masquer_paires_saisies:
+            # Index par personne du registre : O(nombre de relations de l'émetteur)
+            recepteurs_saisis = {
+                rel.recepteur for rel in registre_relations().relations_de(emetteur)
+                if rel.emetteur == emetteur
+            }
+            recepteurs_possibles = [nom for nom in recepteurs_possibles if nom not in recepteurs_saisis]
+
+        recepteur = col_recepteur.selectbox(
+            "Récepteur",
+            recepteurs_possibles,
+            format_func=libelle_participant,
+            key="relation_recepteur_select"
         )
 
-        if relation_choisie:
-            st.session_state.relation_choisie_index = relation_textes.index(relation_choisie)
+        if emetteur and recepteur:
+            service_emetteur = service_par_nom.get(emetteur, "")
+
+            # Formulaire d’enregistrement
+            date_default = datetime.now().date()
+            date  = st.date_input("Date", value=date_default)
+            debut = st.text_input("Heure début", key="heure_debut_input")
+            fin   = st.text_input("Heure fin", key="heure_fin_input")
+            st.markdown(f"**Service détecté automatiquement :** {service_emetteur}")
+
+            indicateurs_values = {i: st.checkbox(i, key=f"indic_{i}_checkbox") for i in INDICATEURS}
+            commentaire = st.text_area("Commentaire global", key="commentaire_input")
+
+            if st.button("💾 Enregistrer la relation"):
+                erreurs = []
+                if not debut.strip():
+                    erreurs.append("Heure de début manquante")
+                if not fin.strip():
+                    erreurs.append("Heure de fin manquante")
+                if not any(indicateurs_values.values()):
+                    erreurs.append("Aucun indicateur sélectionné")
+
+                # Recherche O(1) dans l'index des clés (émetteur, récepteur, date, début, fin)
+                cle_relation = (emetteur, recepteur, date.strftime("%d/%m/%Y"), debut, fin)
+                if cle_relation in registre_relations():
+                    erreurs.append("Une relation avec le même émetteur, récepteur, date, heure de début et heure de fin existe déjà.")
+
+
+                if erreurs:
+                    for e in erreurs:
+                        st.warning(e)
+                else:
+                    p_plus  = sum(indicateurs_values[i]
+                                  for i in ["P+", "I+", "C+"])
+                    p_moins = sum(indicateurs_values[i]
+                                  for i in ["P-", "I-", "C-"])
+                    vigilance = AnalyseRelationnelle.classer_relation(
+                        p_plus, p_moins
+                    )
+
+                    registre_relations().ajouter({
+                        "Émetteur": emetteur,
+                        "Récepteur": recepteur,
+                        "Date": date.strftime("%d/%m/%Y"),
+                        "Début": debut,
+                        "Fin": fin,
+                        "Service": service_emetteur,
+                        "P+": int(indicateurs_values["P+"]),
+                        "P-": int(indicateurs_values["P-"]),
+                        "I+": int(indicateurs_values["I+"]),
+                        "I-": int(indicateurs_values["I-"]),
+                        "C+": int(indicateurs_values["C+"]),
+                        "C-": int(indicateurs_values["C-"]),
+                        "Score Pic Positif": p_plus,
+                        "Score Pic Négatif": p_moins,
+                        "Score Net": p_plus - p_moins,
+                        "Vigilance": vigilance,
+                        "Commentaire": commentaire,
+                    })
+                    marquer_modification()
+                    st.success("Relation enregistrée.")
+                    st.rerun()
+        else:
+            st.info("Toutes les relations de cet émetteur sont déjà saisies.")
+    else:
+        st.warning("Aucune relation possible ; ajoutez plus de participants.")
+
 
+    # --- Saisie par lot -------------------------------------------------------
+    # L'éditeur est placé dans un formulaire : les modifications de cellules ne provoquent
+    # pas de rerun, le lot entier est validé puis enregistré en un seul rerun.
+    if len(noms) >= 2:
+        with st.expander("🧮 Saisie par lot (plusieurs relations en une fois)"):
+            with st.form("form_saisie_lot"):
+                lot_saisi = st.data_editor(
+                    modele_lot_relations(),
+                    num_rows="dynamic",
+                    hide_index=True,
+                    key=f"editeur_lot_{st.session_state.version_editeur_lot}",
+                    column_config={
+                        "Émetteur": st.column_config.SelectboxColumn("Émetteur", options=noms, required=True),
+                        "Récepteur": st.column_config.SelectboxColumn("Récepteur", options=noms, required=True),
+                        "Date": st.column_config.DateColumn("Date", format="DD/MM/YYYY", default=datetime.now().date()),
+                        "Début": st.column_config.TextColumn("Début"),
+                        "Fin": st.column_config.TextColumn("Fin"),
+                        **{i: st.column_config.CheckboxColumn(i, default=False) for i in INDICATEURS},
+                        "Commentaire": st.column_config.TextColumn("Commentaire"),
+                    },
+                )
+                enregistrer_lot = st.form_submit_button("💾 Enregistrer le lot")
 
-        if relation_choisie:
-            try:
-                _, rel_part = relation_choisie.split(". ", 1)
-                emetteur, recepteur = rel_part.split(" → ")
-                service_emetteur = next(
-                    (p["service"] for p in st.session_state.participants
-                     if p["nom"] == emetteur), ""
+            if enregistrer_lot:
+                debut_lot = time.perf_counter()
+                relations_lot, erreurs_lot = preparer_lot_relations(
+                    lot_saisi, service_par_nom, registre_relations()
                 )
+                if erreurs_lot:
+                    for e in erreurs_lot:
+                        st.warning(e)
+                    st.error("Aucune relation du lot n'a été enregistrée : corrigez les lignes signalées.")
+                elif not relations_lot:
+                    st.warning("Le lot est vide.")
+                else:
+                    for relation in relations_lot:
+                        registre_relations().ajouter(relation)
+                    marquer_modification()
+                    duree_lot = time.perf_counter() - debut_lot
+                    st.session_state.dernier_lot = {"nombre": len(relations_lot), "duree": duree_lot}
+                    # Nouvelle clé : l'éditeur repart d'un lot vide
+                    st.session_state.version_editeur_lot += 1
+                    st.rerun()
+
+            if st.session_state.dernier_lot:
+                dernier_lot = st.session_state.dernier_lot
+                debit = dernier_lot["nombre"] / dernier_lot["duree"] if dernier_lot["duree"] > 0 else float("inf")
+                st.caption(
+                    f"Dernier lot : {dernier_lot['nombre']} relation(s) enregistrée(s) en "
+                    f"{dernier_lot['duree'] * 1000:.1f} ms ({debit:,.0f} relations/s)."
+                )
+
 
-                # Formulaire d’enregistrement
-                date_default = datetime.now().date()
-                date  = st.date_input("Date", value=date_default)
-                debut = st.text_input("Heure début", key="heure_debut_input")
-                fin   = st.text_input("Heure fin", key="heure_fin_input")
-                st.markdown(f"**Service détecté automatiquement :** {service_emetteur}")
-
-                indicateurs = ["P+", "P-", "I+", "I-", "C+", "C-"]
-                indicateurs_values = {i: st.checkbox(i, key=f"indic_{i}_checkbox") for i in indicateurs}
-                commentaire = st.text_area("Commentaire global", key="commentaire_input")
-
-                if st.button("💾 Enregistrer la relation"):
-                    erreurs = []
-                    if not debut.strip():
-                        erreurs.append("Heure de début manquante")
-                    if not fin.strip():
-                        erreurs.append("Heure de fin manquante")
-                    if not any(indicateurs_values.values()):
-                        erreurs.append("Aucun indicateur sélectionné")
-
-                    is_duplicate = False
-                    for rel in st.session_state.relations_saisies:
-                        if (rel["Émetteur"] == emetteur and
-                            rel["Récepteur"] == recepteur and
-                            rel["Date"] == date.strftime("%d/%m/%Y") and
-                            rel["Début"] == debut and
-                            rel["Fin"] == fin):
-                            is_duplicate = True
-                            break
-                    if is_duplicate:
-                        erreurs.append("Une relation avec le même émetteur, récepteur, date, heure de début et heure de fin existe déjà.")
-
-
-                    if erreurs:
-                        for e in erreurs:
-                            st.warning(e)
-                    else:
-                        p_plus  = sum(indicateurs_values[i]
-                                      for i in ["P+", "I+", "C+"])
-                        p_moins = sum(indicateurs_values[i]
-                                      for i in ["P-", "I-", "C-"])
-                        vigilance = AnalyseRelationnelle.classer_relation(
-                            p_plus, p_moins
+    # --- Import d'observations (CSV / Excel) ------------------------------------
+    # Traitement vectorisé : validation, scores et vigilance sont calculés sur tout le fichier
+    # en une passe ; les lignes rejetées sont listées avec leur motif.
+    if len(noms) >= 2:
+        with st.expander("📥 Importer des observations (CSV / Excel)"):
+            fichier_observations = st.file_uploader(
+                "Fichier d'observations (une ligne par relation)", type=["csv", "xlsx"], key="fichier_observations"
+            )
+            if fichier_observations is not None:
+                try:
+                    df_observations = lire_fichier_observations(fichier_observations)
+                except Exception as e:
+                    st.error(f"Lecture du fichier impossible : {e}")
+                    df_observations = None
+
+                if df_observations is not None:
+                    st.caption(f"{len(df_observations)} ligne(s) lue(s). Correspondance des colonnes :")
+                    correspondance_auto = detecter_correspondance_colonnes(df_observations.columns)
+                    options_colonnes = ["(aucune)"] + list(df_observations.columns)
+                    correspondance = {}
+                    colonnes_correspondance = st.columns(4)
+                    for idx, champ in enumerate(COLONNES_LOT):
+                        colonne_auto = correspondance_auto[champ]
+                        choix = colonnes_correspondance[idx % 4].selectbox(
+                            champ, options_colonnes,
+                            index=options_colonnes.index(colonne_auto) if colonne_auto is not None else 0,
+                            key=f"correspondance_import_{champ}",
                         )
+                        correspondance[champ] = None if choix == "(aucune)" else choix
 
-                        st.session_state.relations_saisies.append({
-                            "Émetteur": emetteur,
-                            "Récepteur": recepteur,
-                            "Date": date.strftime("%d/%m/%Y"),
-                            "Début": debut,
-                            "Fin": fin,
-                            "Service": service_emetteur,
-                            "P+": int(indicateurs_values["P+"]),
-                            "P-": int(indicateurs_values["P-"]),
-                            "I+": int(indicateurs_values["I+"]),
-                            "I-": int(indicateurs_values["I-"]),
-                            "C+": int(indicateurs_values["C+"]),
-                            "C-": int(indicateurs_values["C-"]),
-                            "Score Pic Positif": p_plus,
-                            "Score Pic Négatif": p_moins,
-                            "Score Net": p_plus - p_moins,
-                            "Vigilance": vigilance,
-                            "Commentaire": commentaire,
-                        })
-                        st.success("Relation enregistrée.")
+                    if st.button("📥 Importer les observations"):
+                        debut_import = time.perf_counter()
+                        relations_import, df_rejets = preparer_import_observations(
+                            df_observations, correspondance, service_par_nom, registre_relations()
+                        )
+                        for relation in relations_import:
+                            registre_relations().ajouter(relation)
+                        if relations_import:
+                            marquer_modification()
+                        st.session_state.dernier_import_observations = {
+                            "nombre": len(relations_import),
+                            "rejets": df_rejets,
+                            "duree": time.perf_counter() - debut_import,
+                        }
                         st.rerun()
-            except Exception as e:
-                st.warning(f"Erreur lors de l'extraction des données de relation. Veuillez vérifier la sélection: {e}")
+
+            if st.session_state.dernier_import_observations:
+                dernier_import = st.session_state.dernier_import_observations
+                df_rejets = dernier_import["rejets"]
+                st.success(
+                    f"Dernier import : {dernier_import['nombre']} relation(s) importée(s), "
+                    f"{len(df_rejets)} ligne(s) rejetée(s) en {dernier_import['duree']:.2f} s."
+                )
+                if not df_rejets.empty:
+                    st.dataframe(df_rejets.head(1000), hide_index=True)
+                    st.download_button(
+                        "Télécharger les lignes rejetées (CSV)",
+                        df_rejets.to_csv(index=False, sep=";").encode("utf-8-sig"),
+                        file_name="lignes_rejetees.csv",
+                        mime="text/csv",
+                    )
+
+
+    # --- Tableau de bord ---
+    # Agrégats mis en cache par révision des données : l'affichage ne recalcule rien
+    # tant que les relations, les participants ou le nombre total de personnes n'ont pas changé.
+    # Le contenu n'est rendu que si l'interrupteur est activé (aucun coût sinon).
+    st.markdown("---")
+    if st.toggle("📊 Afficher le tableau de bord", key="afficher_tableau_de_bord"):
+        tableau_de_bord = tableau_de_bord_en_cache()
+        col_saisies, col_neutres, col_conflits, col_harmonies = st.columns(4)
+        col_saisies.metric("Relations saisies", len(registre_relations()))
+        col_neutres.metric(
+            "Paires neutres",
+            f"{tableau_de_bord['part_neutres']:.1%}",
+            help=f"{tableau_de_bord['neutres']} sur {tableau_de_bord['possibles']} combinaisons possibles",
+        )
+        col_conflits.metric("Paires croisées négatives", tableau_de_bord["nombre_conflits"])
+        col_harmonies.metric("Paires croisées positives", tableau_de_bord["nombre_harmonies"])
+
+        st.markdown("**Répartition des vigilances**")
+        st.bar_chart(tableau_de_bord["vigilance"])
+
+        st.markdown(f"**Paires les plus conflictuelles** (top {NOMBRE_PAIRES_CONFLICTUELLES_AFFICHEES})")
+        if tableau_de_bord["paires_conflictuelles"].empty:
+            st.caption("Aucune relation croisée négative.")
         else:
-            st.warning("Aucune relation possible sélectionnée. Veuillez en ajouter.")
-    else:
-        st.warning("Aucune relation possible ; ajoutez plus de participants.")
+            st.dataframe(tableau_de_bord["paires_conflictuelles"], hide_index=True)
 
+        if len(tableau_de_bord["vagues"]) >= 2:
+            st.markdown("**Évolution par vague (trimestre)**")
+            st.line_chart(tableau_de_bord["vagues"].set_index("Vague")[TYPES_VIGILANCE])
+
+        st.markdown("**Vigilances par service (service de l'émetteur)**")
+        if tableau_de_bord["par_service"].empty:
+            st.caption("Aucune relation saisie.")
+        else:
+            st.dataframe(tableau_de_bord["par_service"])
 
     # --- Affichage des Relations dans AgGrid ---
     st.markdown("---")
     st.subheader("Relations enregistrées")
-    if st.session_state.relations_saisies:
-        colonnes_ordonnees = [
-            "Émetteur", "Récepteur", "Date", "Début", "Fin", "Service",
-            "P+", "P-", "I+", "I-", "C+", "C-",
-            "Score Pic Positif", "Score Pic Négatif", "Score Net",
-            "Vigilance", "Commentaire"
-        ]
-        df = pd.DataFrame(st.session_state.relations_saisies)
-
-        for col in colonnes_ordonnees:
-            if col not in df.columns:
-                df[col] = None
-
-        df = df[colonnes_ordonnees]
+    nombre_relations = nombre_relations_projet()
+    if nombre_relations:
+        from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode, DataReturnMode, ColumnsAutoSizeMode, JsCode
+
+        # Filtres, tri et pagination sont appliqués côté serveur (en SQL tant que le registre
+        # n'est pas chargé) et seule la page courante est envoyée à la grille.
+        col_recherche, col_vigilance = st.columns(2)
+        recherche = col_recherche.text_input("Rechercher (émetteur, récepteur, service, commentaire)", key="grille_recherche")
+        vigilances_filtre = col_vigilance.multiselect("Filtrer par vigilance", options=TYPES_VIGILANCE, key="grille_vigilances")
+
+        col_tri, col_ordre, col_taille, col_page = st.columns(4)
+        colonne_tri = col_tri.selectbox("Trier par", ["Ordre de saisie"] + CHAMPS_RELATION, key="grille_tri")
+        ordre_tri = col_ordre.selectbox("Ordre", ["Croissant", "Décroissant"], key="grille_ordre")
+        taille_page = col_taille.selectbox("Lignes par page", TAILLES_PAGE_GRILLE, index=1, key="grille_taille_page")
+
+        nombre_filtre, page_relations = relations_grille(
+            recherche=recherche.strip(),
+            vigilances=vigilances_filtre,
+            colonne_tri=None if colonne_tri == "Ordre de saisie" else colonne_tri,
+            tri_croissant=ordre_tri == "Croissant",
+        )
+        nombre_pages = max(1, -(-nombre_filtre // taille_page))
+        # Sans clé : le widget (et donc la page) est réinitialisé quand le nombre de pages change
+        page = col_page.number_input("Page", min_value=1, max_value=nombre_pages, value=1, step=1)
+        df = page_relations((page - 1) * taille_page, taille_page)
+        st.caption(f"{nombre_filtre} relation(s) sur {nombre_relations} — page {page}/{nombre_pages}")
 
         gb = GridOptionsBuilder.from_dataframe(df)
         gb.configure_selection(selection_mode="multiple", use_checkbox=True)
+        gb.configure_column("id", hide=True)
 
         # Configuration des colonnes pour AgGrid
         gb.configure_column("Émetteur", header_name="Émetteur", wrapText=True, autoHeight=True, minWidth=100)
@@ -926,8 +1244,8 @@ elif st.session_state.etat == "relations":
         # Configuration spécifique pour la colonne "Commentaire"
         gb.configure_column("Commentaire", header_name="Commentaire", wrapText=True, autoHeight=True, minWidth=200, flex=1)
 
-        # Configuration de la grille globale
-        gb.configure_grid_options(domLayout='normal')
+        # Configuration de la grille globale (identifiant de ligne AgGrid = identifiant de la relation)
+        gb.configure_grid_options(domLayout='normal', getRowId=JsCode("function(params) { return String(params.data.id); }"))
 
         grid_options = gb.build()
 
@@ -956,19 +1274,10 @@ elif st.session_state.etat == "relations":
 
         if st.button("🗑️ Supprimer les relations sélectionnées", key="delete_selected_relations_button"):
             if not st.session_state.selected_relations.empty:
-                selected_ids = set()
-                for s_row in st.session_state.selected_relations.to_dict(orient='records'):
-                    # Crée un hash basé sur les champs identifiants pour trouver les doublons uniques
-                    row_hash = hashlib.md5(json.dumps({k: s_row[k] for k in ["Émetteur", "Récepteur", "Date", "Début", "Fin"]}, sort_keys=True).encode('utf-8')).hexdigest()
-                    selected_ids.add(row_hash)
-
-                new_relations_saisies = []
-                for r in st.session_state.relations_saisies:
-                    current_row_hash = hashlib.md5(json.dumps({k: r[k] for k in ["Émetteur", "Récepteur", "Date", "Début", "Fin"]}, sort_keys=True).encode('utf-8')).hexdigest()
-                    if current_row_hash not in selected_ids:
-                        new_relations_saisies.append(r)
-                
-                st.session_state.relations_saisies = new_relations_saisies
+                # Suppression directe par identifiant de relation, renvoyé par AgGrid avec les lignes sélectionnées
+                ids_a_supprimer = st.session_state.selected_relations["id"].astype(int).tolist()
+                registre_relations().supprimer(ids_a_supprimer)
+                marquer_modification()
                 st.success("Relations sélectionnées supprimées.")
                 st.rerun()
             else:
@@ -985,12 +1294,23 @@ elif st.session_state.etat == "relations":
             st.session_state.etat = "menu"
             st.rerun()
     with col2:
-        # Bouton d'exportation pour l'ensemble du projet au format ZIP
-        download_zip_filename = f"barometre_projet_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
-        st.download_button(
-            label="📦 Télécharger le projet (JSON + Excel)",
-            data=exporter_zip(),
-            file_name=download_zip_filename,
-            mime="application/zip",
-            key="download_project_zip_button"
-        )
+        # Export de l'ensemble du projet au format ZIP : construit seulement à la demande, puis
+        # réutilisé tant que les données n'ont pas changé (les reruns de saisie ne le recalculent pas).
+        export = export_en_cache()
+        if export is None:
+            if st.session_state.export_cache is not None:
+                st.caption("Les données ont changé depuis le dernier export.")
+            if st.button("⚙️ Préparer l'export (JSON + Excel)", key="preparer_export_button"):
+                with st.spinner("Préparation de l'export..."):
+                    preparer_export()
+                st.rerun()
+        if export is not None:
+            download_zip_filename = f"barometre_projet_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            st.download_button(
+                label="📦 Télécharger le projet (JSON + Excel)",
+                data=export["zip"],
+                file_name=download_zip_filename,
+                mime="application/zip",
+                key="download_project_zip_button"
+            )
+            st.caption(f"Export préparé en {export['duree']:.2f} s")
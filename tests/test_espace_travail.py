@@ -0,0 +1,208 @@
+"""
+Tests de l'espace de travail : rejeu du journal des modifications après un arrêt brutal,
+application unique de chaque entrée, modifications concurrentes d'un même projet et lecture
+paginée des relations sans charger le registre.
+"""
+import os
+
+import pytest
+
+from barometre.espace_travail import EspaceTravail, JournalModifications
+from barometre.modele import CHAMPS_RELATION, AnalyseRelationnelle, RegistreRelations
+
+
+def relation(emetteur: str, recepteur: str, debut: str, p_plus: int = 1) -> dict:
+    return {
+        "Émetteur": emetteur, "Récepteur": recepteur, "Date": "01/01/2025", "Début": debut, "Fin": "18:00",
+        "Service": "Service A",
+        "P+": p_plus, "P-": 0, "I+": 0, "I-": 0, "C+": 0, "C-": 0,
+        "Score Pic Positif": p_plus, "Score Pic Négatif": 0, "Score Net": p_plus,
+        "Vigilance": AnalyseRelationnelle.classer_relation(p_plus, 0),
+        "Commentaire": "",
+    }
+
+
+@pytest.fixture
+def chemin(tmp_path):
+    return str(tmp_path / "espace.sqlite3")
+
+
+def ouvrir(chemin: str) -> EspaceTravail:
+    # Pas de compaction de fond pendant les tests : elle est déclenchée explicitement
+    return EspaceTravail(chemin, compaction_delai=3600)
+
+
+def relations_enregistrees(chemin: str, projet_id: int) -> list:
+    espace = ouvrir(chemin)
+    try:
+        return espace.charger_relations(projet_id).vers_liste(avec_id=True)
+    finally:
+        espace.fermer()
+
+
+def projet_avec_relations(chemin: str, nombre: int = 5):
+    """Projet créé puis complété par le journal (non compacté) ; renvoie (projet_id, registre de la session)."""
+    espace = ouvrir(chemin)
+    projet_id = espace.creer_projet("Projet")
+    registre = espace.charger_relations(projet_id)
+    registre.suivre_modifications()
+    for i in range(nombre):
+        registre.ajouter(relation("Alice", "Bob", f"{8 + i:02d}:00"))
+    espace.enregistrer_modifications(projet_id, registre.extraire_modifications())
+    espace.fermer()
+    return projet_id, registre
+
+
+def test_rejeu_ignore_une_derniere_ligne_tronquee(chemin):
+    projet_id, registre = projet_avec_relations(chemin)
+    # Arrêt brutal pendant l'écriture d'une entrée : la dernière ligne est incomplète
+    with open(chemin + ".journal.jsonl", "a", encoding="utf-8") as journal:
+        journal.write('{"seq": 6, "projet": 1, "op": "suppr')
+
+    espace = ouvrir(chemin)
+    assert not os.path.exists(chemin + ".journal.jsonl")
+    assert espace.charger_relations(projet_id).vers_liste(avec_id=True) == registre.vers_liste(avec_id=True)
+    # La numérotation du journal reprend après la dernière entrée appliquée
+    registre.supprimer([0])
+    espace.enregistrer_modifications(projet_id, registre.extraire_modifications())
+    assert espace.compacter() == 1
+    espace.fermer()
+    assert relations_enregistrees(chemin, projet_id) == registre.vers_liste(avec_id=True)
+
+
+def test_arret_entre_commit_et_suppression_du_journal(chemin, monkeypatch):
+    projet_id, registre = projet_avec_relations(chemin)
+    espace = ouvrir(chemin)
+    registre.supprimer([1])
+    registre.ajouter(relation("Bob", "Alice", "08:00"))
+    espace.enregistrer_modifications(projet_id, registre.extraire_modifications())
+
+    def arret_brutal():
+        raise RuntimeError("arrêt")
+    monkeypatch.setattr(espace._journal, "terminer_compaction", arret_brutal)
+    with pytest.raises(RuntimeError):
+        espace.compacter()
+    espace.fermer()
+    assert os.path.exists(chemin + ".journal.jsonl.compaction")
+
+    # Le fichier de compaction est relu au démarrage, mais ses entrées déjà appliquées sont ignorées
+    espace = ouvrir(chemin)
+    assert not os.path.exists(chemin + ".journal.jsonl.compaction")
+    assert espace.nombre_rejets() == 0
+    assert espace.charger_relations(projet_id).vers_liste(avec_id=True) == registre.vers_liste(avec_id=True)
+    espace.fermer()
+
+
+def test_renommage_puis_reutilisation_de_l_ancien_nom(chemin):
+    projet_id, registre = projet_avec_relations(chemin, nombre=2)
+    espace = ouvrir(chemin)
+    registre.renommer_personne("Alice", "Carole")
+    # L'ancien nom désigne désormais une autre personne, avec une relation de même horaire
+    registre.ajouter(relation("Alice", "Bob", "08:00", p_plus=2))
+    espace.enregistrer_modifications(projet_id, registre.extraire_modifications())
+    espace.fermer()
+
+    enregistrees = relations_enregistrees(chemin, projet_id)
+    assert enregistrees == registre.vers_liste(avec_id=True)
+    assert [(r["Émetteur"], r["P+"]) for r in enregistrees] == [("Carole", 1), ("Carole", 1), ("Alice", 2)]
+
+
+def test_deux_sessions_meme_identifiant_et_suppression_par_cle(chemin):
+    projet_id, _ = projet_avec_relations(chemin, nombre=2)
+    espace = ouvrir(chemin)
+    onglet_1 = espace.charger_relations(projet_id)
+    onglet_2 = espace.charger_relations(projet_id)
+    onglet_1.suivre_modifications()
+    onglet_2.suivre_modifications()
+
+    # Chaque onglet numérote ses relations : les deux ajouts reçoivent le même identifiant
+    relation_1 = onglet_1.ajouter(relation("Alice", "Bob", "12:00"))
+    relation_2 = onglet_2.ajouter(relation("Bob", "Alice", "12:00"))
+    assert relation_1.id == relation_2.id
+    espace.enregistrer_modifications(projet_id, onglet_1.extraire_modifications())
+    espace.enregistrer_modifications(projet_id, onglet_2.extraire_modifications())
+    assert espace.compacter() == 2
+    enregistrees = espace.charger_relations(projet_id)
+    assert len(enregistrees) == 4
+    assert ("Alice", "Bob", "01/01/2025", "12:00", "18:00") in enregistrees
+    assert ("Bob", "Alice", "01/01/2025", "12:00", "18:00") in enregistrees
+
+    # La suppression dans l'onglet 2 désigne sa relation par sa clé : celle de l'onglet 1 est conservée
+    onglet_2.supprimer([relation_2.id])
+    espace.enregistrer_modifications(projet_id, onglet_2.extraire_modifications())
+    espace.compacter()
+    enregistrees = espace.charger_relations(projet_id)
+    assert ("Alice", "Bob", "01/01/2025", "12:00", "18:00") in enregistrees
+    assert ("Bob", "Alice", "01/01/2025", "12:00", "18:00") not in enregistrees
+
+    # La même relation ajoutée dans les deux onglets n'est enregistrée qu'une fois ; le doublon
+    # est écarté dans journal_rejets sans bloquer les compactions suivantes
+    onglet_1.ajouter(relation("Alice", "Bob", "14:00"))
+    onglet_2.ajouter(relation("Alice", "Bob", "14:00"))
+    espace.enregistrer_modifications(projet_id, onglet_1.extraire_modifications())
+    espace.enregistrer_modifications(projet_id, onglet_2.extraire_modifications())
+    assert espace.compacter() == 1
+    assert espace.nombre_rejets() == 1
+    onglet_1.ajouter(relation("Alice", "Bob", "16:00"))
+    espace.enregistrer_modifications(projet_id, onglet_1.extraire_modifications())
+    assert espace.compacter() == 1
+    assert len(espace.charger_relations(projet_id)) == 5
+    espace.fermer()
+
+
+def test_entree_mal_formee_ecartee_au_rejeu(chemin):
+    projet_id, registre = projet_avec_relations(chemin)
+    with open(chemin + ".journal.jsonl", "a", encoding="utf-8") as journal:
+        journal.write('{"seq": 6, "op": "suppression", "id": 0}\n')  # sans "projet"
+        journal.write('{"projet": 1, "op": "suppression", "id": 1}\n')  # sans "seq"
+
+    espace = ouvrir(chemin)
+    assert espace.derniere_erreur_compaction is None
+    assert espace.nombre_rejets() == 2
+    assert espace.charger_relations(projet_id).vers_liste(avec_id=True) == registre.vers_liste(avec_id=True)
+    espace.fermer()
+
+
+def test_echec_du_rejeu_au_demarrage_n_empeche_pas_l_ouverture(chemin, monkeypatch):
+    projet_id, registre = projet_avec_relations(chemin)
+
+    def lecture_impossible(journal):
+        raise OSError("lecture impossible")
+    with monkeypatch.context() as patch:
+        patch.setattr(JournalModifications, "lire_compaction", lecture_impossible)
+        espace = ouvrir(chemin)
+        assert espace.derniere_erreur_compaction == "lecture impossible"
+        assert os.path.exists(chemin + ".journal.jsonl.compaction")
+        # Les nouvelles entrées sont numérotées après celles restées dans le journal
+        registre.supprimer([0])
+        espace.enregistrer_modifications(projet_id, registre.extraire_modifications())
+        assert espace._journal.sequence == 6
+
+    assert espace.compacter() == 6
+    assert espace.charger_relations(projet_id).vers_liste(avec_id=True) == registre.vers_liste(avec_id=True)
+    espace.fermer()
+
+
+def test_page_relations_filtre_trie_et_pagine_en_sql(chemin):
+    espace = ouvrir(chemin)
+    registre = RegistreRelations()
+    for emetteur, date, p_plus in [("Élodie", "15/03/2025", 0), ("Bob", "02/01/2025", 3),
+                                   ("élodie", "01/12/2024", 1), ("Bob", "non datée", 1)]:
+        registre.ajouter({**relation(emetteur, "Zoé", "08:00", p_plus), "Date": date})
+    projet_id = espace.creer_projet("Projet", registre=registre)
+
+    contenu = espace.charger_projet(projet_id)
+    assert "relations" not in contenu
+    assert espace.compter_relations(projet_id) == 4
+    # Recherche sans casse, y compris hors ASCII, comme str.contains(case=False)
+    assert espace.compter_relations(projet_id, recherche="ÉLODIE") == 2
+    page = espace.page_relations(projet_id, recherche="élo")
+    assert list(page.columns) == ["id"] + CHAMPS_RELATION
+    assert page["id"].tolist() == [0, 2]
+    vigilance = AnalyseRelationnelle.classer_relation(1, 0)
+    assert espace.page_relations(projet_id, vigilances=[vigilance])["id"].tolist() == [2, 3]
+    # Dates triées chronologiquement, date d'un autre format en dernier, puis ordre de saisie
+    assert espace.page_relations(projet_id, colonne_tri="Date")["id"].tolist() == [2, 1, 0, 3]
+    assert espace.page_relations(projet_id, colonne_tri="Date", tri_croissant=False)["id"].tolist() == [0, 1, 2, 3]
+    assert espace.page_relations(projet_id, colonne_tri="Émetteur", decalage=1, limite=2)["id"].tolist() == [3, 0]
+    espace.fermer()
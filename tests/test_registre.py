@@ -0,0 +1,126 @@
+"""
+Tests du registre des relations : détection des doublons en O(1) par l'index des clés
+(Émetteur, Récepteur, Date, Début, Fin), tenu à jour à l'ajout, à la suppression, au
+renommage d'une personne et à l'import JSON, sur un registre de 50 000 relations.
+"""
+import json
+import time
+
+import pytest
+
+from barometre.export import projet_depuis_json, projet_vers_json
+from barometre.modele import AnalyseRelationnelle, RegistreRelations
+
+NOMBRE_RELATIONS = 50_000
+NOMBRE_PERSONNES = 100
+
+
+def relation(emetteur: str, recepteur: str, date: str, debut: str, fin: str, p_plus: int = 1) -> dict:
+    return {
+        "Émetteur": emetteur, "Récepteur": recepteur, "Date": date, "Début": debut, "Fin": fin,
+        "Service": "Service A",
+        "P+": p_plus, "P-": 0, "I+": 0, "I-": 0, "C+": 0, "C-": 0,
+        "Score Pic Positif": p_plus, "Score Pic Négatif": 0, "Score Net": p_plus,
+        "Vigilance": AnalyseRelationnelle.classer_relation(p_plus, 0),
+        "Commentaire": "",
+    }
+
+
+def cle(rel: dict) -> tuple:
+    return (rel["Émetteur"], rel["Récepteur"], rel["Date"], rel["Début"], rel["Fin"])
+
+
+def relations_distinctes(n: int = NOMBRE_RELATIONS) -> list:
+    """n relations de clés toutes différentes entre NOMBRE_PERSONNES personnes."""
+    relations = []
+    for i in range(n):
+        emetteur = i % NOMBRE_PERSONNES
+        recepteur = (emetteur + 1 + (i // NOMBRE_PERSONNES) % (NOMBRE_PERSONNES - 1)) % NOMBRE_PERSONNES
+        jour, minute = divmod(i // (NOMBRE_PERSONNES * (NOMBRE_PERSONNES - 1)), 60)
+        relations.append(relation(
+            f"Pers {emetteur}", f"Pers {recepteur}",
+            f"{1 + jour % 28:02d}/{1 + jour // 28 % 12:02d}/2025", f"09:{minute:02d}", "10:00",
+        ))
+    return relations
+
+
+@pytest.fixture(scope="module")
+def relations():
+    relations = relations_distinctes()
+    assert len({cle(r) for r in relations}) == NOMBRE_RELATIONS
+    return relations
+
+
+@pytest.fixture
+def registre(relations):
+    return RegistreRelations(relations)
+
+
+def test_doublons_apres_ajout(registre, relations):
+    assert len(registre) == NOMBRE_RELATIONS
+    debut = time.perf_counter()
+    assert all(cle(r) in registre for r in relations)
+    # Une recherche linéaire prendrait de l'ordre de 50 000² comparaisons
+    assert time.perf_counter() - debut < 5
+
+    with pytest.raises(ValueError):
+        registre.ajouter(dict(relations[123]))
+    nouvelle = relation("Pers 1", "Pers 2", "01/01/2030", "08:00", "09:00")
+    assert cle(nouvelle) not in registre
+    registre.ajouter(nouvelle)
+    assert cle(nouvelle) in registre
+    assert len(registre) == NOMBRE_RELATIONS + 1
+
+
+def test_doublons_apres_suppression(registre, relations):
+    ids = [rel.id for rel in registre][:1000]
+    assert registre.supprimer(ids) == 1000
+    assert not any(cle(r) in registre for r in relations[:1000])
+    assert all(cle(r) in registre for r in relations[1000:])
+    # Une relation supprimée peut être saisie à nouveau
+    registre.ajouter(dict(relations[0]))
+    assert cle(relations[0]) in registre
+
+
+def test_doublons_apres_renommage(registre, relations):
+    relations_pers_3 = [r for r in relations if "Pers 3" in (r["Émetteur"], r["Récepteur"])]
+    registre.renommer_personne("Pers 3", "Zoé")
+    for r in relations_pers_3:
+        assert cle(r) not in registre
+        renommee = tuple("Zoé" if nom == "Pers 3" else nom for nom in cle(r))
+        assert renommee in registre
+    with pytest.raises(ValueError):
+        registre.ajouter(dict(relations_pers_3[0], **{
+            k: "Zoé" for k in ("Émetteur", "Récepteur") if relations_pers_3[0][k] == "Pers 3"
+        }))
+    # L'ancien nom est libre : la relation d'origine n'est plus un doublon
+    registre.ajouter(dict(relations_pers_3[0]))
+    assert registre.verifier_compteurs() == []
+
+
+def test_doublons_apres_fusion(registre, relations):
+    # Fusion impossible : "Pers 5" et "Pers 6" ont des relations de même clé vers les mêmes personnes
+    with pytest.raises(ValueError):
+        registre.renommer_personne("Pers 5", "Pers 6")
+    assert all(cle(r) in registre for r in relations)
+
+    # "Nouvelle" renommée en "Pers 6" (qui a déjà des relations) : les deux personnes sont fusionnées
+    registre.ajouter(relation("Nouvelle", "Pers 7", "01/01/2031", "08:00", "09:00"))
+    registre.renommer_personne("Nouvelle", "Pers 6")
+    assert ("Pers 6", "Pers 7", "01/01/2031", "08:00", "09:00") in registre
+    assert ("Nouvelle", "Pers 7", "01/01/2031", "08:00", "09:00") not in registre
+    with pytest.raises(ValueError):
+        registre.ajouter(relation("Pers 6", "Pers 7", "01/01/2031", "08:00", "09:00"))
+    assert all(cle(r) in registre for r in relations)
+    assert registre.verifier_compteurs() == []
+
+
+def test_doublons_apres_import_json(registre, relations):
+    contenu = json.loads(projet_vers_json([], [], registre, NOMBRE_PERSONNES))
+    # Les doublons présents dans le fichier sont ignorés à l'import
+    contenu["relations_saisies"] += [dict(r) for r in relations[:500]]
+    importe = projet_depuis_json(contenu)["relations"]
+    assert len(importe) == NOMBRE_RELATIONS
+    assert all(cle(r) in importe for r in relations)
+    with pytest.raises(ValueError):
+        importe.ajouter(dict(relations[-1]))
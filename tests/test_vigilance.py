@@ -0,0 +1,38 @@
+"""
+Tests de la classification de vigilance : la version par lot (table 4×4) et la version
+scalaire de AnalyseRelationnelle donnent le même résultat que les règles.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from barometre.modele import TYPES_VIGILANCE, AnalyseRelationnelle, _regles_vigilance
+
+ENTREES = [(p_plus, p_moins) for p_plus in range(4) for p_moins in range(4)]
+
+
+def test_classer_relations_identique_a_classer_relation_sur_les_16_entrees():
+    p_plus, p_moins = zip(*ENTREES)
+    vigilances = AnalyseRelationnelle.classer_relations(list(p_plus), list(p_moins))
+    assert list(vigilances.categories) == TYPES_VIGILANCE
+    assert list(vigilances) == [AnalyseRelationnelle.classer_relation(pp, pm) for pp, pm in ENTREES]
+    assert list(vigilances) == [_regles_vigilance(pp, pm) for pp, pm in ENTREES]
+
+
+def test_classer_relations_conserve_l_index_d_une_series():
+    index = [f"r{i}" for i in range(len(ENTREES))]
+    p_plus = pd.Series([pp for pp, _ in ENTREES], index=index)
+    p_moins = pd.Series([pm for _, pm in ENTREES], index=index)
+    vigilances = AnalyseRelationnelle.classer_relations(p_plus, p_moins)
+    assert list(vigilances.index) == index
+    assert vigilances.tolist() == [_regles_vigilance(pp, pm) for pp, pm in ENTREES]
+
+
+@pytest.mark.parametrize("p_plus, p_moins", [
+    (1.0, 0), (3.0, 0.0), (1.5, 0), (0, 2.5), (-1, 0), (4, 0), (5, 2), (float("nan"), 1),
+])
+def test_scores_hors_table_classes_par_les_regles(p_plus, p_moins):
+    attendu = _regles_vigilance(p_plus, p_moins)
+    assert AnalyseRelationnelle.classer_relation(p_plus, p_moins) == attendu
+    assert AnalyseRelationnelle.classer_relations([p_plus], [p_moins])[0] == attendu
+    assert AnalyseRelationnelle.classer_relations(np.array([p_plus], dtype=float), [p_moins])[0] == attendu